@@ -0,0 +1,125 @@
+"""
+Benchmark: several processes adding match results and registering players on the same db.json.
+
+Each worker adds the points and the opponent of matches to random players
+and registers new players. Four modes are compared:
+
+- tinydb: plain TinyDB, as before the database could be shared;
+- locked: DBManagers.locking storage, updates written without their version;
+- locked + versions: locked storage, updates checked against the version read
+  and retried on conflict;
+- locked + operations: locked storage, points and opponent added with
+  Increment and Append in the write itself, as TournamentManager does.
+
+Lost updates are the points added by the workers missing from the players at
+the end, lost players the registrations missing from the table. Without the
+lock, the file itself may be left corrupted by interleaved rewrites.
+
+    python -m Benchmarks.bench_concurrency --workers 4 --operations 200
+"""
+import argparse
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from tinydb import TinyDB
+
+from Benchmarks.fixtures import generate_players_data
+from DBManagers.db_manager import VERSION_FIELD, retry_on_conflict
+from DBManagers.locking import SharedTinyDB
+from DBManagers.operations import Append, Increment
+from DBManagers.tiny_manager import TinyManager
+
+MODES = ("tinydb", "locked", "locked + versions", "locked + operations")
+
+
+def _open(path: Path, mode: str) -> TinyDB:
+    return TinyDB(path, indent=4) if mode == "tinydb" else SharedTinyDB(str(path), indent=4)
+
+
+def _add_point(table, player_id: int, opponent_id: int, check_version: bool) -> None:
+    player = TinyManager.get_objects_by_id(table, [player_id])[0]
+    TinyManager.update_attributes(
+        table,
+        {"tournament_score": player["tournament_score"] + 1,
+         "players_already_faced": player["players_already_faced"] + [opponent_id]},
+        player_id,
+        expected_version=player.get(VERSION_FIELD, 0) if check_version else None
+    )
+
+
+def work(path: Path, mode: str, worker: int, size: int, operations: int) -> tuple[int, int, int]:
+    """:return: points added, players registered, errors"""
+
+    import random
+
+    rand = random.Random(worker)
+    db = _open(path, mode)
+    table = db.table("Players")
+    new_players = generate_players_data(operations // 10, seed=1000 + worker)
+    points = registered = errors = 0
+    for operation in range(operations):
+        player_id, opponent_id = rand.randint(1, size), rand.randint(1, size)
+        try:
+            if mode == "locked + versions":
+                retry_on_conflict(lambda: _add_point(table, player_id, opponent_id, check_version=True))
+            elif mode == "locked + operations":
+                TinyManager.update_attributes(
+                    table, {"tournament_score": Increment(1), "players_already_faced": Append(opponent_id)}, player_id
+                )
+            else:
+                _add_point(table, player_id, opponent_id, check_version=False)
+            points += 1
+            if operation % 10 == 0 and new_players:
+                TinyManager.save(table, new_players.pop())
+                registered += 1
+        except Exception:
+            # torn reads of a file being rewritten, ids taken by another process...
+            errors += 1
+    db.close()
+    return points, registered, errors
+
+
+def run(workers: int, size: int, operations: int) -> None:
+    for mode in MODES:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "db.json"
+            db = _open(path, mode)
+            players = generate_players_data(size)
+            for player in players:
+                player["tournament_score"] = 0
+            db.table("Players").insert_multiple(players)
+            db.close()
+
+            start = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(work, [path] * workers, [mode] * workers, range(workers),
+                                            [size] * workers, [operations] * workers))
+            duration = time.perf_counter() - start
+
+            points, registered, errors = (sum(column) for column in zip(*results))
+            db = _open(path, mode)
+            try:
+                documents = db.table("Players").all()
+            except ValueError:
+                print(f"{mode:>19} | {workers} workers x {operations} results | {duration:>6.2f} s "
+                      f"| db.json CORRUPTED | errors {errors}")
+                continue
+            finally:
+                db.close()
+            lost_points = points - sum(document["tournament_score"] for document in documents)
+            lost_players = size + registered - len(documents)
+            print(f"{mode:>19} | {workers} workers x {operations} results | {duration:>6.2f} s "
+                  f"| {points / duration:>6.0f} results/s | lost updates {lost_points:>4} "
+                  f"| lost players {lost_players:>3} | errors {errors}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--size", type=int, default=200)
+    parser.add_argument("--operations", type=int, default=200)
+    args = parser.parse_args()
+
+    run(args.workers, args.size, args.operations)
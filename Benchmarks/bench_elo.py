@@ -0,0 +1,67 @@
+"""
+Benchmark: Elo recomputation of a season, NumPy arrays against pure Python.
+Players of a registry play tournaments of random sections; results follow the ratings.
+
+    python -m Benchmarks.bench_elo --players 10000 --games 100000
+"""
+import argparse
+import random
+import time
+
+from Benchmarks.fixtures import generate_players_data
+from Engines.elo import EloEngine, expected_score
+
+
+def generate_season(players: dict[int, dict], games: int, section: int, rounds: int, seed: int = 0) -> list:
+    """
+    Tournaments of section players and rounds games each, one per week
+    :return: (first day, games) of each tournament, in chronological order
+    """
+
+    rand = random.Random(seed)
+    player_ids = list(players)
+    periods = []
+    week = 0
+    while games > 0:
+        day = f"{week % 4 * 7 + 1:02d}/{week // 4 % 12 + 1:02d}/{2020 + week // 48}"
+        entrants = rand.sample(player_ids, section)
+        tournament_games = []
+        for _ in range(rounds):
+            rand.shuffle(entrants)
+            for player_1, player_2 in zip(entrants[::2], entrants[1::2]):
+                expected = expected_score(players[player_1]["ranking"], players[player_2]["ranking"])
+                draw = rand.random()
+                tournament_games.append((player_1, player_2, 1.0 if draw < expected - 0.1 else
+                                         0.5 if draw < expected + 0.1 else 0.0))
+        periods.append((day, tournament_games[:games]))
+        games -= len(tournament_games)
+        week += 1
+    return periods
+
+
+def run(players_count: int, games: int, section: int, rounds: int) -> None:
+    players = dict(enumerate(generate_players_data(players_count), start=1))
+    periods = generate_season(players, games, section, rounds)
+    ratings = {player_id: player["ranking"] for player_id, player in players.items()}
+    births = {player_id: player["date_of_birth"] for player_id, player in players.items()}
+
+    results = {}
+    for label, use_numpy in (("python", False), ("numpy", True)):
+        start = time.perf_counter()
+        results[label] = EloEngine(use_numpy).recompute(ratings, births, periods)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>6} | {len(periods)} tournaments, {games} games, {players_count} players "
+              f"| {elapsed:>6.2f} s | {games / elapsed:>10,.0f} games/s")
+    differences = sum(results["python"][player_id] != results["numpy"][player_id] for player_id in players)
+    print(f"ratings different between both: {differences}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--players", type=int, default=10_000)
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--section", type=int, default=64, help="players per tournament")
+    parser.add_argument("--rounds", type=int, default=7, help="rounds per tournament")
+    args = parser.parse_args()
+
+    run(args.players, args.games, args.section, args.rounds)
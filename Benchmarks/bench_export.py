@@ -0,0 +1,89 @@
+"""
+Benchmark: exporting a large player registry, sorted in memory against the external merge sort.
+
+A SQLite registry of size players is built once, then the players report is
+exported to CSV by Controllers.reports in a new Python process for each
+configuration, whose peak memory (max RSS) is measured:
+
+- unsorted: players in the order of the table, the cost of reading and writing;
+- in memory: sorted with a buffer holding every player;
+- external: sorted runs of --buffer-size players on disk, merged.
+
+    python -m Benchmarks.bench_export --size 1000000 --sort ranking
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from Benchmarks.fixtures import generate_players_data
+
+# not imported from Settings.db_config: that would configure the database of the project
+ROOTS = Path(__file__).resolve().parent.parent
+
+EXPORT = """
+import json, resource
+from Controllers.reports import REPORTS, ReportManager
+from Settings.db_config import get_db_manager
+manager = ReportManager(get_db_manager(), buffer_size={buffer_size})
+report = manager.export(manager.players({order!r}), REPORTS["players"], {output!r}, "csv")
+print(json.dumps({{"rows": report.rows, "duration": report.duration,
+                  "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+"""
+
+
+BUILD = """
+from pathlib import Path
+from Benchmarks.bench_export import build_registry
+build_registry(Path({path!r}), {size})
+"""
+
+
+def build_registry(path: Path, size: int, batch_size: int = 100_000) -> None:
+    from DBManagers.sqlite_manager import SqliteDB, SqliteManager
+
+    db = SqliteDB(path)
+    table = db.table("Players")
+    for start in range(0, size, batch_size):
+        players = generate_players_data(min(batch_size, size - start), seed=start)
+        SqliteManager.save_many(table, players)
+    db.close()
+
+
+def export_in_process(directory: Path, order: str, buffer_size: int) -> dict:
+    output = directory / "players.csv"
+    env = dict(os.environ, CHESS_DB_BACKEND="sqlite", CHESS_DB_PATH=str(directory / "db"), TMPDIR=str(directory))
+    result = subprocess.run([sys.executable, "-c", EXPORT.format(buffer_size=buffer_size, order=order,
+                                                                 output=str(output))],
+                            env=env, cwd=ROOTS, capture_output=True, text=True, check=True).stdout
+    measures = json.loads(result.splitlines()[-1])
+    measures["file_size"] = output.stat().st_size
+    return measures
+
+
+def run(size: int, order: str, buffer_size: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        # in its own process too: the peak memory of a process is inherited by the processes it starts
+        subprocess.run([sys.executable, "-c", BUILD.format(path=str(directory / "db.sqlite3"), size=size)],
+                       cwd=ROOTS, check=True)
+        print(f"{'export':>10} | {'buffer':>9} | {'rows':>9} | {'duration':>9} | {'rows/s':>9} | {'max RSS':>10}")
+        for label, export_order, buffer in (("unsorted", "id", buffer_size),
+                                            ("in memory", order, size + 1),
+                                            ("external", order, buffer_size)):
+            measures = export_in_process(directory, export_order, buffer)
+            print(f"{label:>10} | {buffer:>9} | {measures['rows']:>9} | {measures['duration']:>7.2f} s "
+                  f"| {measures['rows'] / measures['duration']:>9,.0f} | {measures['max_rss'] / 1024:>7.0f} MB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--sort", choices=("name", "ranking"), default="ranking")
+    parser.add_argument("--buffer-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    run(args.size, args.sort, args.buffer_size)
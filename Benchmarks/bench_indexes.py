@@ -0,0 +1,62 @@
+"""
+Benchmark: equality lookups on the players table, full scan against hash index.
+
+    python -m Benchmarks.bench_indexes --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+import time
+
+from tinydb import TinyDB
+from tinydb.storages import MemoryStorage
+
+from Benchmarks.fixtures import generate_players_data
+from DBManagers.tiny_manager import TinyManager
+
+
+def _time_per_call(func, calls: list) -> float:
+    """:return: mean duration of one call in microseconds"""
+
+    start = time.perf_counter()
+    for args in calls:
+        func(*args)
+    return (time.perf_counter() - start) / len(calls) * 1e6
+
+
+def run(size: int, scan_lookups: int, index_lookups: int) -> None:
+    db = TinyDB(storage=MemoryStorage)
+    table = db.table("Players")
+    players = generate_players_data(size)
+    table.insert_multiple(players)
+
+    rand = random.Random(1)
+    names = [(player["first_name"], player["last_name"])
+             for player in rand.sample(players, max(scan_lookups, index_lookups))]
+
+    def scan(first_name, last_name):
+        query = TinyManager._generate_query([("first_name", first_name), ("last_name", last_name)])
+        table.clear_cache()
+        return table.search(query)
+
+    def indexed(first_name, last_name):
+        return TinyManager.get_objects_id(table, [("first_name", first_name), ("last_name", last_name)])
+
+    start = time.perf_counter()
+    TinyManager._get_index_set(table)
+    build = (time.perf_counter() - start) * 1e3
+
+    scan_time = _time_per_call(scan, names[:scan_lookups])
+    index_time = _time_per_call(indexed, names[:index_lookups])
+    print(f"{size:>9} players | scan {scan_time:>12.1f} µs | index {index_time:>8.1f} µs "
+          f"| index build {build:>9.1f} ms | speedup x{scan_time / index_time:,.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--scan-lookups", type=int, default=5)
+    parser.add_argument("--index-lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.scan_lookups, args.index_lookups)
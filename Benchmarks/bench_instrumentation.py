@@ -0,0 +1,78 @@
+"""
+Benchmark: cost of the instrumentation of Utils.instrumentation, disabled and enabled.
+
+- per call: a lookup by id on an InMemoryManager, before the instrumentation
+  is enabled (the methods are not wrapped), enabled, then disabled again;
+- per tournament: the simulation of Benchmarks.simulation played in a new
+  process without, then with CHESS_METRICS set, the metrics being dumped at exit.
+
+    python -m Benchmarks.bench_instrumentation --size 128 --rounds 7 --backend tinydb
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from Benchmarks.fixtures import generate_players_data
+from Benchmarks.simulation import PHASES, simulate_in_process
+
+
+def _ns_per_call(function, calls: int) -> float:
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        best = min(best, time.perf_counter() - start)
+    return best / calls * 1e9
+
+
+def per_call(calls: int) -> None:
+    from DBManagers.memory_manager import InMemoryManager
+    from Settings.db_config import PLAYERS_TABLE
+    from Utils import instrumentation
+
+    db_manager = InMemoryManager()
+    doc_id = db_manager.save_many(PLAYERS_TABLE, generate_players_data(1000))[500]
+
+    def lookup():
+        db_manager.get_objects_by_id(PLAYERS_TABLE, [doc_id])
+
+    disabled = _ns_per_call(lookup, calls)
+    instrumentation.enable()
+    enabled = _ns_per_call(lookup, calls)
+    instrumentation.disable()
+    disabled_again = _ns_per_call(lookup, calls)
+    histogram = instrumentation.METRICS.histogram("db.InMemoryManager.get_objects_by_id")
+    print(f"get_objects_by_id | disabled {disabled:>6.0f} ns | enabled {enabled:>6.0f} ns "
+          f"(+{enabled - disabled:.0f} ns) | disabled again {disabled_again:>6.0f} ns | {histogram.count} calls timed")
+
+
+def per_tournament(size: int, rounds: int, backend: str) -> None:
+    print(f"{'metrics':>8} | " + " | ".join(f"{phase:>19}" for phase in PHASES) + " |    total")
+    totals = {}
+    with tempfile.TemporaryDirectory() as directory:
+        metrics_path = Path(directory) / "metrics.json"
+        for label, environment in (("off", {}), ("on", {"CHESS_METRICS": str(metrics_path)})):
+            result = simulate_in_process(size, rounds, 0, "prompt", backend, environment)
+            totals[label] = result["total"]
+            print(f"{label:>8} | " + " | ".join(f"{result['phases'][phase]['total'] * 1e3:>16.1f} ms"
+                                                for phase in PHASES) + f" | {result['total']:>6.2f} s")
+        metrics = json.loads(metrics_path.read_text(encoding="utf-8"))
+    calls = sum(call["count"] for call in metrics["calls"].values())
+    written = sum(storage["bytes"] for storage in metrics["bytes_written"].values())
+    print(f"overhead {(totals['on'] / totals['off'] - 1) * 100:+.1f} % | {len(metrics['calls'])} methods, "
+          f"{calls} calls timed | {written / 2 ** 20:.1f} MB written by the storages")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--size", type=int, default=128)
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--backend", choices=("memory", "tinydb", "log", "sqlite"), default="memory")
+    args = parser.parse_args()
+
+    per_call(args.calls)
+    per_tournament(args.size, args.rounds, args.backend)
@@ -0,0 +1,63 @@
+"""
+Benchmark: cost of one score update on a file database, TinyDB JSON against append log.
+
+    python -m Benchmarks.bench_log_storage --sizes 1000 10000 100000
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from tinydb import TinyDB
+
+from Benchmarks.fixtures import generate_players_data
+from DBManagers.log_storage import LogDB
+from DBManagers.tiny_manager import TinyManager
+
+
+def _time_updates(table, updates: int) -> float:
+    """:return: mean duration of one update in milliseconds"""
+
+    TinyManager._get_index_set(table)
+    start = time.perf_counter()
+    for i in range(updates):
+        TinyManager.update_attribute(table, "tournament_score", i % 4 / 2, i % len(table) + 1)
+    return (time.perf_counter() - start) / updates * 1e3
+
+
+def run(size: int, updates: int, sync: bool) -> None:
+    players = generate_players_data(size)
+    with tempfile.TemporaryDirectory() as directory:
+        tiny_db = TinyDB(Path(directory) / "db.json", indent=4)
+        tiny_table = tiny_db.table("Players")
+        tiny_table.insert_multiple(players)
+        tiny_time = _time_updates(tiny_table, updates)
+        tiny_db.close()
+
+        log_db = LogDB(Path(directory) / "db", compact_threshold=0, sync=sync)
+        log_table = log_db.table("Players")
+        log_table.insert_multiple(players)
+        log_time = _time_updates(log_table, updates)
+
+        start = time.perf_counter()
+        log_db.compact()
+        compact_time = (time.perf_counter() - start) * 1e3
+        log_db.close()
+
+        start = time.perf_counter()
+        LogDB(Path(directory) / "db").close()
+        load_time = (time.perf_counter() - start) * 1e3
+
+    print(f"{size:>8} players | tinydb {tiny_time:>9.2f} ms/update | log {log_time:>6.3f} ms/update "
+          f"| compaction {compact_time:>8.1f} ms | recovery {load_time:>8.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--updates", type=int, default=20)
+    parser.add_argument("--no-sync", action="store_true", help="do not fsync the log after each record")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.updates, sync=not args.no_sync)
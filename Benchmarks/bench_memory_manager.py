@@ -0,0 +1,84 @@
+"""
+Benchmark: a whole simulated tournament with the in-memory db manager against the file-backed TinyManager.
+
+The event is played through TournamentManager as the services do: rounds are
+paired by the RoundScheduler and the results recorded in one batch per round,
+the ratings are updated at the end. Results are drawn with a fixed seed, so
+every manager must end with the same scores and rankings.
+
+    python -m Benchmarks.bench_memory_manager --size 256 --rounds 9
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from Benchmarks.fixtures import generate_players_data
+
+
+def simulate(db_manager, size: int, rounds: int, seed: int) -> list[tuple]:
+    """:return: (id, score, ranking) of the players at the end of the tournament"""
+
+    from Controllers.scheduler import RoundScheduler
+    from Controllers.tournament import TournamentManager
+    from Models.tournament import Tournament, TimeControl
+    from Settings.db_config import PLAYERS_TABLE, MATCHES_TABLE
+    from Views.ServiceViews.tournament import ServiceTournamentView
+
+    rand = random.Random(seed)
+    tournament_manager = TournamentManager(ServiceTournamentView, db_manager)
+    players_id = db_manager.save_many(PLAYERS_TABLE, generate_players_data(size, seed))
+    tournament_manager._save_tournament_and_update_players(
+        Tournament("Simulation", "Paris", "01/10/2022", "01/10/2022", "", TimeControl.BLITZ.value,
+                   players_id=players_id, number_of_turns=rounds))
+
+    scheduler = RoundScheduler(tournament_manager, max_workers=1)
+    for _ in range(rounds):
+        (_, new_round), = scheduler.run()
+        matches = db_manager.get_objects_by_id(MATCHES_TABLE, new_round.matches_id)
+        tournament_manager.record_results(new_round.tournament_id, [
+            (match.doc_id, rand.choice((0, 0.5, 1))) for match in matches if not match.get("is_bye")
+        ])
+
+    return [(player.doc_id, player["tournament_score"], player["ranking"])
+            for player in db_manager.get_objects_by_id(PLAYERS_TABLE, players_id)]
+
+
+def run(size: int, rounds: int, seed: int) -> None:
+    from DBManagers.memory_manager import InMemoryManager
+    from DBManagers.tiny_manager import TinyManager
+    from Settings.db_config import PLAYERS_TABLE, PROVIDER
+
+    with tempfile.TemporaryDirectory() as directory:
+        # the tables are only opened by TinyManager, after the in-memory run
+        PROVIDER.configure(backend="tinydb", path=Path(directory) / "db")
+
+        results = {}
+        for label, db_manager in (("InMemoryManager", InMemoryManager()), ("TinyManager", TinyManager())):
+            start = time.perf_counter()
+            final = simulate(db_manager, size, rounds, seed)
+            duration = time.perf_counter() - start
+            results.setdefault("final", final)
+            assert final == results["final"], f"{label} does not end with the same scores and rankings"
+            print(f"{label:>15} | {size} players, {rounds} rounds | {duration * 1e3:>8.1f} ms")
+
+            if isinstance(db_manager, InMemoryManager):
+                start = time.perf_counter()
+                db_manager.flush(Path(directory) / "flushed.json")
+                reloaded = InMemoryManager()
+                reloaded.load(Path(directory) / "flushed.json")
+                assert reloaded.get_all_objects_from_table(PLAYERS_TABLE) == \
+                    db_manager.get_all_objects_from_table(PLAYERS_TABLE)
+                print(f"{'flush + load':>15} | {(time.perf_counter() - start) * 1e3:>8.1f} ms")
+        PROVIDER.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--rounds", type=int, default=9)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run(args.size, args.rounds, args.seed)
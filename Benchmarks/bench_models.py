@@ -0,0 +1,60 @@
+"""
+Benchmark: memory and construction time of players, dict-based class against
+slot-based Player.
+
+    python -m Benchmarks.bench_models --size 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+from Models.player import Player
+
+
+class LegacyPlayer:
+    """Player as it was before __slots__: attributes in __dict__, data is the __dict__"""
+
+    def __init__(self, first_name, last_name, gender, date_of_birth, ranking=0,
+                 tournament_score=0, players_already_faced=None, is_already_in_a_tournament=False):
+        self.first_name = first_name
+        self.last_name = last_name
+        self.gender = gender
+        self.date_of_birth = date_of_birth
+        self.ranking = ranking
+        self.tournament_score = tournament_score
+        self.players_already_faced = [] if players_already_faced is None else players_already_faced
+        self.is_already_in_a_tournament = is_already_in_a_tournament
+
+
+def measure(label: str, build) -> None:
+    start = time.perf_counter()
+    build()
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = build()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{label:<20} | {duration:>6.2f} s | {memory / 2 ** 20:>8.1f} MiB | {memory / len(result):>6.0f} B/player")
+
+
+def run(size: int) -> None:
+    # shared strings, so only the per-player structures are measured
+    first_name, last_name, gender, date_of_birth = "Sylvère", "Causard", "M", "01/01/1950"
+    opponents = []
+
+    print(f"{size} players")
+    measure("dict-based class", lambda: [
+        LegacyPlayer(first_name, last_name, gender, date_of_birth, i % 2800, 0, opponents) for i in range(size)
+    ])
+    measure("__slots__ Player", lambda: [
+        Player(first_name, last_name, gender, date_of_birth, i % 2800, 0, opponents) for i in range(size)
+    ])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    run(args.size)
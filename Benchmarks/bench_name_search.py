@@ -0,0 +1,95 @@
+"""
+Benchmark: player search by name, prefix and fuzzy, over a large registry.
+
+Names are built from French syllables, so that they are as varied as real
+ones; queries are taken from registered names, truncated for the prefix
+searches and altered (typo, lost accents and case) for the fuzzy ones.
+
+    python -m Benchmarks.bench_name_search --size 1000000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from DBManagers.name_index import NameIndex
+
+SYLLABLES = ["ma", "ri", "lé", "on", "ber", "nard", "gé", "rar", "du", "pont", "fè", "vre", "cau", "sar",
+             "syl", "vè", "re", "jac", "ques", "mi", "chel", "lau", "rent", "bou", "chet", "rou", "ssel",
+             "dau", "det", "mar", "tin", "clé", "ment", "hé", "lè", "ne", "chlo", "é", "gui", "llau"]
+
+
+def generate_names(number: int, seed: int = 0) -> list[dict]:
+    rand = random.Random(seed)
+
+    def name(min_syllables: int, max_syllables: int) -> str:
+        return "".join(rand.choice(SYLLABLES) for _ in range(rand.randint(min_syllables, max_syllables))).title()
+
+    first_names = [name(2, 3) for _ in range(2_000)]
+    first_names += [f"{rand.choice(first_names)}-{rand.choice(first_names)}" for _ in range(500)]
+    last_names = [name(2, 4) for _ in range(max(number // 10, 1_000))]
+    return [{"first_name": rand.choice(first_names), "last_name": rand.choice(last_names)} for _ in range(number)]
+
+
+def alter(text: str, rand: random.Random) -> str:
+    """One typo, accents and case lost"""
+
+    position = rand.randrange(len(text))
+    typo = rand.choice(("drop", "swap", "replace"))
+    if typo == "drop":
+        text = text[:position] + text[position + 1:]
+    elif typo == "swap" and position < len(text) - 1:
+        text = text[:position] + text[position + 1] + text[position] + text[position + 2:]
+    else:
+        text = text[:position] + rand.choice("aeiourstln") + text[position + 1:]
+    return text.translate(str.maketrans("éèêàç", "eeeac")).lower()
+
+
+def _ms_per_query(search, queries: list[str]) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        search(query)
+    return (time.perf_counter() - start) / len(queries) * 1e3
+
+
+def run(size: int, queries: int, limit: int, use_numpy: bool) -> None:
+    players = generate_names(size)
+
+    start = time.perf_counter()
+    index = NameIndex(use_numpy=use_numpy)
+    index.build(enumerate(players, start=1))
+    build = time.perf_counter() - start
+
+    # Memory measured apart on 100k players (names already folded), tracemalloc slows the build down
+    measured = players[:100_000]
+    tracemalloc.start()
+    measured_index = NameIndex(use_numpy=use_numpy)
+    measured_index.build(enumerate(measured, start=1))
+    memory = tracemalloc.get_traced_memory()[0] / len(measured)
+    tracemalloc.stop()
+
+    rand = random.Random(1)
+    sample_id = rand.sample(range(1, size + 1), queries)
+    sample = [players[doc_id - 1] for doc_id in sample_id]
+    prefixes = [player["last_name"][:rand.randint(3, 6)] for player in sample]
+    exact = [f"{player['first_name']} {player['last_name']}" for player in sample]
+    typos = [f"{alter(player['first_name'], rand)} {alter(player['last_name'], rand)}" for player in sample]
+
+    found = sum(doc_id in index.search(query, limit) for query, doc_id in zip(typos, sample_id))
+    print(f"{size:>9} players | {'numpy' if index.use_numpy else 'python'} | build {build:>6.1f} s "
+          f"| {memory:>5.0f} B/player")
+    print(f"    prefix '{prefixes[0]}' {_ms_per_query(lambda q: index.prefix(q, limit), prefixes):>7.2f} ms")
+    print(f"    exact name          {_ms_per_query(lambda q: index.search(q, limit), exact):>7.2f} ms")
+    print(f"    name with typo      {_ms_per_query(lambda q: index.fuzzy(q, limit), typos):>7.2f} ms "
+          f"| e.g. {typos[0]!r} | player in the top {limit} for {found}/{queries}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=8)
+    parser.add_argument("--python", action="store_true", help="pure Python fuzzy search")
+    args = parser.parse_args()
+
+    run(args.size, args.queries, args.limit, not args.python)
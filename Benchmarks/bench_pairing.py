@@ -0,0 +1,58 @@
+"""
+Benchmark: Swiss pairing time per round, results of each round drawn at random.
+
+    python -m Benchmarks.bench_pairing --sizes 8 64 512 2048 --rounds 9
+"""
+import argparse
+import random
+import time
+
+from Engines.pairing import PairingPlayer, SwissPairing
+
+
+def play_round(players: dict[int, PairingPlayer], pairing, rand: random.Random) -> None:
+    """Random results, the better ranked player wins more often"""
+
+    for player_1, player_2 in pairing.pairs:
+        first, second = players[player_1], players[player_2]
+        first.opponents.add(player_2)
+        second.opponents.add(player_1)
+        draw = rand.random()
+        expected = 1 / (1 + 10 ** ((second.ranking - first.ranking) / 400))
+        if draw < 0.15:
+            first.score += 0.5
+            second.score += 0.5
+        elif draw < 0.15 + 0.85 * expected:
+            first.score += 1
+        else:
+            second.score += 1
+    if pairing.bye is not None:
+        players[pairing.bye].score += 1
+        players[pairing.bye].had_bye = True
+
+
+def run(size: int, rounds: int) -> None:
+    rand = random.Random(size)
+    players = {player_id: PairingPlayer(player_id, ranking=rand.randint(1000, 2800))
+               for player_id in range(1, size + 1)}
+    engine = SwissPairing()
+    timings = []
+    rematches = 0
+    for _ in range(min(rounds, size - 1)):
+        start = time.perf_counter()
+        pairing = engine.pair(players.values())
+        timings.append(time.perf_counter() - start)
+        rematches += pairing.rematches
+        play_round(players, pairing, rand)
+    print(f"{size:>5} players | {len(timings)} rounds | mean {sum(timings) / len(timings) * 1e3:>8.2f} ms "
+          f"| worst {max(timings) * 1e3:>8.2f} ms | rematches {rematches}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 64, 512, 2048])
+    parser.add_argument("--rounds", type=int, default=9)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.rounds)
@@ -0,0 +1,40 @@
+"""
+Benchmark: bulk import of a CSV players file into an in-memory TinyDB.
+
+    python -m Benchmarks.bench_player_import --sizes 10000 100000
+"""
+import argparse
+import csv
+import tempfile
+from pathlib import Path
+
+from tinydb import TinyDB
+from tinydb.storages import MemoryStorage
+
+from Benchmarks.fixtures import generate_players_data
+from Controllers.player_import import PlayerImporter
+from DBManagers.tiny_manager import TinyManager
+
+FIELDS = ["first_name", "last_name", "gender", "date_of_birth", "ranking"]
+
+
+def run(size: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "players.csv"
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(generate_players_data(size))
+
+        table = TinyDB(storage=MemoryStorage).table("Players")
+        report = PlayerImporter(TinyManager(), table).import_file(path)
+    print(f"{size:>8} rows | {report.duration:>7.2f} s | {report.rows_per_second:>10,.0f} rows/s | {report}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size)
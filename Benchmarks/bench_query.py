@@ -0,0 +1,96 @@
+"""
+Benchmark: cost of a search predicate per document, and searches through the query planner.
+
+The per-document cost of the compiled predicates is compared with the closure
+previously built by TinyManager._generate_query for each search (equalities only).
+
+    python -m Benchmarks.bench_query --size 100000
+"""
+import argparse
+import time
+
+from tinydb import TinyDB
+from tinydb.queries import QueryInstance
+from tinydb.storages import MemoryStorage
+
+from Benchmarks.fixtures import FIRST_NAMES, generate_players_data
+from DBManagers.query import compile_query
+from DBManagers.tiny_manager import TinyManager
+
+
+def legacy_query(values: list[tuple[str, str]]) -> QueryInstance:
+    """Query built by TinyManager._generate_query before the compiled predicates"""
+
+    custom_query = frozenset([("==", (value[0],), value[1]) for value in values])
+
+    def test_func(val):
+        dict_values = dict(values)
+        for key in dict_values:
+            if not dict_values[key] == val.get(key):
+                return False
+        return True
+
+    return QueryInstance(test=test_func, hashval=(custom_query,))
+
+
+def _ns_per_document(predicate, documents: list[dict], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for document in documents:
+            predicate(document)
+        best = min(best, time.perf_counter() - start)
+    return best / len(documents) * 1e9
+
+
+def bench_predicates(documents: list[dict], repeat: int) -> None:
+    equality = [("first_name", "Bob"), ("last_name", "Wayne-1"), ("gender", "M")]
+    print(f"{'equality x3 (legacy closure)':<34} {_ns_per_document(legacy_query(equality), documents, repeat):>7.0f} ns")
+
+    searches = [
+        ("equality x3", equality),
+        ("ranking between", [("ranking", "between", (1500, 2000))]),
+        ("first_name in", [("first_name", "in", FIRST_NAMES[:5])]),
+        ("last_name prefix", [("last_name", "prefix", "ra")]),
+        ("date_of_birth between", [("date_of_birth", "date_between", ("01/01/1990", "31/12/1999"))]),
+        ("gender + ranking + birth", [("gender", "F"), ("ranking", "between", (1500, None)),
+                                      ("date_of_birth", "date_between", (None, "31/12/1980"))]),
+    ]
+    for label, values in searches:
+        print(f"{label:<34} {_ns_per_document(compile_query(values), documents, repeat):>7.0f} ns")
+
+
+def bench_searches(documents: list[dict], lookups: int) -> None:
+    table = TinyDB(storage=MemoryStorage).table("Players")
+    TinyManager.save_many(table, documents)
+    TinyManager._get_index_set(table)
+
+    searches = [
+        ("gender = F (index)", [("gender", "F")]),
+        ("gender = F, ranking range", [("gender", "F"), ("ranking", "between", (2000, 2100))]),
+        ("first_name in 3 (scan)", [("first_name", "in", FIRST_NAMES[:3])]),
+        ("full name in (index)", [("first_name", "in", FIRST_NAMES[:3]),
+                                  ("last_name", "in", [documents[i]["last_name"] for i in range(0, 40, 4)])]),
+        ("birth decade (scan)", [("date_of_birth", "date_between", ("01/01/1990", "31/12/1999"))]),
+    ]
+    for label, values in searches:
+        start = time.perf_counter()
+        for _ in range(lookups):
+            table.clear_cache()
+            found = TinyManager.get_objects_id(table, values)
+        duration = (time.perf_counter() - start) / lookups * 1e3
+        print(f"{label:<34} {duration:>9.2f} ms | {len(found)} found")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--lookups", type=int, default=5)
+    args = parser.parse_args()
+
+    players = generate_players_data(args.size)
+    print(f"Predicate cost per document ({args.size} players)")
+    bench_predicates(players, args.repeat)
+    print(f"\nSearches ({args.size} players, query cache cleared)")
+    bench_searches(players, args.lookups)
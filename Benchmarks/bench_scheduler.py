@@ -0,0 +1,56 @@
+"""
+Benchmark: pairing of simultaneous sections, one process against a process pool.
+The gain needs several CPUs and sections big enough to outweigh the workers start-up.
+
+    python -m Benchmarks.bench_scheduler --sections 20 --size 2048 --rounds 5
+"""
+import argparse
+import random
+import time
+
+from Benchmarks.bench_pairing import play_round
+from Controllers.scheduler import pair_section, pair_sections
+from Engines.pairing import PairingPlayer, SwissPairing
+
+
+def build_section(size: int, rounds: int, seed: int) -> list[tuple]:
+    """Compact players of a section after some random rounds"""
+
+    rand = random.Random(seed)
+    players = {player_id: PairingPlayer(player_id, ranking=rand.randint(1000, 2800))
+               for player_id in range(1, size + 1)}
+    for _ in range(rounds):
+        play_round(players, SwissPairing().pair(players.values()), rand)
+    return [(player.player_id, player.score, player.ranking, tuple(player.opponents), player.had_bye)
+            for player in players.values()]
+
+
+def run(sections_count: int, size: int, rounds: int, workers) -> None:
+    sections = [build_section(size, rounds, seed) for seed in range(sections_count)]
+
+    timings = []
+    for section in sections:
+        start = time.perf_counter()
+        pair_section(section)
+        timings.append(time.perf_counter() - start)
+
+    results = {}
+    for label, max_workers in (("sequential", 1), ("process pool", workers)):
+        start = time.perf_counter()
+        pair_sections(sections, max_workers)
+        results[label] = time.perf_counter() - start
+
+    print(f"{sections_count} sections x {size} players | slowest section {max(timings) * 1e3:.1f} ms "
+          f"| sum {sum(timings) * 1e3:.1f} ms | sequential {results['sequential'] * 1e3:.1f} ms "
+          f"| process pool {results['process pool'] * 1e3:.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sections", type=int, default=20)
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    run(args.sections, args.size, args.rounds, args.workers)
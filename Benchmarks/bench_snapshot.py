@@ -0,0 +1,96 @@
+"""
+Benchmark: cold start of the controllers on a large database, TinyDB JSON, log with JSON snapshot and log with binary snapshot.
+
+Each measure is a new Python process which imports the controllers (so the
+database configuration) and reads one player; the time to scan every player
+is given apart, since a lazy snapshot moves the decoding cost there.
+
+    python -m Benchmarks.bench_snapshot --size 500000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from Benchmarks.fixtures import generate_players_data
+from DBManagers.snapshot import json_to_snapshot
+
+# not imported from Settings.db_config: that would open the database of the project
+ROOTS = Path(__file__).resolve().parent.parent
+
+COLD_START = """
+import json, time
+start = time.perf_counter()
+import Controllers.players, Controllers.tournament
+from Settings.db_config import PLAYERS_TABLE, get_db_manager
+db_manager = get_db_manager()
+imported = time.perf_counter()
+db_manager.get_objects_by_id(PLAYERS_TABLE, [{doc_id}])
+first_read = time.perf_counter()
+first_read_at = time.time()
+players = sum(1 for _ in db_manager.iter_objects(PLAYERS_TABLE))
+scanned = time.perf_counter()
+try:
+    with open("/proc/self/status") as status:
+        peak_memory = next(int(line.split()[1]) >> 10 for line in status if line.startswith("VmHWM"))
+except OSError:
+    peak_memory = "?"
+print(json.dumps({{"import": imported - start, "first_read": first_read - start, "scan": scanned - first_read,
+                  "first_read_at": first_read_at, "players": players, "peak_memory": peak_memory}}))
+"""
+
+
+def cold_start(backend: str, snapshot_format: str, path: Path, doc_id: int) -> dict:
+    env = dict(os.environ, CHESS_DB_BACKEND=backend, CHESS_DB_SNAPSHOT=snapshot_format, CHESS_DB_PATH=str(path))
+    env.pop("DB_CACHE_SIZE", None)
+    launched_at = time.time()
+    output = subprocess.run([sys.executable, "-c", COLD_START.format(doc_id=doc_id)], env=env, cwd=ROOTS,
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output)
+    result["until_first_read"] = result["first_read_at"] - launched_at
+    return result
+
+
+def run(size: int) -> None:
+    players = generate_players_data(size)
+    tables = {"Players": {str(doc_id): player for doc_id, player in enumerate(players, start=1)},
+              "Tournaments": {}, "Rounds": {}, "Matches": {}}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "db"
+        tiny_path, json_snapshot, binary_snapshot = (path.with_name(path.name + suffix)
+                                                     for suffix in (".json", ".snapshot.json", ".snapshot.bin"))
+        with open(tiny_path, "w", encoding="utf-8") as file:
+            json.dump(tables, file, indent=4)
+        with open(json_snapshot, "w", encoding="utf-8") as file:
+            json.dump({"seq": 0, "tables": tables}, file, ensure_ascii=False)
+        start = time.perf_counter()
+        json_to_snapshot(tiny_path, binary_snapshot)
+        conversion = time.perf_counter() - start
+
+        print(f"{size} players | conversion to binary {conversion:.1f} s | tinydb {tiny_path.stat().st_size >> 20} MB "
+              f"| json snapshot {json_snapshot.stat().st_size >> 20} MB "
+              f"| binary snapshot {binary_snapshot.stat().st_size >> 20} MB")
+        doc_id = size // 2
+        for label, backend, snapshot_format in (("tinydb", "tinydb", "json"),
+                                                ("log, json snapshot", "log", "json"),
+                                                ("log, binary snapshot", "log", "binary")):
+            result = cold_start(backend, snapshot_format, path, doc_id)
+            assert result["players"] == size
+            print(f"{label:>21} | process until first player {result['until_first_read']:>6.2f} s "
+                  f"(imports {result['import']:>6.3f} s, first player read at {result['first_read']:>6.3f} s) "
+                  f"| scan {result['scan']:>5.2f} s | peak {result['peak_memory']} MB")
+            # the log backend creates an empty log next to the snapshot
+            path.with_name(path.name + ".log").unlink(missing_ok=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=500_000)
+    args = parser.parse_args()
+
+    run(args.size)
@@ -0,0 +1,86 @@
+"""
+Benchmark: top-N and range queries on the players, sorted views against a search then a sort.
+
+On a registry held by InMemoryManager, each query is answered:
+- by a search (DBManagers.query conditions, a scan for ranges) then a sort of the result;
+- by the sorted views of SORTED_VIEWS, bisected in O(log N + k).
+The cost of keeping the views up to date is measured on ranking updates, and
+the full name of a Player model read again, cached since it is computed once.
+
+    python -m Benchmarks.bench_sorted_views --size 100000
+"""
+import argparse
+import time
+
+from Benchmarks.fixtures import generate_players, generate_players_data
+from Utils.sort_keys import SORT_KEYS
+
+
+def _ms(function, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def run(size: int, repeat: int) -> None:
+    from DBManagers.memory_manager import InMemoryManager
+    from Settings.db_config import PLAYERS_TABLE
+
+    db_manager = InMemoryManager()
+    db_manager.save_many(PLAYERS_TABLE, generate_players_data(size))
+    documents = {document.doc_id: document for document in db_manager.get_all_objects_from_table(PLAYERS_TABLE)}
+    ranking, birth, name = (SORT_KEYS[view].of for view in ("ranking", "date_of_birth", "full_name"))
+
+    def searched(values, key, limit=None, reverse=False):
+        doc_ids = db_manager.get_objects_id(PLAYERS_TABLE, values) if values else list(documents)
+        return sorted(doc_ids, key=lambda doc_id: (key(documents[doc_id]), doc_id), reverse=reverse)[:limit]
+
+    start = time.perf_counter()
+    db_manager.get_sorted_ids(PLAYERS_TABLE, "ranking", limit=1)
+    print(f"{size} players | views built in {(time.perf_counter() - start) * 1e3:.0f} ms")
+
+    queries = (
+        ("top 10 by ranking",
+         lambda: searched([], ranking, 10, reverse=True),
+         lambda: db_manager.get_sorted_ids(PLAYERS_TABLE, "ranking", limit=10, reverse=True)),
+        ("rated 1800-2000",
+         lambda: searched([("ranking", "between", (1800, 2000))], ranking),
+         lambda: db_manager.get_sorted_ids(PLAYERS_TABLE, "ranking", 1800, 2000)),
+        ("under-12s",
+         lambda: searched([("date_of_birth", "date_between", ("19/10/2014", None))], birth),
+         lambda: db_manager.get_sorted_ids(PLAYERS_TABLE, "date_of_birth", low="19/10/2014")),
+        ("20 first from 'm'",
+         lambda: [doc_id for doc_id in searched([], name) if name(documents[doc_id]) >= "m"][:20],
+         lambda: db_manager.get_sorted_ids(PLAYERS_TABLE, "full_name", low="m", limit=20)),
+    )
+    for label, by_search, by_view in queries:
+        result = by_view()
+        assert by_search() == result, f"{label}: the view does not give the search result"
+        search_ms, view_ms = _ms(by_search, 3), _ms(by_view, repeat)
+        print(f"{label:>18} | {len(result):>6} players | search + sort {search_ms:>8.2f} ms "
+              f"| view {view_ms:>8.3f} ms | x{search_ms / view_ms:>8.0f}")
+
+    doc_ids = list(documents)[:1000]
+    start = time.perf_counter()
+    for number, doc_id in enumerate(doc_ids):
+        db_manager.update_attribute(PLAYERS_TABLE, "ranking", 1000 + number, doc_id)
+    single = (time.perf_counter() - start) / len(doc_ids) * 1e6
+    start = time.perf_counter()
+    db_manager.update_attribute_values(PLAYERS_TABLE, "ranking", {doc_id: 2000 for doc_id in documents})
+    print(f"{'ranking updates':>18} | one by one {single:>6.1f} us | all at once {time.perf_counter() - start:.2f} s")
+
+    players = generate_players(1000)
+    uncached = min(_ms(lambda: [f"{player.last_name.upper()} {player.first_name.title()}" for player in players], 1)
+                   for _ in range(repeat))
+    cached = min(_ms(lambda: [player.full_name for player in players], 1) for _ in range(repeat))
+    print(f"{'full_name x 1000':>18} | built {uncached * 1e3:>6.0f} us | cached {cached * 1e3:>6.0f} us")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    run(args.size, args.repeat)
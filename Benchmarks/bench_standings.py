@@ -0,0 +1,61 @@
+"""
+Benchmark: standings and tie-breaks after each round, NumPy against pure Python.
+
+    python -m Benchmarks.bench_standings --sizes 1000 4000 --rounds 11
+"""
+import argparse
+import random
+import time
+
+from Engines.pairing import PairingPlayer, SwissPairing
+from Engines.standings import Standings, np
+
+
+def simulate_rounds(size: int, rounds: int) -> list[tuple[list, list]]:
+    """Pair and play random rounds, return (games, byes) of each round"""
+
+    rand = random.Random(size)
+    players = {player_id: PairingPlayer(player_id, ranking=rand.randint(1000, 2800))
+               for player_id in range(1, size + 1)}
+    engine = SwissPairing()
+    played = []
+    for _ in range(rounds):
+        pairing = engine.pair(players.values())
+        games = []
+        for player_1, player_2 in pairing.pairs:
+            points = rand.choice((1, 0.5, 0))
+            games.append((player_1, player_2, points))
+            players[player_1].opponents.add(player_2)
+            players[player_2].opponents.add(player_1)
+            players[player_1].score += points
+            players[player_2].score += 1 - points
+        byes = [] if pairing.bye is None else [pairing.bye]
+        for player_id in byes:
+            players[player_id].score += 1
+            players[player_id].had_bye = True
+        played.append((games, byes))
+    return played
+
+
+def run(size: int, rounds: int) -> None:
+    played = simulate_rounds(size, rounds)
+    modes = [("numpy", True)] if np is not None else []
+    modes.append(("python", False))
+    for label, use_numpy in modes:
+        standings = Standings(range(1, size + 1), rounds, use_numpy=use_numpy)
+        start = time.perf_counter()
+        for games, byes in played:
+            standings.add_round(games, byes)
+            standings.table()
+        duration = time.perf_counter() - start
+        print(f"{size:>6} players | {rounds} rounds | {label:<6} | {duration / rounds * 1e3:>8.2f} ms/round")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 4000])
+    parser.add_argument("--rounds", type=int, default=11)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.rounds)
@@ -0,0 +1,84 @@
+"""
+Benchmark: start-up time of the controllers, with a large database next to them.
+
+Each controller is imported in a new Python process (as scripted or batch
+invocations do), once to time the whole process and once with -X importtime
+to find the heaviest imports. The database must not be opened by the imports.
+
+    python -m Benchmarks.bench_startup --size 500000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from Benchmarks.fixtures import generate_players_data
+
+# not imported from Settings.db_config: that would configure the database of the project
+ROOTS = Path(__file__).resolve().parent.parent
+CONTROLLERS = ["Controllers.players", "Controllers.tournament", "Controllers.ratings",
+               "Controllers.player_import", "Controllers.scheduler", "Controllers.result_service"]
+IMPORT = "import {module}; from Settings.db_config import PROVIDER; print(PROVIDER.is_open)"
+
+
+def _run(code: str, env: dict, *options: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *options, "-c", code], env=env, cwd=ROOTS,
+                          capture_output=True, text=True, check=True)
+
+
+def _wall_time(code: str, env: dict, repeat: int) -> float:
+    """:return: median duration of the process in milliseconds"""
+
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _run(code, env)
+        durations.append((time.perf_counter() - start) * 1e3)
+    return statistics.median(durations)
+
+
+def import_times(module: str, env: dict) -> tuple[float, list[tuple[float, str]], bool]:
+    """:return: cumulative import time (ms), heaviest modules by own import time (ms, name), database opened"""
+
+    process = _run(IMPORT.format(module=module), env, "-X", "importtime")
+    own_times, cumulative = [], 0.0
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, total, name = line[len("import time:"):].split("|")
+        own_times.append((int(own) / 1e3, name.strip()))
+        if name.strip() == module:
+            cumulative = int(total) / 1e3
+    return cumulative, sorted(own_times, reverse=True)[:3], process.stdout.strip() == "True"
+
+
+def run(size: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "db"
+        players = {str(doc_id): player for doc_id, player in enumerate(generate_players_data(size), start=1)}
+        with open(path.with_name(path.name + ".json"), "w", encoding="utf-8") as file:
+            json.dump({"Players": players}, file, indent=4)
+        env = dict(os.environ, CHESS_DB_PATH=str(path))
+
+        interpreter = _wall_time("pass", env, repeat)
+        print(f"{size} players in db.json | python start-up alone {interpreter:.0f} ms")
+        for module in CONTROLLERS:
+            process = _wall_time(IMPORT.format(module=module), env, repeat)
+            cumulative, heaviest, opened = import_times(module, env)
+            print(f"{module:>27} | process {process:>5.0f} ms | imports {cumulative:>5.1f} ms "
+                  f"| database {'OPENED' if opened else 'not opened'} "
+                  f"| heaviest: {', '.join(f'{name} {own:.1f} ms' for own, name in heaviest)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    run(args.size, args.repeat)
@@ -0,0 +1,101 @@
+"""
+Benchmark: persisting the results of a round, match by match against in one bulk update.
+
+A round of size players (size / 2 matches) is played on a db.json shared with
+DBManagers.locking, whose lock counts the writes of the file:
+
+- per match: the match, then each player read and written with its version
+  (3 writes per match, as results were saved before update_many);
+- update_many: all the matches in one write, all the players in another one,
+  points and opponents added with Increment and Append.
+
+Both must end with the same scores and opponents.
+
+    python -m Benchmarks.bench_update_many --sizes 64 256 1024
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from Benchmarks.fixtures import generate_players_data
+from DBManagers.db_manager import VERSION_FIELD
+from DBManagers.locking import SharedTinyDB
+from DBManagers.operations import Append, Increment
+from DBManagers.tiny_manager import TinyManager
+
+
+def _round(path: Path, size: int, seed: int) -> tuple[SharedTinyDB, list[tuple[int, int, int, float]]]:
+    """:return: the database and the (match id, player 1, player 2, score 1) of a round"""
+
+    db = SharedTinyDB(str(path), indent=4)
+    players = generate_players_data(size, seed)
+    for player in players:
+        player.update(tournament_score=0, players_already_faced=[])
+    players_id = TinyManager.save_many(db.table("Players"), players)
+    rand = random.Random(seed)
+    rand.shuffle(players_id)
+    pairs = list(zip(players_id[::2], players_id[1::2]))
+    matches_id = TinyManager.save_many(db.table("Matches"), [
+        {"player_1_id": player_1, "player_2_id": player_2, "score_1": 0, "score_2": 0, "is_finished": False}
+        for player_1, player_2 in pairs
+    ])
+    return db, [(match_id, player_1, player_2, rand.choice((0, 0.5, 1)))
+                for match_id, (player_1, player_2) in zip(matches_id, pairs)]
+
+
+def per_match(db: SharedTinyDB, results: list[tuple[int, int, int, float]]) -> None:
+    players_table, matches_table = db.table("Players"), db.table("Matches")
+    for match_id, player_1, player_2, score_1 in results:
+        TinyManager.update_attributes(matches_table, {"score_1": score_1, "score_2": 1 - score_1,
+                                                      "is_finished": True}, match_id)
+        for player_id, points, opponent_id in ((player_1, score_1, player_2), (player_2, 1 - score_1, player_1)):
+            player = TinyManager.get_objects_by_id(players_table, [player_id])[0]
+            TinyManager.update_attributes(
+                players_table,
+                {"tournament_score": player["tournament_score"] + points,
+                 "players_already_faced": player["players_already_faced"] + [opponent_id]},
+                player_id,
+                expected_version=player.get(VERSION_FIELD, 0)
+            )
+
+
+def bulk(db: SharedTinyDB, results: list[tuple[int, int, int, float]]) -> None:
+    TinyManager.update_many(db.table("Matches"), {
+        match_id: {"score_1": score_1, "score_2": 1 - score_1, "is_finished": True}
+        for match_id, _, _, score_1 in results
+    })
+    new_values = {}
+    for _, player_1, player_2, score_1 in results:
+        new_values[player_1] = {"tournament_score": Increment(score_1), "players_already_faced": Append(player_2)}
+        new_values[player_2] = {"tournament_score": Increment(1 - score_1), "players_already_faced": Append(player_1)}
+    TinyManager.update_many(db.table("Players"), new_values)
+
+
+def run(sizes: list[int], seed: int) -> None:
+    for size in sizes:
+        final = None
+        for label, persist in (("per match", per_match), ("update_many", bulk)):
+            with tempfile.TemporaryDirectory() as directory:
+                db, results = _round(Path(directory) / "db.json", size, seed)
+                writes = db.storage.lock._counter
+                start = time.perf_counter()
+                persist(db, results)
+                duration = time.perf_counter() - start
+                writes = db.storage.lock._counter - writes
+                players = sorted((player.doc_id, player["tournament_score"], player["players_already_faced"])
+                                 for player in db.table("Players").all())
+                db.close()
+            final = final or players
+            assert players == final, f"{label} does not end with the same scores and opponents"
+            print(f"{size:>6} players | {label:>11} | {writes:>5} writes | {duration * 1e3:>9.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 256, 1024])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run(args.sizes, args.seed)
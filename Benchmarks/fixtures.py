@@ -0,0 +1,45 @@
+"""
+Synthetic data for the benchmarks
+"""
+import random
+
+from Models.player import Gender, Player
+
+FIRST_NAMES = ["Bob", "Jean-Jacques", "Bruce", "Sylvère", "Serj", "Marie", "Kimberley",
+               "Alicia", "Angela", "Kirk", "Philippe", "Hélène", "Chloé", "Jérôme"]
+LAST_NAMES = ["Razowski", "Boubou", "Wayne", "Causard", "Tankian", "Curie", "Rose",
+              "Keys", "Gossow", "Lazarus", "Rastier", "Lefèvre", "Dupont", "Bérenger"]
+
+
+def generate_players_data(number: int, seed: int = 0) -> list[dict]:
+    """
+    Build player documents with unique full names
+    :param number: number of players
+    :param seed: random seed, same seed gives same players
+    :return: players data ready to be saved
+    """
+
+    rand = random.Random(seed)
+    players = []
+    for i in range(number):
+        players.append({
+            "first_name": rand.choice(FIRST_NAMES),
+            "last_name": f"{rand.choice(LAST_NAMES)}-{i}",
+            "gender": rand.choice((Gender.MALE.value, Gender.FEMALE.value)),
+            "date_of_birth": f"{rand.randint(1, 28):02d}/{rand.randint(1, 12):02d}/{rand.randint(1940, 2015)}",
+            "ranking": rand.randint(1000, 2800),
+            "tournament_score": 0,
+            "players_already_faced": [],
+            "is_already_in_a_tournament": rand.random() < 0.1,
+        })
+    return players
+
+
+def generate_players(number: int, seed: int = 0) -> list[Player]:
+    """
+    Synthetic registry of players, with unique full names
+    :param number: number of players
+    :param seed: random seed, same seed gives same players
+    """
+
+    return [Player.from_dict(data) for data in generate_players_data(number, seed)]
@@ -0,0 +1,233 @@
+"""
+Simulation: whole tournaments played through the controllers, with the time spent in each phase.
+
+Players are registered and ranked with PlayerManager, then the tournament is
+created and its players selected by name with TournamentManager. Each round is
+paired, its results entered (with the prompts of the console, or as a batch
+like the services) and the standings computed. Every prompt is answered by the
+scripted views, so the same code paths as a user's session are measured.
+
+Each size is played in its own Python process on an empty database of the
+chosen backend. The timings go to a JSON report; with --baseline, the phases
+slower than in a previous report are pointed out.
+
+    python -m Benchmarks.simulation --sizes 64 256 --rounds 9 --report simulation.json
+    python -m Benchmarks.simulation --sizes 64 256 --rounds 9 --baseline simulation.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from Benchmarks.fixtures import generate_players
+
+# not imported from Settings.db_config: that would configure the database of the project
+ROOTS = Path(__file__).resolve().parent.parent
+PHASES = ("registration", "tournament_creation", "pairing", "result_entry", "standings")
+# console choices of a result: victory of the first player, draw, victory of the second player
+RESULT_CHOICES = {1: "1", 0.5: "2", 0: "3"}
+
+SIMULATE = """
+import json
+from Benchmarks.simulation import simulate
+print(json.dumps(simulate({size}, {rounds}, {seed}, {entry!r})))
+"""
+
+
+class PhaseTimer:
+    """Time spent in each phase, each measure being kept"""
+
+    def __init__(self) -> None:
+        self.measures: dict[str, list[float]] = {phase: [] for phase in PHASES}
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.measures[phase].append(time.perf_counter() - start)
+
+    def report(self) -> dict:
+        return {phase: {"total": sum(measures), "max": max(measures, default=0.0), "measures": measures}
+                for phase, measures in self.measures.items()}
+
+
+def simulate(size: int, rounds: int, seed: int = 0, entry: str = "prompt") -> dict:
+    """
+    Play a tournament of size players on the database of the configuration
+    :param entry: "prompt" to enter the results match by match as in the console, "batch" for record_results
+    :return: timings of the phases and counters
+    """
+
+    from Controllers.players import PlayerManager
+    from Controllers.tournament import TournamentManager
+    from Engines.standings import Standings
+    from Models.match import Match
+    from Models.player import Gender
+    from Models.tournament import Tournament, TimeControl
+    from Settings.db_config import PLAYERS_TABLE, TOURNAMENTS_TABLE, MATCHES_TABLE, get_db_manager
+    from Views.ScriptedViews.messages import pick
+    from Views.ScriptedViews.players import ScriptedPlayerView
+    from Views.ScriptedViews.tournament import ScriptedTournamentView
+
+    rand = random.Random(seed)
+    db_manager = get_db_manager()
+    player_view, tournament_view = ScriptedPlayerView(), ScriptedTournamentView()
+    player_manager = PlayerManager(player_view, db_manager)
+    tournament_manager = TournamentManager(tournament_view, db_manager)
+    timer = PhaseTimer()
+
+    registry = generate_players(size, seed)
+    labels = [f"{player.full_name} ({player.date_of_birth})" for player in registry]
+    gender_choices = {Gender.MALE: "1", Gender.FEMALE: "2"}
+    for player in registry:
+        player_view.script("1", player.first_name, player.last_name, gender_choices[Gender(player.gender)],
+                           player.date_of_birth, "")
+    for player, label in zip(registry, labels):
+        player_view.script("2", player.last_name, pick(label=label), "3", str(player.ranking))
+    player_view.script("3")
+    with timer.measure("registration"):
+        player_manager.run()
+
+    name, start_date = f"Simulation {size}", "01/10/2022"
+    tournament_view.script(name, "Paris", start_date, start_date, "Simulation", pick(value=TimeControl.BLITZ.value))
+    for player, label in zip(registry, labels):
+        tournament_view.script(player.last_name, pick(label=label), "")
+    with timer.measure("tournament_creation"):
+        tournament = tournament_manager._get_tournament_info()
+        tournament.number_of_turns = rounds
+        for _ in registry:
+            player_id = tournament_manager._select_a_player()
+            if player_id is not None:
+                tournament.players_id.append(player_id)
+        tournament_manager._save_tournament_and_update_players(tournament)
+    tournament_id = db_manager.get_objects_id(TOURNAMENTS_TABLE, [("name", name), ("start_date", start_date)])[0]
+
+    rankings = {player.doc_id: player.get("ranking", 0)
+                for player in db_manager.get_objects_by_id(PLAYERS_TABLE, tournament.players_id)}
+    standings = Standings(tournament.players_id, rounds, rankings)
+    for _ in range(rounds):
+        with timer.measure("pairing"):
+            tournament = Tournament.from_dict(db_manager.get_objects_by_id(TOURNAMENTS_TABLE, [tournament_id])[0])
+            _, current_round = tournament_manager._start_round(tournament_id, tournament)
+
+        matches = {match.doc_id: Match.from_dict(match)
+                   for match in db_manager.get_objects_by_id(MATCHES_TABLE, current_round.matches_id)}
+        results = {match_id: rand.choice((1, 0.5, 0)) for match_id, match in matches.items() if not match.is_bye}
+        with timer.measure("result_entry"):
+            if entry == "batch":
+                tournament_manager.record_results(tournament_id, list(results.items()))
+            else:
+                tournament_view.script(name, start_date, *(RESULT_CHOICES[score] for score in results.values()))
+                tournament_manager._open_tournament()
+
+        with timer.measure("standings"):
+            matches = [Match.from_dict(match)
+                       for match in db_manager.get_objects_by_id(MATCHES_TABLE, current_round.matches_id)]
+            standings.add_round([(match.player_1_id, match.player_2_id, match.score_1)
+                                 for match in matches if not match.is_bye],
+                                [match.player_1_id for match in matches if match.is_bye])
+            table = standings.table()
+
+    tournament = Tournament.from_dict(db_manager.get_objects_by_id(TOURNAMENTS_TABLE, [tournament_id])[0])
+    return {
+        "size": size,
+        "rounds": rounds,
+        "phases": timer.report(),
+        "total": sum(sum(measures) for measures in timer.measures.values()),
+        "players_registered": db_manager.count_objects_in_db(PLAYERS_TABLE),
+        "players_in_tournament": len(tournament.players_id),
+        "standings_rows": len(table),
+        "is_over": tournament.is_over,
+        "warnings": player_view.warnings + tournament_view.warnings,
+    }
+
+
+def simulate_in_process(size: int, rounds: int, seed: int, entry: str, backend: str,
+                        environment: Optional[dict[str, str]] = None) -> dict:
+    """
+    Simulation in a new Python process, on an empty database of the backend
+    :param environment: variables added to the environment of the process
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, **(environment or {}),
+                   CHESS_DB_BACKEND=backend, CHESS_DB_PATH=str(Path(directory) / "db"))
+        output = subprocess.run([sys.executable, "-c", SIMULATE.format(size=size, rounds=rounds, seed=seed,
+                                                                       entry=entry)],
+                                env=env, cwd=ROOTS, capture_output=True, text=True, check=True).stdout
+    # the result is the last line, the controllers may print before
+    return json.loads(output.splitlines()[-1])
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """:return: the phases slower than in the baseline by more than the tolerance (0.2 = 20 %)"""
+
+    baseline_results = {result["size"]: result for result in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        previous = baseline_results.get(result["size"])
+        if previous is None:
+            continue
+        for phase in PHASES:
+            before, after = previous["phases"][phase]["total"], result["phases"][phase]["total"]
+            if before and after > before * (1 + tolerance):
+                regressions.append(f"{result['size']} players, {phase}: {before * 1e3:.1f} ms -> "
+                                   f"{after * 1e3:.1f} ms (x{after / before:.2f})")
+    return regressions
+
+
+def run(sizes: list[int], rounds: int, seed: int, entry: str, backend: str) -> dict:
+    from Utils.lazy_import import lazy_import
+
+    report = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": lazy_import("numpy") is not None,
+        "backend": backend,
+        "entry": entry,
+        "seed": seed,
+        "results": [],
+    }
+    print(f"{'players':>8} | " + " | ".join(f"{phase:>19}" for phase in PHASES) + " |    total")
+    for size in sizes:
+        result = simulate_in_process(size, rounds, seed, entry, backend)
+        assert result["is_over"] and result["players_in_tournament"] == size and not result["warnings"], \
+            f"the simulation of {size} players did not go as scripted: {result['warnings'][:5]}"
+        report["results"].append(result)
+        print(f"{size:>8} | " + " | ".join(f"{result['phases'][phase]['total'] * 1e3:>16.1f} ms"
+                                           for phase in PHASES) + f" | {result['total']:>6.2f} s")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 256])
+    parser.add_argument("--rounds", type=int, default=9)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--entry", choices=("prompt", "batch"), default="prompt")
+    parser.add_argument("--backend", choices=("memory", "tinydb", "log", "sqlite"), default="memory")
+    parser.add_argument("--report", type=Path, default=None, help="JSON report to write")
+    parser.add_argument("--baseline", type=Path, default=None, help="previous JSON report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    simulation_report = run(args.sizes, args.rounds, args.seed, args.entry, args.backend)
+    if args.report is not None:
+        with open(args.report, "w", encoding="utf-8") as file:
+            json.dump(simulation_report, file, indent=4)
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as file:
+            slower = compare(simulation_report, json.load(file), args.tolerance)
+        print("\n".join(["Slower than the baseline:", *slower]) if slower else "No phase slower than the baseline")
@@ -0,0 +1,155 @@
+"""
+Bulk import of players from a CSV file or a JSON-lines file.
+
+Expected fields: first_name, last_name, gender (M/F), date_of_birth (dd/mm/yyyy)
+and optionally ranking.
+
+    python -m Controllers.player_import players.csv
+"""
+import csv
+import json
+import time
+from pathlib import Path
+from typing import Iterator, Union
+
+from DBManagers.db_manager import DBManager
+from Models.player import Player, Gender
+from Utils.exceptions import EmptyFieldError, NotValidDateError
+from Utils.instrumentation import instrumented
+from Utils.validators import check_not_empty_field, check_date_format
+
+
+class ImportReport:
+    """Outcome of an import"""
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.errors: list[tuple[int, str]] = []
+        self.duration = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.duration if self.duration else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.rows} lignes lues, {self.imported} joueurs importés, "
+                f"{self.duplicates} doublons, {len(self.errors)} erreurs "
+                f"({self.rows_per_second:,.0f} lignes/s)")
+
+
+@instrumented("controller", private=True)
+class PlayerImporter:
+
+    def __init__(self, db_manager: DBManager, players_table) -> None:
+        self.db_manager = db_manager
+        self.players_table = players_table
+
+    @staticmethod
+    def _read_rows(path: Path) -> Iterator[tuple[int, Union[dict, str]]]:
+        """
+        Stream the rows of a .csv file, or the lines of a JSON-lines file, decoded by _build_player
+        :return: (line number, row)
+        """
+
+        with open(path, encoding="utf-8", newline="") as file:
+            if path.suffix.lower() == ".csv":
+                reader = csv.DictReader(file)
+                for row in reader:
+                    yield reader.line_num, row
+                return
+            for line_number, line in enumerate(file, start=1):
+                if line.strip():
+                    yield line_number, line
+
+    @staticmethod
+    def _name(row: dict, field: str) -> str:
+        """:raise ValueError, EmptyFieldError: the name is not a string, or is empty"""
+
+        value = row.get(field) or ""
+        if not isinstance(value, str):
+            raise ValueError(f"{field} doit être du texte, pas {type(value).__name__}.")
+        return check_not_empty_field(value)
+
+    @classmethod
+    def _build_player(cls, row: Union[dict, str]) -> Player:
+        """
+        Check a row with the rules of the interactive prompts
+        :param row: raw row, a JSON line is decoded first
+        :return: player ready to be saved
+        :raise ValueError, EmptyFieldError, NotValidDateError: invalid row
+        """
+
+        if isinstance(row, str):
+            row = json.loads(row)
+        if not isinstance(row, dict):
+            raise ValueError(f"Un objet JSON est attendu, pas {type(row).__name__}.")
+        ranking = row.get("ranking") or 0
+        try:
+            ranking = int(ranking)
+        except TypeError:
+            raise ValueError(f"Le classement doit être un nombre, pas {type(ranking).__name__}.")
+        return Player(
+            first_name=cls._name(row, "first_name"),
+            last_name=cls._name(row, "last_name"),
+            gender=Gender(row.get("gender")).value,
+            date_of_birth=check_date_format(row.get("date_of_birth")),
+            ranking=ranking,
+        )
+
+    def _is_known(self, player: Player) -> bool:
+        """Look the full name up in the players, with the (first_name, last_name) index"""
+
+        search_values = [("first_name", player.first_name), ("last_name", player.last_name)]
+        return self.db_manager.is_object_exist(self.players_table, search_values)
+
+    def import_file(self, path: Union[Path, str]) -> ImportReport:
+        """
+        Import all valid and unknown players of a file in a single write.
+        A player is a duplicate if his first and last names are already known.
+        :param path: .csv or JSON-lines file
+        :return: import report
+        """
+
+        report = ImportReport()
+        start = time.perf_counter()
+
+        # full names of the players of the file, already checked
+        seen_full_names = set()
+        players_data = []
+        for line_number, row in self._read_rows(Path(path)):
+            report.rows += 1
+            try:
+                player = self._build_player(row)
+            except (ValueError, EmptyFieldError, NotValidDateError) as e:
+                report.errors.append((line_number, str(e)))
+                continue
+
+            full_name = (player.first_name, player.last_name)
+            if full_name in seen_full_names or self._is_known(player):
+                report.duplicates += 1
+                continue
+            seen_full_names.add(full_name)
+            players_data.append(player.player_data)
+
+        if players_data:
+            self.db_manager.save_many(self.players_table, players_data)
+        report.imported = len(players_data)
+        report.duration = time.perf_counter() - start
+        return report
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from Settings.db_config import PLAYERS_TABLE, get_db_manager
+
+    parser = argparse.ArgumentParser(description="Import players from a CSV or JSON-lines file")
+    parser.add_argument("path", type=Path)
+    args = parser.parse_args()
+
+    import_report = PlayerImporter(get_db_manager(), PLAYERS_TABLE).import_file(args.path)
+    for error_line, error in import_report.errors:
+        print(f"Ligne {error_line}: {error}")
+    print(import_report)
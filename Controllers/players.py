@@ -1,15 +1,16 @@
-import datetime
 import sys
 
 from DBManagers.db_manager import DBManager
 from Models.player import Player, Gender
 from Settings.db_config import PLAYERS_TABLE
-from Utils.exceptions import NotValidChoiceError, EmptyFieldError
-from Utils.validators import check_multiple_choice, check_not_empty_field
-from Views.ConsoleLineViews.players import ConsoleLinePlayerView
+from Settings.project_config import PLAYER_SEARCH_RESULTS
+from Utils.exceptions import NotValidChoiceError, EmptyFieldError, NotValidDateError
+from Utils.instrumentation import instrumented
+from Utils.validators import check_multiple_choice, check_not_empty_field, check_date_format
 from Views.player_view import PlayerView
 
 
+@instrumented("controller", private=True)
 class PlayerManager:
 
     def __init__(self, player_view: PlayerView, db_manager: DBManager) -> None:
@@ -71,10 +72,9 @@ class PlayerManager:
             label = "date de naissance"
             user_choice = self.view.prompt_for_str_field(text=text, label=label)
             try:
-                datetime.datetime.strptime(user_choice, '%d/%m/%Y')
-                return user_choice
-            except ValueError:
-                self.view.warning(text="La date doit être saisie au format dd/mm/yyyy.")
+                return check_date_format(user_choice)
+            except NotValidDateError as e:
+                self.view.warning(text=str(e))
 
     def _get_full_name_player(self) -> tuple[str, str]:
         first_name = self._get_first_name()
@@ -106,7 +106,7 @@ class PlayerManager:
         search_values = [
             ("first_name", player.first_name), ("last_name", player.last_name)
         ]
-        if db_manager.is_object_exist(PLAYERS_TABLE, search_values):
+        if self.db_manager.is_object_exist(PLAYERS_TABLE, search_values):
             self.view.warning(text="Ce joueur est déjà connu dans la base de données.")
             return False
 
@@ -141,7 +141,7 @@ class PlayerManager:
         :return: new value
         """
 
-        text = f"Modifier {field} (valeur : {instance.player_data[field]})"
+        text = f"Modifier {field} (valeur : {getattr(instance, field)})"
         while True:
             field_value = self.view.prompt_for_str_field(text=text,
                                                          label=field)
@@ -156,25 +156,45 @@ class PlayerManager:
                 except ValueError:
                     self.view.warning(text="Veuillez renseigner un nombre entier.")
 
+    def _select_player(self) -> None | int:
+        """
+        Search for a player by name: start of the name or close spelling, accents and case ignored.
+        The user chooses among the candidates found.
+        :return: Player id in db if found else None
+        """
+
+        text = self.view.prompt_for_str_field(
+            text="Nom et/ou prénom du joueur (début du nom ou orthographe approchante)", label="joueur"
+        )
+        players_id = self.db_manager.search_names(PLAYERS_TABLE, text, limit=PLAYER_SEARCH_RESULTS) if text else []
+        if not players_id:
+            self.view.warning(text="Joueur non trouvé.")
+            return None
+
+        choices = [(str(number), f"{Player.from_dict(player).full_name} ({player['date_of_birth']})", player.doc_id)
+                   for number, player in enumerate(self.db_manager.get_objects_by_id(PLAYERS_TABLE, players_id),
+                                                   start=1)]
+        choices.append((str(len(choices) + 1), "Aucun de ces joueurs", None))
+        while True:
+            user_choice = self.view.prompt_for_multiple_choices_field(text="Sélectionnez le joueur",
+                                                                      choices=choices)
+            try:
+                return check_multiple_choice(user_choice, choices)
+            except NotValidChoiceError:
+                self.view.warning(invalid_choice=True)
+
     def _update_player(self) -> bool:
         """
-        Get a player by full name
+        Search a player by name
         Then Get a field and update with new value
         :return: True for success | False in case of failure
         """
 
         self.view.information(text="Modification d'un joueur.")
-        full_name = self._get_full_name_player()
-        search_values = [
-            ("first_name", full_name[0]), ("last_name", full_name[1])
-        ]
-
-        if not self.db_manager.is_object_exist(PLAYERS_TABLE, search_values):
+        player_id = self._select_player()
+        if player_id is None:
             return False
-
-        object_player = self.db_manager.get_object(PLAYERS_TABLE, search_values)
-        player = Player(**object_player)
-        player_id = object_player.doc_id
+        player = self.db_manager.get_model(PLAYERS_TABLE, player_id, Player)
 
         field_to_update = self._get_field_to_update()
         new_value = self._get_new_field_value(field=field_to_update, instance=player)
@@ -213,8 +233,9 @@ class PlayerManager:
 
 
 if __name__ == '__main__':
-    from DBManagers.tiny_manager import TinyManager
+    from Settings.db_config import get_db_manager
+    from Views.ConsoleLineViews.players import ConsoleLinePlayerView
 
-    db_manager = TinyManager()
+    db_manager = get_db_manager()
     player_controller = PlayerManager(ConsoleLinePlayerView, db_manager)
     player_controller.run()
@@ -0,0 +1,104 @@
+"""
+Elo rating of the players after their tournaments.
+
+A finished tournament is rated once: the new rankings of its players are
+written with one bulk write. The whole history can also be recomputed from
+the rankings the players had before their first rated tournament
+(initial_ranking), for example after a correction of a result.
+
+    python -m Controllers.ratings recompute
+"""
+from typing import Optional
+
+from DBManagers.db_manager import DBManager
+from Engines.elo import EloEngine, Game
+from Models.match import Match
+from Models.round import Round
+from Models.tournament import Tournament
+from Settings.db_config import MATCHES_TABLE, PLAYERS_TABLE, ROUNDS_TABLE, TOURNAMENTS_TABLE
+from Utils.instrumentation import instrumented
+from Utils.sort_keys import date_key
+
+
+@instrumented("controller", private=True)
+class RatingManager:
+
+    def __init__(self, db_manager: DBManager, engine: Optional[EloEngine] = None) -> None:
+        self.db_manager = db_manager
+        self.engine = engine or EloEngine()
+
+    def _tournament_games(self, tournament: Tournament) -> list[Game]:
+        """Finished games of a tournament, byes excluded"""
+
+        rounds = [Round.from_dict(document)
+                  for document in self.db_manager.get_objects_by_id(ROUNDS_TABLE, tournament.turns_id)]
+        matches_id = [match_id for tournament_round in rounds for match_id in tournament_round.matches_id]
+        matches = [Match.from_dict(document)
+                   for document in self.db_manager.get_objects_by_id(MATCHES_TABLE, matches_id)]
+        return [(match.player_1_id, match.player_2_id, match.score_1)
+                for match in matches if match.is_finished and not match.is_bye]
+
+    def rate_tournament(self, tournament_id: int) -> dict[int, int]:
+        """
+        Rate a finished tournament, once
+        :return: player id -> new ranking, empty if the tournament is not over or already rated
+        """
+
+        documents = self.db_manager.get_objects_by_id(TOURNAMENTS_TABLE, [tournament_id])
+        if not documents or not documents[0].get("is_over") or documents[0].get("is_rated"):
+            return {}
+        tournament = Tournament.from_dict(documents[0])
+
+        players = self.db_manager.get_objects_by_id(PLAYERS_TABLE, tournament.players_id)
+        rankings = {player.doc_id: player.get("ranking", 0) for player in players}
+        births = {player.doc_id: player.get("date_of_birth") for player in players}
+        new_rankings = self.engine.rate_period(rankings, births, self._tournament_games(tournament),
+                                               tournament.start_date)
+
+        new_values = {player_id: {"ranking": ranking} for player_id, ranking in new_rankings.items()}
+        for player in players:
+            if "initial_ranking" not in player:
+                new_values.setdefault(player.doc_id, {})["initial_ranking"] = rankings[player.doc_id]
+        self.db_manager.update_many(PLAYERS_TABLE, new_values)
+        self.db_manager.update_attribute(TOURNAMENTS_TABLE, "is_rated", True, tournament_id)
+        return new_rankings
+
+    def recompute_all(self, batch_size: int = 10_000) -> dict[int, int]:
+        """
+        Rate again every finished tournament, in chronological order, from the
+        initial rankings. The rankings changed are written batch_size players at a time.
+        :return: player id -> new ranking, for the players whose ranking changed
+        """
+
+        tournaments = [(date_key(document["start_date"]), document.doc_id, Tournament.from_dict(document))
+                       for document in self.db_manager.iter_objects(TOURNAMENTS_TABLE, [("is_over", True)])]
+        tournaments.sort(key=lambda item: item[:2])
+        periods = [(tournament.start_date, self._tournament_games(tournament)) for _, _, tournament in tournaments]
+        played = {player_id for _, games in periods for game in games for player_id in game[:2]}
+
+        rankings, initial_rankings, births = {}, {}, {}
+        for player in self.db_manager.iter_objects(PLAYERS_TABLE):
+            if player.doc_id in played:
+                rankings[player.doc_id] = player.get("ranking", 0)
+                initial_rankings[player.doc_id] = player.get("initial_ranking", rankings[player.doc_id])
+                births[player.doc_id] = player.get("date_of_birth")
+
+        new_rankings = self.engine.recompute(initial_rankings, births, periods)
+        changed = [(player_id, ranking) for player_id, ranking in new_rankings.items()
+                   if ranking != rankings[player_id]]
+        for start in range(0, len(changed), batch_size):
+            self.db_manager.update_attribute_values(PLAYERS_TABLE, "ranking", dict(changed[start:start + batch_size]))
+        return dict(changed)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from Settings.db_config import get_db_manager
+
+    parser = argparse.ArgumentParser(description="Elo ratings of the players")
+    parser.add_argument("action", choices=["recompute"])
+    args = parser.parse_args()
+
+    changed_rankings = RatingManager(get_db_manager()).recompute_all()
+    print(f"{len(changed_rankings)} classements modifiés")
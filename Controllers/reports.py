@@ -0,0 +1,286 @@
+"""
+Reports and exports: players, tournaments, rounds and matches.
+
+Each report is a pipeline of generators over the db manager:
+
+    documents (iter_objects, filtered with the conditions of DBManagers.query)
+    -> rows (the columns of the report)
+    -> sort (Utils.external_sort: sorted runs on disk beyond buffer_size rows)
+    -> format (CSV, JSON-lines or fixed-width text), written to a file or stdout
+
+Rows are produced and written one at a time, so exporting a registry of a
+million players holds at most buffer_size rows, as long as the backend streams
+its table (SQLite reads it by batches, the TinyDB files are loaded whole).
+The players CSV has the columns read by Controllers.player_import.
+
+    python -m Controllers.reports players --sort ranking --format csv --output players.csv
+    python -m Controllers.reports matches --tournament "Tournoi de Chaville"
+"""
+import csv
+import json
+import sys
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import IO, Callable, Iterable, Iterator, Optional, Union
+
+from DBManagers.db_manager import DBManager
+from Models.player import Player
+from Settings.db_config import TOURNAMENTS_TABLE, PLAYERS_TABLE, ROUNDS_TABLE, MATCHES_TABLE
+from Utils.external_sort import DEFAULT_BUFFER_SIZE, external_sort
+from Utils.instrumentation import instrumented
+from Utils.sort_keys import date_key, fold, name_key
+
+# (column, width in the fixed-width text format)
+Columns = tuple[tuple[str, int], ...]
+
+PLAYER_COLUMNS: Columns = (
+    ("id", 8), ("last_name", 24), ("first_name", 20), ("gender", 7), ("date_of_birth", 14), ("ranking", 8),
+)
+TOURNAMENT_COLUMNS: Columns = (
+    ("id", 6), ("name", 30), ("place", 20), ("start_date", 11), ("end_date", 11), ("time_control", 13),
+    ("number_of_turns", 16), ("current_turn", 13), ("is_over", 8), ("players", 8),
+)
+ROUND_COLUMNS: Columns = (
+    ("tournament", 30), ("round", 6), ("start_datetime", 17), ("end_datetime", 17), ("matches", 8),
+)
+MATCH_COLUMNS: Columns = (
+    ("tournament", 30), ("round", 6), ("table", 6), ("player_1", 30), ("player_2", 30),
+    ("score_1", 8), ("score_2", 8), ("is_finished", 12),
+)
+REPORTS: dict[str, Columns] = {
+    "players": PLAYER_COLUMNS,
+    "tournaments": TOURNAMENT_COLUMNS,
+    "rounds": ROUND_COLUMNS,
+    "matches": MATCH_COLUMNS,
+}
+
+
+def _name_key(row: dict) -> str:
+    """Alphabetical order of the full names, accents and case ignored"""
+
+    return name_key(row["first_name"], row["last_name"])
+
+
+# sort keys of the rows, None keeps the order of the table
+PLAYER_ORDERS: dict[str, Optional[Callable[[dict], object]]] = {
+    "name": _name_key,
+    "ranking": lambda row: (-row["ranking"], _name_key(row)),
+    "id": None,
+}
+TOURNAMENT_ORDERS: dict[str, Optional[Callable[[dict], object]]] = {
+    "date": lambda row: (date_key(row["start_date"]), fold(row["name"])),
+    "name": lambda row: (fold(row["name"]), date_key(row["start_date"])),
+    "id": None,
+}
+
+
+def write_csv(rows: Iterable[dict], columns: Columns, file: IO[str]) -> int:
+    writer = csv.DictWriter(file, fieldnames=[name for name, _ in columns], extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+    return count
+
+
+def write_jsonl(rows: Iterable[dict], columns: Columns, file: IO[str]) -> int:
+    names = [name for name, _ in columns]
+    count = 0
+    for count, row in enumerate(rows, start=1):
+        file.write(json.dumps({name: row[name] for name in names}, ensure_ascii=False))
+        file.write("\n")
+    return count
+
+
+def write_text(rows: Iterable[dict], columns: Columns, file: IO[str]) -> int:
+    """Fixed-width columns, numbers aligned on the right, values too long cut"""
+
+    file.write("".join(name[:width - 1].ljust(width) for name, width in columns).rstrip() + "\n")
+    file.write("".join("-" * (width - 1) + " " for _, width in columns).rstrip() + "\n")
+    count = 0
+    for count, row in enumerate(rows, start=1):
+        cells = []
+        for name, width in columns:
+            value = row[name]
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                cells.append(str(value)[:width - 1].rjust(width - 1) + " ")
+            else:
+                cells.append(("" if value is None else str(value))[:width - 1].ljust(width))
+        file.write("".join(cells).rstrip() + "\n")
+    return count
+
+
+FORMATS: dict[str, Callable[[Iterable[dict], Columns, IO[str]], int]] = {
+    "csv": write_csv,
+    "jsonl": write_jsonl,
+    "text": write_text,
+}
+
+
+class ExportReport:
+    """Outcome of an export"""
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.duration = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.duration if self.duration else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.rows} lignes exportées en {self.duration:.2f} s ({self.rows_per_second:,.0f} lignes/s)"
+
+
+@instrumented("controller", private=True)
+class ReportManager:
+
+    def __init__(self, db_manager: DBManager, buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        """:param buffer_size: rows sorted in memory, beyond them sorted runs are written to disk"""
+
+        self.db_manager = db_manager
+        self.buffer_size = buffer_size
+
+    def _sort(self, rows: Iterator[dict], key: Optional[Callable[[dict], object]]) -> Iterator[dict]:
+        if key is None:
+            return rows
+        return external_sort(rows, key=key, buffer_size=self.buffer_size)
+
+    def players(self, order: str = "name", values: Optional[list] = None) -> Iterator[dict]:
+        """
+        Players alphabetically ("name"), by ranking then name ("ranking") or in the order of the table ("id")
+        :param values: search conditions, see DBManagers.query
+        """
+
+        rows = ({"id": player.doc_id,
+                 "last_name": player["last_name"],
+                 "first_name": player["first_name"],
+                 "gender": player["gender"],
+                 "date_of_birth": player["date_of_birth"],
+                 "ranking": player.get("ranking", 0)}
+                for player in self.db_manager.iter_objects(PLAYERS_TABLE, values))
+        return self._sort(rows, PLAYER_ORDERS[order])
+
+    def tournaments(self, order: str = "date", values: Optional[list] = None) -> Iterator[dict]:
+        """Tournaments chronologically ("date"), by name ("name") or in the order of the table ("id")"""
+
+        rows = ({"id": tournament.doc_id,
+                 "name": tournament["name"],
+                 "place": tournament["place"],
+                 "start_date": tournament["start_date"],
+                 "end_date": tournament["end_date"],
+                 "time_control": tournament["time_control"],
+                 "number_of_turns": tournament.get("number_of_turns"),
+                 "current_turn": tournament.get("current_turn"),
+                 "is_over": tournament.get("is_over", False),
+                 "players": len(tournament.get("players_id") or [])}
+                for tournament in self.db_manager.iter_objects(TOURNAMENTS_TABLE, values))
+        return self._sort(rows, TOURNAMENT_ORDERS[order])
+
+    def _rounds_by_tournament(self, tournaments_id: Optional[list[int]]) -> Iterator[tuple[dict, list]]:
+        """(tournament, its rounds in play order), tournaments chronologically when no id is given"""
+
+        if tournaments_id is None:
+            tournaments_id = [row["id"] for row in self.tournaments("date")]
+        for tournament in self.db_manager.get_objects_by_id(TOURNAMENTS_TABLE, tournaments_id):
+            yield tournament, self.db_manager.get_objects_by_id(ROUNDS_TABLE, tournament.get("turns_id") or [])
+
+    def rounds(self, tournaments_id: Optional[list[int]] = None) -> Iterator[dict]:
+        """Rounds of the tournaments, of all of them chronologically when no id is given"""
+
+        for tournament, rounds in self._rounds_by_tournament(tournaments_id):
+            for played_round in rounds:
+                yield {"tournament": tournament["name"],
+                       "round": played_round["number"],
+                       "start_datetime": played_round.get("start_datetime"),
+                       "end_datetime": played_round.get("end_datetime"),
+                       "matches": len(played_round.get("matches_id") or [])}
+
+    def matches(self, tournaments_id: Optional[list[int]] = None) -> Iterator[dict]:
+        """
+        Matches of the tournaments, round by round and table by table.
+        The players are read round by round, for their names.
+        """
+
+        for tournament, rounds in self._rounds_by_tournament(tournaments_id):
+            for played_round in rounds:
+                matches = self.db_manager.get_objects_by_id(MATCHES_TABLE, played_round.get("matches_id") or [])
+                players_id = {player_id for match in matches
+                              for player_id in (match["player_1_id"], match.get("player_2_id"))
+                              if player_id is not None}
+                names = {player.doc_id: Player.from_dict(player).full_name
+                         for player in self.db_manager.get_objects_by_id(PLAYERS_TABLE, list(players_id))}
+                for table_number, match in enumerate(matches, start=1):
+                    player_2_id = match.get("player_2_id")
+                    yield {"tournament": tournament["name"],
+                           "round": played_round["number"],
+                           "table": table_number,
+                           "player_1": names.get(match["player_1_id"], ""),
+                           "player_2": "Exempt" if player_2_id is None else names.get(player_2_id, ""),
+                           "score_1": match.get("score_1"),
+                           "score_2": match.get("score_2"),
+                           "is_finished": match.get("is_finished", False)}
+
+    def export(self, rows: Iterable[dict], columns: Columns, output: Union[Path, str, IO[str]],
+               format_name: str = "csv") -> ExportReport:
+        """
+        Write the rows of a report as they are produced
+        :param output: path of the file, "-" for stdout, or an open text file
+        :param format_name: one of FORMATS
+        """
+
+        report = ExportReport()
+        start = time.perf_counter()
+        if output == "-":
+            context = nullcontext(sys.stdout)
+        elif isinstance(output, (str, Path)):
+            context = open(output, "w", encoding="utf-8", newline="", buffering=1 << 20)
+        else:
+            context = nullcontext(output)
+        with context as file:
+            report.rows = FORMATS[format_name](rows, columns, file)
+        report.duration = time.perf_counter() - start
+        return report
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from Settings.db_config import get_db_manager
+
+    parser = argparse.ArgumentParser(description="Export a report of players, tournaments, rounds or matches")
+    parser.add_argument("report", choices=REPORTS)
+    parser.add_argument("--format", choices=FORMATS, default="text")
+    parser.add_argument("--output", default="-", help="file to write, stdout by default")
+    parser.add_argument("--sort", default=None,
+                        help=f"players: {', '.join(PLAYER_ORDERS)}; tournaments: {', '.join(TOURNAMENT_ORDERS)}")
+    parser.add_argument("--where", nargs=2, action="append", default=[], metavar=("FIELD", "VALUE"),
+                        help="players and tournaments whose field equals the value (a JSON value or a text)")
+    parser.add_argument("--tournament", default=None, help="rounds and matches of the tournaments of this name")
+    parser.add_argument("--buffer-size", type=int, default=DEFAULT_BUFFER_SIZE)
+    args = parser.parse_args()
+
+    def _value(text: str):
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
+
+    db_manager = get_db_manager()
+    report_manager = ReportManager(db_manager, args.buffer_size)
+    conditions = [(field, _value(value)) for field, value in args.where]
+    if args.report in ("players", "tournaments"):
+        orders = PLAYER_ORDERS if args.report == "players" else TOURNAMENT_ORDERS
+        order = args.sort or next(iter(orders))
+        if order not in orders:
+            parser.error(f"--sort of the {args.report}: {', '.join(orders)}")
+        report_rows = getattr(report_manager, args.report)(order, conditions)
+    else:
+        selected = None
+        if args.tournament is not None:
+            selected = db_manager.get_objects_id(TOURNAMENTS_TABLE, [("name", args.tournament)])
+        report_rows = getattr(report_manager, args.report)(selected)
+
+    export_report = report_manager.export(report_rows, REPORTS[args.report], args.output, args.format)
+    print(export_report, file=sys.stderr)
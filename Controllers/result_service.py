@@ -0,0 +1,147 @@
+"""
+Asyncio service receiving match results from many boards at once.
+
+Clients open a TCP connection and send one JSON object per line:
+    {"tournament_id": 1, "match_id": 12, "result": 0.5}
+where result is the points of the first player (1, 0.5 or 0). Each line gets
+one JSON line back: {"match_id": 12, "status": "OK"}.
+
+Results are queued per tournament. One worker per tournament drains its queue
+in batches and records each batch through TournamentManager.record_results,
+so the updates of a tournament are serialized. A full queue suspends the
+readers of the connections (back-pressure). The db managers are not
+thread-safe: every batch goes through a single writer thread.
+
+    python -m Controllers.result_service --port 8765
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+from Controllers.tournament import TournamentManager
+from Utils.instrumentation import instrumented
+
+
+@instrumented("controller")
+class ResultService:
+
+    def __init__(self, tournament_manager: TournamentManager, queue_size: int = 256, batch_size: int = 64) -> None:
+        """
+        :param tournament_manager: records the results in the db
+        :param queue_size: pending results per tournament before the clients are suspended
+        :param batch_size: results recorded per batch
+        """
+
+        self.tournament_manager = tournament_manager
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self._queues: dict[int, asyncio.Queue] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self.batches = 0
+
+    def _get_queue(self, tournament_id: int) -> asyncio.Queue:
+        if tournament_id not in self._queues:
+            queue = asyncio.Queue(maxsize=self.queue_size)
+            self._queues[tournament_id] = queue
+            self._workers[tournament_id] = asyncio.create_task(self._record(tournament_id, queue))
+        return self._queues[tournament_id]
+
+    async def submit(self, tournament_id: int, match_id: int, score_1: float) -> str:
+        """Queue a result and wait until it is recorded, return its status"""
+
+        future = asyncio.get_running_loop().create_future()
+        await self._get_queue(tournament_id).put((match_id, score_1, future))
+        return await future
+
+    async def _record(self, tournament_id: int, queue: asyncio.Queue) -> None:
+        """Worker of a tournament: record the queued results batch after batch"""
+
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            results = [(match_id, score_1) for match_id, score_1, _ in batch]
+            try:
+                statuses = await loop.run_in_executor(
+                    self._writer, self.tournament_manager.record_results, tournament_id, results
+                )
+            except Exception as e:
+                statuses = [f"Erreur: {e}"] * len(batch)
+            self.batches += 1
+
+            for (_, _, future), status in zip(batch, statuses):
+                if not future.done():
+                    future.set_result(status)
+                queue.task_done()
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        while line := await reader.readline():
+            try:
+                request = json.loads(line)
+                tournament_id = int(request["tournament_id"])
+                match_id = int(request["match_id"])
+                score_1 = float(request["result"])
+            except (ValueError, KeyError, TypeError):
+                response = {"match_id": None, "status": "Requête non valide."}
+            else:
+                status = await self.submit(tournament_id, match_id, score_1)
+                response = {"match_id": match_id, "status": status}
+            writer.write((json.dumps(response, ensure_ascii=False) + "\n").encode())
+            await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle_client, host, port)
+
+    async def close(self) -> None:
+        """Wait for the queued results, then stop the workers"""
+
+        for queue in self._queues.values():
+            await queue.join()
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._writer.shutdown(wait=True)
+
+
+async def send_results(host: str, port: int, requests: Iterable[dict]) -> list[dict]:
+    """Client: send results on one connection, one after the other, and return the responses"""
+
+    reader, writer = await asyncio.open_connection(host, port)
+    responses = []
+    for request in requests:
+        writer.write((json.dumps(request) + "\n").encode())
+        await writer.drain()
+        responses.append(json.loads(await reader.readline()))
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+
+if __name__ == '__main__':
+    import argparse
+    import logging
+
+    from Settings.db_config import get_db_manager
+    from Views.ServiceViews.tournament import ServiceTournamentView
+
+    parser = argparse.ArgumentParser(description="Match results service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def main():
+        service = ResultService(TournamentManager(ServiceTournamentView, get_db_manager()),
+                                batch_size=args.batch_size)
+        server = await service.start(args.host, args.port)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
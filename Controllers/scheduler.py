@@ -0,0 +1,115 @@
+"""
+Pairing of the next turn of every tournament ready for it, in parallel.
+
+A tournament is ready when it is not over and has no round in progress.
+Each section is paired in a worker process, which only receives compact
+tuples (player id, score, ranking, opponents, had bye). The new rounds are
+then saved together through TournamentManager.save_rounds.
+
+    python -m Controllers.scheduler --workers 4
+"""
+from typing import Optional
+
+from Controllers.tournament import TournamentManager
+from Engines.pairing import Pairing, PairingPlayer, SwissPairing
+from Models.round import Round
+from Models.tournament import Tournament
+from Settings.db_config import PLAYERS_TABLE, ROUNDS_TABLE, TOURNAMENTS_TABLE
+from Utils.instrumentation import instrumented
+
+CompactPlayer = tuple[int, float, int, tuple[int, ...], bool]
+
+
+def pair_section(players: list[CompactPlayer]) -> tuple[list[tuple[int, int]], Optional[int], int]:
+    """Worker: pair one section, return (pairs, bye, rematches)"""
+
+    pairing = SwissPairing().pair(PairingPlayer(*player) for player in players)
+    return pairing.pairs, pairing.bye, pairing.rematches
+
+
+def pair_sections(sections: list[list[CompactPlayer]], max_workers: Optional[int] = None) -> list[Pairing]:
+    """Pair every section, in worker processes when there is more than one"""
+
+    if max_workers == 1 or len(sections) < 2:
+        results = [pair_section(section) for section in sections]
+    else:
+        # imported here: it takes as long to import as the rest of the controllers
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(pair_section, sections))
+    return [Pairing(pairs, bye, rematches) for pairs, bye, rematches in results]
+
+
+@instrumented("controller", private=True)
+class RoundScheduler:
+
+    def __init__(self, tournament_manager: TournamentManager, max_workers: Optional[int] = None) -> None:
+        """
+        :param tournament_manager: saves the new rounds
+        :param max_workers: worker processes, None for the number of CPUs, 1 to pair in this process
+        """
+
+        self.tournament_manager = tournament_manager
+        self.db_manager = tournament_manager.db_manager
+        self.max_workers = max_workers
+
+    def ready_tournaments(self) -> list[tuple[int, Tournament]]:
+        """Tournaments not over and without a round in progress"""
+
+        tournaments_id = self.db_manager.get_objects_id(TOURNAMENTS_TABLE, [("is_over", False)])
+        tournaments = [(document.doc_id, Tournament.from_dict(document))
+                       for document in self.db_manager.get_objects_by_id(TOURNAMENTS_TABLE, tournaments_id)]
+
+        last_rounds_id = [tournament.turns_id[-1] for _, tournament in tournaments if tournament.turns_id]
+        unfinished_rounds_id = {document.doc_id
+                                for document in self.db_manager.get_objects_by_id(ROUNDS_TABLE, last_rounds_id)
+                                if not Round.from_dict(document).is_finished}
+        return [(tournament_id, tournament) for tournament_id, tournament in tournaments
+                if not tournament.turns_id or tournament.turns_id[-1] not in unfinished_rounds_id]
+
+    @staticmethod
+    def compact_players(players: list) -> list[CompactPlayer]:
+        return [(player.doc_id,
+                 player.get("tournament_score", 0),
+                 player.get("ranking", 0),
+                 tuple(player.get("players_already_faced", [])),
+                 player.get("had_bye", False))
+                for player in players]
+
+    def run(self) -> list[tuple[int, Round]]:
+        """
+        Pair and save the next round of every ready tournament
+        :return: (round id, round) of the new rounds
+        """
+
+        tournaments = self.ready_tournaments()
+        if not tournaments:
+            return []
+
+        players_id = [player_id for _, tournament in tournaments for player_id in tournament.players_id]
+        players = {player.doc_id: player
+                   for player in self.db_manager.get_objects_by_id(PLAYERS_TABLE, players_id)}
+        sections_players = [[players[player_id] for player_id in tournament.players_id if player_id in players]
+                            for _, tournament in tournaments]
+
+        pairings = pair_sections([self.compact_players(section) for section in sections_players], self.max_workers)
+        return self.tournament_manager.save_rounds([
+            (tournament_id, tournament, section_players, pairing)
+            for (tournament_id, tournament), section_players, pairing in zip(tournaments, sections_players, pairings)
+        ])
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from Settings.db_config import get_db_manager
+    from Views.ServiceViews.tournament import ServiceTournamentView
+
+    parser = argparse.ArgumentParser(description="Pair the next turn of every ready tournament")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    scheduler = RoundScheduler(TournamentManager(ServiceTournamentView, get_db_manager()), args.workers)
+    for new_round_id, new_round in scheduler.run():
+        print(f"Tournois {new_round.tournament_id}: {new_round} ({len(new_round.matches_id)} matchs)")
@@ -1,17 +1,22 @@
-import datetime
 import sys
 
-from DBManagers.db_manager import DBManager
+from Controllers.ratings import RatingManager
+from DBManagers.db_manager import VERSION_FIELD, DBManager, retry_on_conflict
+from DBManagers.operations import Append, Increment
+from Engines.pairing import Pairing, PairingPlayer, SwissPairing
+from Models.match import Match
 from Models.player import Player
+from Models.round import Round
 from Models.tournament import Tournament, TimeControl
-from Settings.db_config import TOURNAMENTS_TABLE, PLAYERS_TABLE
-from Settings.project_config import NUMBERS_OF_PLAYERS
-from Utils.exceptions import NotValidChoiceError, EmptyFieldError
-from Utils.validators import check_multiple_choice, check_not_empty_field
-from Views.ConsoleLineViews.tournament import TournamentLinePlayerView
+from Settings.db_config import TOURNAMENTS_TABLE, PLAYERS_TABLE, ROUNDS_TABLE, MATCHES_TABLE
+from Settings.project_config import NUMBERS_OF_PLAYERS, PLAYER_SEARCH_RESULTS
+from Utils.exceptions import NotValidChoiceError, EmptyFieldError, NotValidDateError, VersionConflictError
+from Utils.instrumentation import instrumented
+from Utils.validators import check_multiple_choice, check_not_empty_field, check_date_format
 from Views.tournament_view import TournamentView
 
 
+@instrumented("controller", private=True)
 class TournamentManager:
 
     def __init__(self, tournament_view: TournamentView, db_manager: DBManager) -> None:
@@ -44,10 +49,9 @@ class TournamentManager:
         while True:
             user_choice = self.view.prompt_for_str_field(text=text, label=label)
             try:
-                datetime.datetime.strptime(user_choice, '%d/%m/%Y')
-                return user_choice
-            except ValueError:
-                self.view.warning(text="La date doit être saisie au format dd/mm/yyyy.")
+                return check_date_format(user_choice)
+            except NotValidDateError as e:
+                self.view.warning(text=str(e))
 
     def _get_answer_in_multi_choices(self, text: str, choices: list) -> str:
         """
@@ -78,10 +82,7 @@ class TournamentManager:
             self.view.warning(text="Il n'y a pas assez de joueur enregistré pour créer un tournois")
             return False
 
-        players_in_db: list = self.db_manager.get_all_objects_from_table(PLAYERS_TABLE)
-        free_players = len(
-            ["" for player in players_in_db if not player['is_already_in_a_tournament']]
-        )
+        free_players = self.db_manager.count_objects(PLAYERS_TABLE, [("is_already_in_a_tournament", False)])
         if free_players < NUMBERS_OF_PLAYERS:
             self.view.warning(text="Il n'y a pas assez de joueur disponible pour créer un tournois")
             return False
@@ -90,11 +91,12 @@ class TournamentManager:
 
     def _are_conditions_met_to_start_tournament(self) -> bool:
         """
-        Checks if the conditions are met to be able to load a tournament.
+        Checks if the conditions are met to be able to load a tournament:
+        at least one tournament is not over.
         :return: True if all conditions are met else False
         """
 
-        if self.db_manager.count_objects_in_db(TOURNAMENTS_TABLE) == 0:
+        if self.db_manager.count_objects(TOURNAMENTS_TABLE, [("is_over", False)]) == 0:
             return False
         return True
 
@@ -142,13 +144,9 @@ class TournamentManager:
         return self._get_not_empty_str(text="Description du tournois",
                                        label="description")
 
-    def _get_player_first_name(self) -> str:
-        return self._get_not_empty_str(text="Prénom du joueur",
-                                       label="prenom")
-
-    def _get_player_last_name(self) -> str:
-        return self._get_not_empty_str(text="Nom de famille du joueur",
-                                       label="nom de famille")
+    def _get_player_search_text(self) -> str:
+        return self._get_not_empty_str(text="Nom et/ou prénom du joueur (début du nom ou orthographe approchante)",
+                                       label="joueur")
 
     def _get_start_date(self) -> str:
         return self._get_valid_date(text="Veuillez renseigner la date de début du tournois (formmat dd/mm/yyyy)",
@@ -179,35 +177,32 @@ class TournamentManager:
         )
         return tournament
 
-    def _is_player_exist(self, search_values: list[tuple[str, str]]) -> bool:
-        """
-        Checks if the requested player exists in the db and informs/warns the user accordingly.
-        :param search_values:
-        :return:
-        """
-        if self.db_manager.is_object_exist(PLAYERS_TABLE, search_values):
-            self.view.information(text="Joueur selectionné.")
-            return True
-        self.view.warning(text="Joueur non trouvé.")
-
     def _select_a_player(self) -> None | int:
         """
-        Search for a player in the database using his first and last name
+        Search for a player in the database by name: start of the name or close spelling,
+        accents and case ignored. The user chooses among the candidates found.
         :return: Player id in db if found else None
         """
 
-        search_values = [
-            ("first_name", self._get_player_first_name()),
-            ("last_name", self._get_player_last_name())
-        ]
-        if not self._is_player_exist(search_values):
+        players_id = self.db_manager.search_names(PLAYERS_TABLE, self._get_player_search_text(),
+                                                  limit=PLAYER_SEARCH_RESULTS)
+        if not players_id:
+            self.view.warning(text="Joueur non trouvé.")
             return
-        object_player = self.db_manager.get_object(PLAYERS_TABLE, search_values)
-        player = Player(**object_player)
-        add_in_tournament = self.view.confirm(message=f"Ajouter le joueur '{player}' au tournoi?").lower()
+        choices = [(str(number), f"{Player.from_dict(player).full_name} ({player['date_of_birth']})", player.doc_id)
+                   for number, player in enumerate(self.db_manager.get_objects_by_id(PLAYERS_TABLE, players_id),
+                                                   start=1)]
+        choices.append((str(len(choices) + 1), "Aucun de ces joueurs", None))
+        player_id = self._get_answer_in_multi_choices("Sélectionnez le joueur", choices)
+        if player_id is None:
+            return
+        self.view.information(text="Joueur selectionné.")
+
+        player = self.db_manager.get_model(PLAYERS_TABLE, player_id, Player)
+        add_in_tournament = self.view.confirm(message=f"Ajouter le joueur '{player.full_name}' au tournoi?").lower()
         if add_in_tournament == "n":
             return
-        return object_player.doc_id
+        return player_id
 
     def _add_players(self, tournament: Tournament) -> bool:
         """
@@ -248,12 +243,16 @@ class TournamentManager:
         """
 
         self.db_manager.save(TOURNAMENTS_TABLE, tournament.tournament_data)
-        self.db_manager.update_attribute_many(
-                db_table=PLAYERS_TABLE,
-                attribute_name="is_already_in_a_tournament",
-                new_attribute_value=True,
-                instances_id_list=tournament.players_id
-            )
+        new_values = {
+            "is_already_in_a_tournament": True,
+            "tournament_score": 0,
+            "players_already_faced": [],
+            "had_bye": False,
+        }
+        self.db_manager.update_many(
+            db_table=PLAYERS_TABLE,
+            new_values_by_id={player_id: new_values for player_id in tournament.players_id}
+        )
 
     def _create_tournament(self) -> bool:
         """
@@ -266,9 +265,9 @@ class TournamentManager:
         tournament: Tournament = self._get_tournament_info()
 
         search_values = [
-            ("first_name", tournament.name), ("last_name", tournament.start_date)
+            ("name", tournament.name), ("start_date", tournament.start_date)
         ]
-        if db_manager.is_object_exist(TOURNAMENTS_TABLE, search_values):
+        if self.db_manager.is_object_exist(TOURNAMENTS_TABLE, search_values):
             self.view.warning(text="Ce tournois est déjà connu dans la base de données.")
             return False
 
@@ -281,6 +280,318 @@ class TournamentManager:
         self._save_tournament_and_update_players(tournament)
         return True
 
+    def _select_tournament(self):
+        """
+        Search for a tournament in the database using its name and start date
+        :return: tournament data if found else None
+        """
+
+        search_values = [
+            ("name", self._get_name()), ("start_date", self._get_start_date())
+        ]
+        tournament = self.db_manager.get_object(TOURNAMENTS_TABLE, search_values)
+        if tournament is None:
+            self.view.warning(text="Tournois non trouvé.")
+        return tournament
+
+    def _pair_next_turn(self, players: list) -> Pairing:
+        """
+        Swiss pairing of the next turn
+        :param players: players data of the tournament
+        :return: pairs of players ids and player exempt of the turn
+        """
+
+        return SwissPairing().pair(PairingPlayer.from_document(player) for player in players)
+
+    def _load_current_round(self, tournament: Tournament) -> tuple[int, Round] | None:
+        """
+        Load only the last round of a tournament, previous rounds stay in the db
+        :return: (round id, round) if a round is in progress else None
+        """
+
+        if not tournament.turns_id:
+            return None
+        round_id = tournament.turns_id[-1]
+        current_round = self.db_manager.get_model(ROUNDS_TABLE, round_id, Round)
+        if current_round is None or current_round.is_finished:
+            return None
+        return round_id, current_round
+
+    def _start_round(self, tournament_id: int, tournament: Tournament) -> tuple[int, Round] | None:
+        """
+        Pair the next turn and save its round and matches.
+        :return: (round id, round), the round started by another process meanwhile if any,
+        None if the tournament moved on meanwhile
+        """
+
+        players = self.db_manager.get_objects_by_id(PLAYERS_TABLE, tournament.players_id)
+        pairing = self._pair_next_turn(players)
+        new_rounds = self.save_rounds([(tournament_id, tournament, players, pairing)])
+        if new_rounds:
+            return new_rounds[0]
+        tournament = Tournament.from_dict(self.db_manager.get_objects_by_id(TOURNAMENTS_TABLE, [tournament_id])[0])
+        return self._load_current_round(tournament)
+
+    def _link_rounds(self, new_rounds: dict[int, tuple[int, Round]]) -> list[int]:
+        """
+        Append the new rounds {tournament id: (round id, round)} to their tournaments in one write,
+        if the tournaments still have the version read
+        :return: ids of the tournaments linked, without those which got a round for the turn
+        from another process or moved on meanwhile
+        """
+
+        documents = self.db_manager.get_objects_by_id(TOURNAMENTS_TABLE, list(new_rounds))
+        tournaments = [(document.doc_id, document.get(VERSION_FIELD, 0), Tournament.from_dict(document))
+                       for document in documents]
+        last_rounds_id = [tournament.turns_id[-1] for _, _, tournament in tournaments if tournament.turns_id]
+        last_rounds = {document.doc_id: Round.from_dict(document)
+                       for document in self.db_manager.get_objects_by_id(ROUNDS_TABLE, last_rounds_id)}
+
+        versions = {}
+        for tournament_id, version, tournament in tournaments:
+            number = new_rounds[tournament_id][1].number
+            last_round = last_rounds.get(tournament.turns_id[-1]) if tournament.turns_id else None
+            if tournament.is_over or tournament.current_turn != number or (
+                    last_round is not None and last_round.number == number):
+                continue
+            versions[tournament_id] = version
+        if versions:
+            self.db_manager.update_many(
+                db_table=TOURNAMENTS_TABLE,
+                new_values_by_id={tournament_id: {"turns_id": Append(new_rounds[tournament_id][0])}
+                                  for tournament_id in versions},
+                expected_versions=versions
+            )
+        return list(versions)
+
+    def save_rounds(self, sections: list[tuple[int, Tournament, list, Pairing]]) -> list[tuple[int, Round]]:
+        """
+        Save the new rounds of several tournaments: all the matches in one write, all the rounds
+        in another one, the round ids appended to the tournaments in a third one, then the point
+        of all the exempt players in a last one.
+        A tournament which got a round for the turn from another process meanwhile (two desks,
+        a desk and the scheduler) is skipped: its new round and matches stay unreferenced.
+        :param sections: (tournament id, tournament, players data, pairing of the next turn)
+        :return: (round id, round) of each tournament linked to its new round
+        """
+
+        matches_by_section = []
+        for _, _, _, pairing in sections:
+            matches = [Match(player_1, player_2) for player_1, player_2 in pairing.pairs]
+            if pairing.bye is not None:
+                bye = Match(pairing.bye, None)
+                bye.set_result(1)
+                matches.append(bye)
+            matches_by_section.append(matches)
+
+        matches_id = self.db_manager.save_many(
+            MATCHES_TABLE, [match.to_dict() for matches in matches_by_section for match in matches]
+        )
+        new_rounds = []
+        for (tournament_id, tournament, _, _), matches in zip(sections, matches_by_section):
+            new_rounds.append(Round(tournament_id=tournament_id,
+                                    number=tournament.current_turn,
+                                    matches_id=matches_id[:len(matches)]))
+            matches_id = matches_id[len(matches):]
+        rounds_id = self.db_manager.save_many(ROUNDS_TABLE, [new_round.to_dict() for new_round in new_rounds])
+
+        rounds_by_tournament = {new_round.tournament_id: (round_id, new_round)
+                                for round_id, new_round in zip(rounds_id, new_rounds)}
+        linked = set(retry_on_conflict(lambda: self._link_rounds(rounds_by_tournament)))
+
+        for (tournament_id, tournament, _, _), round_id in zip(sections, rounds_id):
+            if tournament_id in linked:
+                tournament.turns_id.append(round_id)
+        byes = [pairing.bye for tournament_id, _, _, pairing in sections
+                if tournament_id in linked and pairing.bye is not None]
+        if byes:
+            self.db_manager.update_many(
+                db_table=PLAYERS_TABLE,
+                new_values_by_id={player_id: {"tournament_score": Increment(1), "had_bye": True} for player_id in byes}
+            )
+        return [(round_id, new_round) for round_id, new_round in zip(rounds_id, new_rounds)
+                if new_round.tournament_id in linked]
+
+    def _get_match_result(self, match: Match, names: dict[int, Player]) -> str:
+        text = f"Résultat: {names[match.player_1_id]} - {names[match.player_2_id]}"
+        choices = [
+            ("1", f"Victoire de {names[match.player_1_id]}", "1"),
+            ("2", "Match nul", "0.5"),
+            ("3", f"Victoire de {names[match.player_2_id]}", "0"),
+            ("4", "Saisir plus tard", "LATER"),
+        ]
+        return self._get_answer_in_multi_choices(text, choices)
+
+    def _save_match_results(self, matches: dict[int, Match], versions: dict[int, int]) -> None:
+        """
+        Persist finished matches {match id: match}: the matches in one write, then the score and
+        opponents of their players in another one. Points and opponents are added to the values
+        stored, so the players are neither read first nor overwritten with stale scores.
+        :param versions: {match id: version} of the matches when they were read
+        :raise VersionConflictError: a match was changed (its result entered) by another process since
+        it was read, nothing was written
+        """
+
+        self.db_manager.update_many(
+            db_table=MATCHES_TABLE,
+            new_values_by_id={match_id: {"score_1": match.score_1, "score_2": match.score_2, "is_finished": True}
+                              for match_id, match in matches.items()},
+            expected_versions={match_id: versions[match_id] for match_id in matches}
+        )
+        new_values_by_player = {}
+        for match in matches.values():
+            new_values_by_player[match.player_1_id] = {"tournament_score": Increment(match.score_1),
+                                                       "players_already_faced": Append(match.player_2_id)}
+            new_values_by_player[match.player_2_id] = {"tournament_score": Increment(match.score_2),
+                                                       "players_already_faced": Append(match.player_1_id)}
+        self.db_manager.update_many(db_table=PLAYERS_TABLE, new_values_by_id=new_values_by_player)
+
+    def _next_turn(self, tournament_id: int, round_number: int) -> Tournament | None:
+        """
+        Move the tournament from the turn of a round to the next one, if it still has the version read
+        :return: the tournament moved, None if another process already moved it
+        """
+
+        document = self.db_manager.get_objects_by_id(TOURNAMENTS_TABLE, [tournament_id])[0]
+        tournament = Tournament.from_dict(document)
+        if tournament.is_over or tournament.current_turn != round_number:
+            return None
+        tournament.next_turn()
+        self.db_manager.update_attributes(
+            db_table=TOURNAMENTS_TABLE,
+            new_values={"current_turn": tournament.current_turn, "is_over": tournament.is_over},
+            instance_id=tournament_id,
+            expected_version=document.get(VERSION_FIELD, 0)
+        )
+        return tournament
+
+    def _finish_round(self, tournament_id: int, round_id: int, current_round: Round) -> None:
+        """
+        Close the round and move the tournament to its next turn, free the players at the end.
+        Only the process moving the tournament frees and rates the players.
+        """
+
+        current_round.finish()
+        self.db_manager.update_attribute(
+            db_table=ROUNDS_TABLE,
+            attribute_name="end_datetime",
+            new_attribute_value=current_round.end_datetime,
+            instance_id=round_id
+        )
+        tournament = retry_on_conflict(lambda: self._next_turn(tournament_id, current_round.number))
+        if tournament is not None and tournament.is_over:
+            self.db_manager.update_attribute_many(
+                db_table=PLAYERS_TABLE,
+                attribute_name="is_already_in_a_tournament",
+                new_attribute_value=False,
+                instances_id_list=tournament.players_id
+            )
+            RatingManager(self.db_manager).rate_tournament(tournament_id)
+            self.view.information(text="Tournois terminé, classements Elo mis à jour.")
+
+    def record_results(self, tournament_id: int, results: list[tuple[int, float]]) -> list[str]:
+        """
+        Record a batch of results of the round in progress, without any prompt, written together.
+        The round is closed once all its matches are finished.
+        :param tournament_id: tournament concerned
+        :param results: (match id, points of the first player: 1, 0.5 or 0)
+        :return: status of each result, "OK" or the reason of the rejection
+        """
+
+        tournaments = self.db_manager.get_objects_by_id(TOURNAMENTS_TABLE, [tournament_id])
+        if not tournaments:
+            return ["Tournois non trouvé."] * len(results)
+        tournament = Tournament.from_dict(tournaments[0])
+        round_in_progress = None if tournament.is_over else self._load_current_round(tournament)
+        if round_in_progress is None:
+            return ["Aucun tour en cours."] * len(results)
+        round_id, current_round = round_in_progress
+
+        def save() -> tuple[dict[int, Match], list[str]]:
+            # read again after a conflict: the results entered meanwhile are rejected
+            documents = self.db_manager.get_objects_by_id(MATCHES_TABLE, current_round.matches_id)
+            matches = {match.doc_id: Match.from_dict(match) for match in documents}
+            statuses, finished = [], {}
+            for match_id, score_1 in results:
+                match = matches.get(match_id)
+                if match is None or match.is_bye:
+                    statuses.append("Match non trouvé dans le tour en cours.")
+                elif match.is_finished:
+                    statuses.append("Résultat déjà saisi.")
+                elif score_1 not in (0, 0.5, 1):
+                    statuses.append("Résultat non valide.")
+                else:
+                    match.set_result(score_1)
+                    finished[match_id] = match
+                    statuses.append("OK")
+            if finished:
+                self._save_match_results(finished, {match.doc_id: match.get(VERSION_FIELD, 0) for match in documents})
+            return matches, statuses
+
+        matches, statuses = retry_on_conflict(save)
+        if all(match.is_finished for match in matches.values()):
+            self._finish_round(tournament_id, round_id, current_round)
+        return statuses
+
+    def _open_tournament(self) -> None:
+        """
+        Load a tournament and its current round only (a new round is paired if needed),
+        then enter the results of its matches
+        """
+
+        tournament_data = self._select_tournament()
+        if tournament_data is None:
+            return
+        tournament_id = tournament_data.doc_id
+        tournament = Tournament.from_dict(tournament_data)
+        if tournament.is_over:
+            self.view.information(text="Ce tournois est terminé.")
+            return
+
+        round_in_progress = self._load_current_round(tournament)
+        if round_in_progress is None:
+            round_in_progress = self._start_round(tournament_id, tournament)
+        if round_in_progress is None:
+            self.view.warning(text="Le tournois a été modifié sur un autre poste, ouvrez-le à nouveau.")
+            return
+        round_id, current_round = round_in_progress
+
+        documents = self.db_manager.get_objects_by_id(MATCHES_TABLE, current_round.matches_id)
+        matches = {match.doc_id: Match.from_dict(match) for match in documents}
+        versions = {match.doc_id: match.get(VERSION_FIELD, 0) for match in documents}
+        names = {player_id: self.db_manager.get_model(PLAYERS_TABLE, player_id, Player)
+                 for player_id in tournament.players_id}
+
+        self.view.information(text=f"{current_round} (début: {current_round.start_datetime})")
+        for table_number, match in enumerate(matches.values(), start=1):
+            if match.is_bye:
+                self.view.information(text=f"Exempt: {names[match.player_1_id]}")
+            else:
+                self.view.information(
+                    text=f"Table {table_number}: {names[match.player_1_id]} - {names[match.player_2_id]}"
+                )
+
+        entered_elsewhere = False
+        for match_id, match in matches.items():
+            if match.is_finished:
+                continue
+            result = self._get_match_result(match, names)
+            if result == "LATER":
+                return
+            match.set_result(float(result))
+            try:
+                self._save_match_results({match_id: match}, versions)
+            except VersionConflictError:
+                self.view.warning(text="Résultat déjà saisi.")
+                entered_elsewhere = True
+
+        if entered_elsewhere and not all(
+                Match.from_dict(match).is_finished
+                for match in self.db_manager.get_objects_by_id(MATCHES_TABLE, current_round.matches_id)
+        ):
+            return
+        self._finish_round(tournament_id, round_id, current_round)
+
     def run(self) -> None:
         """ Create or load tournament"""
 
@@ -292,7 +603,7 @@ class TournamentManager:
                     self._create_tournament()
 
                 case "OPEN":
-                    print("OPEN")
+                    self._open_tournament()
 
                 case "BACK":
                     break
@@ -302,8 +613,9 @@ class TournamentManager:
 
 
 if __name__ == '__main__':
-    from DBManagers.tiny_manager import TinyManager
+    from Settings.db_config import get_db_manager
+    from Views.ConsoleLineViews.tournament import TournamentLinePlayerView
 
-    db_manager = TinyManager()
+    db_manager = get_db_manager()
     tournament = TournamentManager(TournamentLinePlayerView, db_manager=db_manager)
     tournament.run()
@@ -0,0 +1,191 @@
+"""
+Identity-map cache in front of any db manager
+"""
+from collections import OrderedDict
+from typing import Optional
+
+from DBManagers.db_manager import DBManager
+from DBManagers.query import normalize
+from Utils.instrumentation import instrumented
+
+
+@instrumented("db")
+class CachedManager(DBManager):
+    """
+    Wraps a db manager and keeps the documents it reads, keyed by table and doc_id,
+    with a least recently used eviction. Models built from the documents are kept
+    with them, so the same instance is returned until the document changes.
+    Table listings and counts are cached until the next write on the table.
+
+    Returned documents are shared: they must be treated as read-only.
+    The writes made through this manager invalidate what they change. When other
+    processes wrote in the database of a table (see external_changes() of the
+    wrapped manager, checked before each read), everything kept for the table
+    is dropped.
+    """
+
+    def __init__(self, db_manager: DBManager, max_size: int = 10_000) -> None:
+        self.db_manager = db_manager
+        self.max_size = max_size
+        # (table, doc_id) -> [document, {model class: instance}]
+        self._entries: OrderedDict[tuple, list] = OrderedDict()
+        self._all_objects: dict = {}
+        # table -> {normalized conditions or None for the whole table: count}
+        self._counts: dict = {}
+        # table -> external_changes() of the wrapped manager when the table was last read
+        self._synced_changes: dict = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _get_entry(self, db_table, doc_id: int) -> Optional[list]:
+        entry = self._entries.get((db_table, doc_id))
+        if entry is not None:
+            self._entries.move_to_end((db_table, doc_id))
+        return entry
+
+    def _store(self, db_table, document) -> list:
+        entry = [document, {}]
+        self._entries[(db_table, document.doc_id)] = entry
+        self._entries.move_to_end((db_table, document.doc_id))
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return entry
+
+    def _invalidate(self, db_table, instances_id_list: list) -> None:
+        for doc_id in instances_id_list:
+            self._entries.pop((db_table, doc_id), None)
+        self._invalidate_table(db_table)
+
+    def _invalidate_table(self, db_table) -> None:
+        self._all_objects.pop(db_table, None)
+        self._counts.pop(db_table, None)
+
+    def _drop_if_changed_elsewhere(self, db_table) -> None:
+        """Forget the documents, listing and counts of a table if other processes wrote in its database"""
+
+        changes = self.db_manager.external_changes(db_table)
+        if self._synced_changes.get(db_table, changes) != changes:
+            for key in [key for key in self._entries if key[0] is db_table]:
+                del self._entries[key]
+            self._invalidate_table(db_table)
+        self._synced_changes[db_table] = changes
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._all_objects.clear()
+        self._counts.clear()
+
+    def external_changes(self, db_table) -> int:
+        return self.db_manager.external_changes(db_table)
+
+    def save(self, table, data):
+        self._invalidate_table(table)
+        return self.db_manager.save(table, data)
+
+    def save_many(self, table, data_list) -> list[int]:
+        self._invalidate_table(table)
+        return self.db_manager.save_many(table, data_list)
+
+    def get_all_objects_from_table(self, table) -> list:
+        self._drop_if_changed_elsewhere(table)
+        if table not in self._all_objects:
+            self._all_objects[table] = self.db_manager.get_all_objects_from_table(table)
+        return self._all_objects[table]
+
+    def iter_ids(self, db_table, values=None, batch_size: int = 1000):
+        return self.db_manager.iter_ids(db_table, values, batch_size)
+
+    def iter_objects(self, db_table, values=None, batch_size: int = 1000):
+        """Streamed from the wrapped manager, the documents are not kept in the cache"""
+
+        return self.db_manager.iter_objects(db_table, values, batch_size)
+
+    def get_page(self, db_table, offset: int, limit: int, values=None) -> list:
+        return self.db_manager.get_page(db_table, offset, limit, values)
+
+    def count_objects_in_db(self, table) -> int:
+        self._drop_if_changed_elsewhere(table)
+        counts = self._counts.setdefault(table, {})
+        if None not in counts:
+            counts[None] = self.db_manager.count_objects_in_db(table)
+        return counts[None]
+
+    def count_objects(self, db_table, values) -> int:
+        self._drop_if_changed_elsewhere(db_table)
+        counts = self._counts.setdefault(db_table, {})
+        key = normalize(values)
+        if key not in counts:
+            counts[key] = self.db_manager.count_objects(db_table, values)
+        return counts[key]
+
+    def get_objects_id(self, db_table, values) -> list[int]:
+        return self.db_manager.get_objects_id(db_table, values)
+
+    def get_object(self, db_table, values):
+        doc_ids = self.db_manager.get_objects_id(db_table, values)
+        if not doc_ids:
+            return None
+        return self.get_objects_by_id(db_table, doc_ids[:1])[0]
+
+    def get_objects_by_id(self, db_table, instances_id_list) -> list:
+        self._drop_if_changed_elsewhere(db_table)
+        entries = {}
+        missing = []
+        for doc_id in instances_id_list:
+            entry = self._get_entry(db_table, doc_id)
+            if entry is None:
+                missing.append(doc_id)
+            else:
+                entries[doc_id] = entry
+        self.hits += len(entries)
+        self.misses += len(missing)
+
+        if missing:
+            for document in self.db_manager.get_objects_by_id(db_table, missing):
+                entries[document.doc_id] = self._store(db_table, document)
+        return [entries[doc_id][0] for doc_id in instances_id_list if doc_id in entries]
+
+    def get_model(self, db_table, doc_id, model):
+        self._drop_if_changed_elsewhere(db_table)
+        entry = self._get_entry(db_table, doc_id)
+        if entry is None:
+            documents = self.get_objects_by_id(db_table, [doc_id])
+            if not documents:
+                return None
+            entry = self._get_entry(db_table, doc_id) or [documents[0], {}]
+        if model not in entry[1]:
+            entry[1][model] = self.get_model_from_document(entry[0], model)
+        return entry[1][model]
+
+    def search_names(self, db_table, text: str, limit: int = 10) -> list[int]:
+        return self.db_manager.search_names(db_table, text, limit)
+
+    def get_sorted_ids(self, db_table, view: str, low=None, high=None, limit=None, reverse=False) -> list[int]:
+        return self.db_manager.get_sorted_ids(db_table, view, low, high, limit, reverse)
+
+    def is_object_exist(self, db_table, values) -> bool:
+        return self.db_manager.is_object_exist(db_table, values)
+
+    def update_attribute(self, db_table, attribute_name, new_attribute_value, instance_id,
+                         expected_version=None) -> None:
+        self._invalidate(db_table, [instance_id])
+        self.db_manager.update_attribute(db_table, attribute_name, new_attribute_value, instance_id,
+                                         expected_version=expected_version)
+
+    def update_attributes(self, db_table, new_values, instance_id, expected_version=None) -> None:
+        self._invalidate(db_table, [instance_id])
+        self.db_manager.update_attributes(db_table, new_values, instance_id, expected_version=expected_version)
+
+    def update_attribute_many(self, db_table, attribute_name, new_attribute_value, instances_id_list,
+                              expected_versions=None) -> None:
+        self._invalidate(db_table, instances_id_list)
+        self.db_manager.update_attribute_many(db_table, attribute_name, new_attribute_value, instances_id_list,
+                                              expected_versions=expected_versions)
+
+    def update_attribute_values(self, db_table, attribute_name, new_values_by_id) -> None:
+        self._invalidate(db_table, list(new_values_by_id))
+        self.db_manager.update_attribute_values(db_table, attribute_name, new_values_by_id)
+
+    def update_many(self, db_table, new_values_by_id, expected_versions=None) -> None:
+        self._invalidate(db_table, list(new_values_by_id))
+        self.db_manager.update_many(db_table, new_values_by_id, expected_versions=expected_versions)
@@ -1,23 +1,83 @@
+import random
+import time
 from abc import ABC, abstractmethod
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Mapping, Optional, TypeVar
+from weakref import WeakKeyDictionary
+
+from DBManagers.indexes import SortedIndex, build_sorted_indexes
+from DBManagers.name_index import NameIndex
+from DBManagers.operations import resolve
+from Settings.project_config import NAME_INDEXED_FIELDS, SORTED_VIEWS
+from Utils.exceptions import VersionConflictError
+from Utils.sort_keys import SORT_KEYS
+
+# Version of a document, increased by each update: updates given the versions read before
+# (expected_version) are not written if another process changed the documents meanwhile,
+# VersionConflictError is raised instead (see retry_on_conflict)
+VERSION_FIELD = "_version"
+
+T = TypeVar("T")
 
 
 class DBManager(ABC):
 
+    _name_indexes: "WeakKeyDictionary[object, NameIndex]" = WeakKeyDictionary()
+    _sorted_views: "WeakKeyDictionary[object, dict[str, SortedIndex]]" = WeakKeyDictionary()
+    # table -> external_changes() when its indexes were last checked
+    _synced_changes: "WeakKeyDictionary[object, int]" = WeakKeyDictionary()
+
     @classmethod
     @abstractmethod
-    def save(cls, table, data):
-        """save in db"""
+    def save(cls, table, data) -> int:
+        """save in db, return the object id"""
+
+    @classmethod
+    @abstractmethod
+    def save_many(cls, table, data_list) -> list[int]:
+        """save many objects in db with a single write, return their ids"""
 
     @classmethod
     @abstractmethod
     def get_all_objects_from_table(cls, table) -> list:
         """return all objects from a table"""
 
+    @classmethod
+    def iter_ids(cls, db_table, values: Optional[list] = None, batch_size: int = 1000) -> Iterator[int]:
+        """iterate over the ids of the objects matching values, of all objects if values is empty"""
+
+        if values:
+            yield from cls.get_objects_id(db_table, values)
+        else:
+            for document in cls.get_all_objects_from_table(db_table):
+                yield document.doc_id
+
+    @classmethod
+    def iter_objects(cls, db_table, values: Optional[list] = None, batch_size: int = 1000) -> Iterator:
+        """iterate over the objects matching values, read batch_size objects at a time"""
+
+        doc_ids = cls.iter_ids(db_table, values, batch_size)
+        while batch := list(islice(doc_ids, batch_size)):
+            yield from cls.get_objects_by_id(db_table, batch)
+
+    @classmethod
+    def get_page(cls, db_table, offset: int, limit: int, values: Optional[list] = None) -> list:
+        """return at most limit objects matching values, skipping the first offset ones"""
+
+        doc_ids = list(islice(cls.iter_ids(db_table, values), offset, offset + limit))
+        return cls.get_objects_by_id(db_table, doc_ids)
+
     @classmethod
     @abstractmethod
     def count_objects_in_db(cls, table) -> int:
         """return total objects number from a table"""
 
+    @classmethod
+    def count_objects(cls, db_table, values) -> int:
+        """return the number of objects matching values"""
+
+        return sum(1 for _ in cls.iter_ids(db_table, values))
+
     @classmethod
     @abstractmethod
     def get_objects_id(cls, db_table, values) -> list[int]:
@@ -28,6 +88,29 @@ class DBManager(ABC):
     def get_object(cls, db_table, values):
         """Get object data"""
 
+    @classmethod
+    @abstractmethod
+    def get_objects_by_id(cls, db_table, instances_id_list) -> list:
+        """Get objects data from their ids"""
+
+    @classmethod
+    def get_model(cls, db_table, doc_id, model):
+        """Get an instance of model built from the object data, None if not found"""
+
+        documents = cls.get_objects_by_id(db_table, [doc_id])
+        if not documents:
+            return None
+        return cls.get_model_from_document(documents[0], model)
+
+    @staticmethod
+    def get_model_from_document(document, model):
+        """Build an instance of model from an object data, with model.from_dict() if it exists"""
+
+        from_dict = getattr(model, "from_dict", None)
+        if from_dict is not None:
+            return from_dict(document)
+        return model(**document)
+
     @classmethod
     @abstractmethod
     def is_object_exist(cls, db_table, values) -> bool:
@@ -35,13 +118,202 @@ class DBManager(ABC):
 
     @classmethod
     def update_attribute(
-            cls, db_table, attribute_name, new_attribute_value, instance_id
+            cls, db_table, attribute_name, new_attribute_value, instance_id, expected_version: Optional[int] = None
     ) -> None:
-        """update an attribute in database"""
+        """update an attribute in database, if the instance still has expected_version when given"""
+
+    @classmethod
+    def update_attributes(
+            cls, db_table, new_values, instance_id, expected_version: Optional[int] = None
+    ) -> None:
+        """update several attributes of an instance in database with a single write"""
+
+        cls.update_many(db_table, {instance_id: new_values},
+                        None if expected_version is None else {instance_id: expected_version})
 
     @classmethod
     def update_attribute_many(
-            cls, db_table, attribute_name, new_attribute_value, instances_id_list
+            cls, db_table, attribute_name, new_attribute_value, instances_id_list,
+            expected_versions: Optional[Mapping[int, int]] = None
+    ) -> None:
+        """
+        update an attribute from many instances in database,
+        none of them if one has not its version in expected_versions {id: version} when given
+        """
+
+    @classmethod
+    def update_attribute_values(cls, db_table, attribute_name, new_values_by_id: dict) -> None:
+        """update an attribute from many instances in database, each with its own value"""
+
+        cls.update_many(db_table, {instance_id: {attribute_name: new_attribute_value}
+                                   for instance_id, new_attribute_value in new_values_by_id.items()})
+
+    @classmethod
+    def update_many(
+            cls, db_table, new_values_by_id: Mapping[int, Mapping],
+            expected_versions: Optional[Mapping[int, int]] = None
     ) -> None:
-        """update an attribute from many instances in database"""
+        """
+        update several attributes of many instances in database, each with its own values
+        {id: {attribute: value}}, with a single write. Values can be operations on the value
+        stored (see DBManagers.operations). None of them is updated if one has not its version
+        in expected_versions {id: version} when given.
+        This default compares the versions of the documents read just before writing them
+        attribute by attribute, without a lock: a manager shared by several processes checks
+        them in its write instead.
+        :raise VersionConflictError: with the ids of the documents changed meanwhile
+        """
+
+        documents = {document.doc_id: document
+                     for document in cls.get_objects_by_id(db_table, list(new_values_by_id))}
+        if expected_versions:
+            conflicts = [doc_id for doc_id, version in expected_versions.items()
+                         if doc_id in documents and documents[doc_id].get(VERSION_FIELD, 0) != version]
+            if conflicts:
+                raise VersionConflictError(conflicts)
+        for instance_id, new_values in new_values_by_id.items():
+            if instance_id in documents:
+                document = documents[instance_id]
+                new_values = {**resolve(document, new_values), VERSION_FIELD: document.get(VERSION_FIELD, 0) + 1}
+                for attribute_name, new_attribute_value in new_values.items():
+                    cls.update_attribute(db_table, attribute_name, new_attribute_value, instance_id)
+
+    @classmethod
+    def external_changes(cls, db_table) -> int:
+        """
+        Writes of the other processes in the database of a table, counted in batches: the value
+        changes when they wrote since the previous call. Always 0 for a database of this process only.
+        """
+
+        return 0
+
+    @classmethod
+    def _drop_indexes(cls, db_table) -> None:
+        cls._name_indexes.pop(db_table, None)
+        cls._sorted_views.pop(db_table, None)
+
+    @classmethod
+    def _drop_indexes_if_changed_elsewhere(cls, db_table) -> None:
+        """Forget the indexes of a table shared with other processes if they wrote in it"""
+
+        changes = cls.external_changes(db_table)
+        if cls._synced_changes.get(db_table, changes) != changes:
+            cls._drop_indexes(db_table)
+        cls._synced_changes[db_table] = changes
+
+    @classmethod
+    def _get_name_index(cls, db_table) -> NameIndex:
+        """Return the name index of a table, built from its objects on first use"""
+
+        cls._drop_indexes_if_changed_elsewhere(db_table)
+        index = cls._name_indexes.get(db_table)
+        if index is None:
+            index = NameIndex(NAME_INDEXED_FIELDS.get(db_table.name, ("first_name", "last_name")))
+            index.build((document.doc_id, document) for document in cls.iter_objects(db_table))
+            cls._name_indexes[db_table] = index
+        return index
+
+    @classmethod
+    def _get_sorted_views(cls, db_table) -> dict[str, SortedIndex]:
+        """Return the sorted views of a table (see SORTED_VIEWS), built from its objects on first use"""
+
+        cls._drop_indexes_if_changed_elsewhere(db_table)
+        views = cls._sorted_views.get(db_table)
+        if views is None:
+            views = new_sorted_views(db_table.name)
+            if views:
+                build_sorted_indexes(views.values(),
+                                     ((document.doc_id, document) for document in cls.iter_objects(db_table)))
+            cls._sorted_views[db_table] = views
+        return views
+
+    @classmethod
+    def _index_documents(cls, db_table, documents: Iterable[tuple[int, Mapping]]) -> None:
+        """Add saved objects to the name index and the sorted views of their table, if they are built"""
+
+        name_index, views = cls._name_indexes.get(db_table), cls._sorted_views.get(db_table)
+        if name_index is None and not views:
+            return
+        documents = list(documents)
+        if name_index is not None:
+            for doc_id, document in documents:
+                name_index.add(doc_id, document)
+        for view in (views or {}).values():
+            view.add_many(documents)
+
+    @classmethod
+    def _reindex_documents(cls, db_table, instances_id_list: Iterable[int], attribute_names: Iterable[str]) -> None:
+        """Follow the updated objects in the name index and the sorted views of their table, if they are built"""
+
+        attribute_names = set(attribute_names)
+        name_index = cls._name_indexes.get(db_table)
+        if name_index is not None and not attribute_names & set(name_index.fields):
+            name_index = None
+        views = [view for view in cls._sorted_views.get(db_table, {}).values() if attribute_names & set(view.fields)]
+        if name_index is None and not views:
+            return
+        documents = [(document.doc_id, document)
+                     for document in cls.get_objects_by_id(db_table, list(instances_id_list))]
+        if name_index is not None:
+            for doc_id, document in documents:
+                name_index.add(doc_id, document)
+        for view in views:
+            view.add_many(documents)
+
+    @classmethod
+    def search_names(cls, db_table, text: str, limit: int = 10) -> list[int]:
+        """ids of the objects whose names start with text, then of the closest names, accents and case ignored"""
+
+        return cls._get_name_index(db_table).search(text, limit)
+
+    @classmethod
+    def get_sorted_ids(cls, db_table, view: str, low=None, high=None, limit: Optional[int] = None,
+                       reverse: bool = False) -> list[int]:
+        """
+        ids of the objects in the order of a sorted view of their table (see SORTED_VIEWS),
+        whose value is between low and high, inclusive, at most limit of them:
+            get_sorted_ids(PLAYERS_TABLE, "ranking", 1800, 2000)
+            get_sorted_ids(PLAYERS_TABLE, "ranking", limit=10, reverse=True)
+            get_sorted_ids(PLAYERS_TABLE, "date_of_birth", low="19/10/2014")
+        :param low: lowest value (a ranking, a name, a dd/mm/yyyy date), None for no lower bound
+        :param high: highest value, None for no upper bound
+        :param reverse: descending order, limit keeps the highest values
+        :raise ValueError: the table has no such sorted view
+        """
+
+        views = cls._get_sorted_views(db_table)
+        if view not in views:
+            raise ValueError(f"No sorted view {view!r} on the table {db_table.name}")
+        return views[view].range(bound(view, low), bound(view, high), limit, reverse)
+
+
+def new_sorted_views(table_name: str) -> dict[str, SortedIndex]:
+    """Empty sorted views of a table, as declared in SORTED_VIEWS"""
+
+    return {view: SortedIndex(SORT_KEYS[view].fields, SORT_KEYS[view].of) for view in SORTED_VIEWS.get(table_name, ())}
+
+
+def bound(view: str, value):
+    """Key of a bound of a range query on a sorted view, None stays None"""
+
+    return None if value is None else SORT_KEYS[view].bound(value)
+
+
+def retry_on_conflict(operation: Callable[[], T], attempts: int = 8, delay: float = 0.005) -> T:
+    """
+    Run an operation reading documents then writing them with their expected versions,
+    again if another process changed them meanwhile: after delay, then twice longer each time
+    (with a random part, so that the processes in conflict do not retry together)
+    :param operation: reads the documents each time it is called
+    :param attempts: maximum number of runs, the last conflict is raised
+    :param delay: first wait in seconds
+    :return: result of the operation
+    """
 
+    for attempt in range(attempts):
+        try:
+            return operation()
+        except VersionConflictError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(delay * 2 ** attempt * random.uniform(0.5, 1.5))
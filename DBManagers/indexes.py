@@ -0,0 +1,218 @@
+"""
+In-memory secondary indexes used by the db managers
+"""
+from bisect import bisect_left, bisect_right, insort
+from math import inf
+from typing import Any, Callable, Hashable, Iterable, Mapping, Optional
+
+# A sorted index is sorted again rather than updated by insertions when more than
+# 1 / MAX_INSERTIONS_SHARE of its documents change at once (each insertion moves the list)
+MAX_INSERTIONS_SHARE = 32
+
+
+class HashIndex:
+    """Equality index: maps the values of some fields to the ids of the documents holding them"""
+
+    def __init__(self, fields: Iterable[str]) -> None:
+        self.fields: tuple[str, ...] = tuple(fields)
+        self._buckets: dict[tuple, set[int]] = {}
+        self._keys: dict[int, tuple] = {}
+
+    def key_of(self, document: Mapping) -> tuple:
+        return tuple(document.get(field) for field in self.fields)
+
+    def add(self, doc_id: int, document: Mapping) -> None:
+        self._insert_key(doc_id, self.key_of(document))
+
+    def remove(self, doc_id: int) -> None:
+        key = self._keys.pop(doc_id, None)
+        if key is None:
+            return
+        bucket = self._buckets[key]
+        bucket.discard(doc_id)
+        if not bucket:
+            del self._buckets[key]
+
+    def update_field(self, doc_id: int, field: str, value: Hashable) -> None:
+        """
+        Move a document to the bucket matching its new field value.
+        The stored key is reused, so the document itself is not needed.
+        :param doc_id: id of the updated document
+        :param field: name of the updated field
+        :param value: new value of the field
+        """
+
+        old_key = self._keys.get(doc_id)
+        if old_key is None or field not in self.fields:
+            return
+        position = self.fields.index(field)
+        new_key = old_key[:position] + (value,) + old_key[position + 1:]
+        self.remove(doc_id)
+        self._insert_key(doc_id, new_key)
+
+    def build(self, documents: Iterable[tuple[int, Mapping]]) -> None:
+        self._buckets.clear()
+        self._keys.clear()
+        for doc_id, document in documents:
+            self.add(doc_id, document)
+
+    def lookup(self, key: tuple) -> set[int]:
+        return self._buckets.get(key, set())
+
+    def count(self, key: tuple) -> int:
+        return len(self._buckets.get(key, ()))
+
+    def _insert_key(self, doc_id: int, key: tuple) -> None:
+        self._keys[doc_id] = key
+        self._buckets.setdefault(key, set()).add(doc_id)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class SortedIndex:
+    """
+    Order index: (key, doc_id) pairs of the documents kept sorted, so that the first
+    documents in key order and the documents whose key is in a range are found with
+    bisect, in O(log N + k). Documents are moved with bisect insertions when they change.
+    """
+
+    def __init__(self, fields: Iterable[str], key: Callable[[Mapping], Any]) -> None:
+        """
+        :param fields: fields the key is computed from
+        :param key: key of a document, the keys of a table must be comparable
+        """
+
+        self.fields: tuple[str, ...] = tuple(fields)
+        self.key = key
+        self._entries: list[tuple[Any, int]] = []
+        self._keys: dict[int, Any] = {}
+
+    def add(self, doc_id: int, document: Mapping) -> None:
+        """Insert a document, or move it to the position of its new key"""
+
+        key = self.key(document)
+        if doc_id in self._keys:
+            if self._keys[doc_id] == key:
+                return
+            self.remove(doc_id)
+        self._keys[doc_id] = key
+        insort(self._entries, (key, doc_id))
+
+    def add_many(self, documents: Iterable[tuple[int, Mapping]]) -> None:
+        """Insert or move many documents, sorting the whole index again when that is cheaper"""
+
+        documents = list(documents)
+        if len(documents) * MAX_INSERTIONS_SHARE < len(self._entries):
+            for doc_id, document in documents:
+                self.add(doc_id, document)
+            return
+        self._keys.update((doc_id, self.key(document)) for doc_id, document in documents)
+        self._entries = sorted((key, doc_id) for doc_id, key in self._keys.items())
+
+    def remove(self, doc_id: int) -> None:
+        if doc_id not in self._keys:
+            return
+        position = bisect_left(self._entries, (self._keys.pop(doc_id), doc_id))
+        del self._entries[position]
+
+    def build(self, documents: Iterable[tuple[int, Mapping]]) -> None:
+        build_sorted_indexes([self], documents)
+
+    def range(self, low: Any = None, high: Any = None, limit: Optional[int] = None,
+              reverse: bool = False) -> list[int]:
+        """
+        ids of the documents whose key is between low and high, inclusive, in key order
+        :param low: lowest key, None for no lower bound
+        :param high: highest key, None for no upper bound
+        :param limit: at most this number of ids, the first ones in the order asked
+        :param reverse: descending order
+        """
+
+        # (low,) sorts before any (low, doc_id), (high, inf) after any (high, doc_id)
+        start = 0 if low is None else bisect_left(self._entries, (low,))
+        end = len(self._entries) if high is None else bisect_right(self._entries, (high, inf))
+        if limit is not None:
+            if reverse:
+                start = max(start, end - limit)
+            else:
+                end = min(end, start + limit)
+        entries = self._entries[start:end]
+        if reverse:
+            entries.reverse()
+        return [doc_id for _, doc_id in entries]
+
+    def first(self, count: int, reverse: bool = False) -> list[int]:
+        """ids of the count first documents in key order, of the count last ones first if reverse"""
+
+        return self.range(limit=count, reverse=reverse)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def build_sorted_indexes(indexes: Iterable[SortedIndex], documents: Iterable[tuple[int, Mapping]]) -> None:
+    """Build sorted indexes in one pass over the documents, which are not kept"""
+
+    indexes = list(indexes)
+    keys: list[dict[int, Any]] = [{} for _ in indexes]
+    for doc_id, document in documents:
+        for index, index_keys in zip(indexes, keys):
+            index_keys[doc_id] = index.key(document)
+    for index, index_keys in zip(indexes, keys):
+        index._keys = index_keys
+        index._entries = sorted((key, doc_id) for doc_id, key in index_keys.items())
+
+
+class IndexSet:
+    """All the indexes declared on one table"""
+
+    def __init__(self) -> None:
+        self._indexes: dict[tuple[str, ...], HashIndex] = {}
+
+    def declare(self, fields: Iterable[str]) -> tuple[HashIndex, bool]:
+        """
+        Declare an index on some fields.
+        :param fields: indexed fields, in key order
+        :return: the index and True if it has just been created
+        """
+
+        fields = tuple(fields)
+        if fields in self._indexes:
+            return self._indexes[fields], False
+        index = HashIndex(fields)
+        self._indexes[fields] = index
+        return index, True
+
+    def best_index(self, fields: Iterable[str]) -> Optional[HashIndex]:
+        """
+        Find the index covering the most fields of an equality query.
+        :param fields: fields of the query
+        :return: the index or None if no index can serve the query
+        """
+
+        fields = set(fields)
+        candidates = [index for index in self._indexes.values()
+                      if set(index.fields) <= fields]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda index: len(index.fields))
+
+    def add(self, doc_id: int, document: Mapping) -> None:
+        for index in self._indexes.values():
+            index.add(doc_id, document)
+
+    def remove(self, doc_id: int) -> None:
+        for index in self._indexes.values():
+            index.remove(doc_id)
+
+    def update_field(self, doc_ids: Iterable[int], field: str, value: Hashable) -> None:
+        indexes = [index for index in self._indexes.values() if field in index.fields]
+        if not indexes:
+            return
+        for doc_id in doc_ids:
+            for index in indexes:
+                index.update_field(doc_id, field, value)
+
+    def __iter__(self):
+        return iter(self._indexes.values())
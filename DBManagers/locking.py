@@ -0,0 +1,166 @@
+"""
+Multi-process access to a TinyDB JSON database.
+
+TinyDB reads and rewrites the whole file on every change, so two processes
+working on the same db.json (the registration desk and the pairing desk) can
+read a file being rewritten, or overwrite each other's changes. Here:
+
+- an advisory lock (flock) on `<db.json>.lock` is taken shared by each read
+  and exclusive by each read-modify-write of a table, so a change is never
+  made on a stale copy of the file;
+- new document ids are computed under the lock, from the file;
+- the lock file holds a write counter, so a process knows when the others
+  wrote and drops what it derived from the file (indexes, query cache).
+
+Changes computed from documents read earlier are checked with the document
+versions: see VERSION_FIELD and retry_on_conflict() in DBManagers.db_manager.
+Increments and appends (the points and the opponent of a match) need no
+check: DBManagers.operations applies them to the file read under the lock.
+
+Without fcntl (Windows), only the threads of a process are synchronized.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Union
+
+from tinydb import TinyDB
+from tinydb.storages import JSONStorage
+from tinydb.table import Table
+
+from Utils import instrumentation
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - advisory locks are POSIX only
+    fcntl = None
+
+COUNTER_SIZE = 8
+
+
+class FileLock:
+    """
+    Advisory lock on a file, shared or exclusive, reentrant in a process.
+    The file also holds a counter of the writes made under the lock.
+    """
+
+    def __init__(self, path: Union[Path, str]) -> None:
+        self.path = Path(path)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._mutex = threading.RLock()
+        self._depth = 0
+        self._exclusive = False
+        self._counter = self._read_counter()
+        # writes of the other processes seen, in batches: changes each time some are found
+        self.external_changes = 0
+
+    def _read_counter(self) -> int:
+        with self._mutex:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            data = os.read(self._fd, COUNTER_SIZE)
+        return int.from_bytes(data, "little") if len(data) == COUNTER_SIZE else 0
+
+    def refresh(self) -> int:
+        """
+        Look for writes of the other processes
+        :return: external_changes, which differs from the previous value if there are some
+        """
+
+        counter = self._read_counter()
+        if counter != self._counter:
+            self._counter = counter
+            self.external_changes += 1
+        return self.external_changes
+
+    def written(self) -> None:
+        """Count a write of this process, to call while holding the exclusive lock"""
+
+        with self._mutex:
+            self.refresh()
+            self._counter += 1
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            os.write(self._fd, self._counter.to_bytes(COUNTER_SIZE, "little"))
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        with self._mutex:
+            if self._depth == 0:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                self._exclusive = exclusive
+            elif exclusive and not self._exclusive:
+                # flock would release the shared lock before taking the exclusive one
+                raise RuntimeError("The exclusive lock cannot be taken while holding the shared lock")
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0 and fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def shared(self):
+        return self._locked(exclusive=False)
+
+    def exclusive(self):
+        return self._locked(exclusive=True)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class LockedJSONStorage(JSONStorage):
+    """JSON storage reading under the shared lock and writing under the exclusive lock"""
+
+    def __init__(self, path: str, **kwargs) -> None:
+        super().__init__(path, **kwargs)
+        self.lock = FileLock(f"{path}.lock")
+
+    def read(self):
+        with self.lock.shared():
+            return super().read()
+
+    def write(self, data) -> None:
+        with self.lock.exclusive():
+            super().write(data)
+            self.lock.written()
+            if instrumentation.ENABLED:
+                # the file is written again from the start: its size is what was written
+                instrumentation.record_bytes("tinydb", self._handle.tell())
+
+    def close(self) -> None:
+        super().close()
+        self.lock.close()
+
+
+class LockedTable(Table):
+    """
+    TinyDB table whose read-modify-write cycles are made under the exclusive lock of its storage.
+    Its query cache is disabled, since the other processes do not clear it.
+    """
+
+    default_query_cache_capacity = 0
+
+    def _update_table(self, updater: Callable[[dict], None]) -> None:
+        with self._storage.lock.exclusive():
+            super()._update_table(updater)
+
+    def insert(self, document) -> int:
+        with self._storage.lock.exclusive():
+            # the next id known by this process may have been taken by another one
+            self._next_id = None
+            return super().insert(document)
+
+    def insert_multiple(self, documents) -> list[int]:
+        with self._storage.lock.exclusive():
+            self._next_id = None
+            return super().insert_multiple(documents)
+
+
+class SharedTinyDB(TinyDB):
+    """TinyDB database on a JSON file several processes can work on"""
+
+    table_class = LockedTable
+    default_storage_class = LockedJSONStorage
+
@@ -0,0 +1,361 @@
+"""
+Append-only log storage.
+
+Each write appends one JSON line to `<name>.log`. The whole database is only
+rewritten when the log is compacted into `<name>.snapshot.json`, on demand or
+in a background thread once the log holds `compact_threshold` records.
+
+The snapshot is JSON, or binary (see DBManagers.snapshot): a binary snapshot
+is memory-mapped and its documents are only decoded when they are read, so
+opening a large database costs almost nothing. Switching format is done by
+the next compaction, which removes the snapshot of the other format.
+
+On startup the snapshot is loaded and the log is replayed. A record torn by a
+crash (last line incomplete) is dropped and the log is truncated to the last
+complete record. Records carry a sequence number so a log that survived a
+compaction is never applied twice.
+
+LogDB.table() returns tables exposing the subset of the TinyDB Table API used
+by TinyManager, so TinyManager works on them unchanged.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Mapping, Optional
+
+from tinydb.table import Document
+
+from DBManagers.snapshot import LazyDocuments, Record, Snapshot, SnapshotTable, write_snapshot
+from Utils import instrumentation
+
+# snapshot format -> snapshot file suffix
+SNAPSHOT_SUFFIXES = {"json": ".snapshot.json", "binary": ".snapshot.bin"}
+
+
+class _DocumentsCopy(dict):
+    """Documents of a table, each one copied the first time it is read, for a TinyDB table updater"""
+
+    def __init__(self, documents: Mapping[int, dict]) -> None:
+        super().__init__()
+        self._documents = documents
+
+    def __missing__(self, doc_id: int) -> dict:
+        document = self[doc_id] = dict(self._documents[doc_id])
+        return document
+
+    def __contains__(self, doc_id) -> bool:
+        return dict.__contains__(self, doc_id) or doc_id in self._documents
+
+    def get(self, doc_id: int, default=None):
+        return self[doc_id] if doc_id in self else default
+
+
+class LogTable:
+    """Table kept in memory, every change is journaled by its LogDB"""
+
+    def __init__(self, name: str, db: "LogDB") -> None:
+        self.name = name
+        self._db = db
+        self._documents: dict[int, dict] | LazyDocuments = {}
+        self._next_id = 1
+
+    def insert(self, document: Mapping) -> int:
+        return self.insert_multiple([document])[0]
+
+    def insert_multiple(self, documents: Iterable[Mapping]) -> list[int]:
+        documents = [dict(document) for document in documents]
+        # ids, record and change together: a compaction captures the record with its documents
+        with self._db._lock:
+            doc_ids = list(range(self._next_id, self._next_id + len(documents)))
+            self._db.append({"op": "insert", "table": self.name, "ids": doc_ids, "docs": documents})
+            self._apply_insert(doc_ids, documents)
+        self._db.applied()
+        return doc_ids
+
+    def update(self, fields: Mapping, doc_ids: Iterable[int]) -> list[int]:
+        with self._db._lock:
+            doc_ids = [doc_id for doc_id in doc_ids if doc_id in self._documents]
+            if doc_ids:
+                self._db.append({"op": "update", "table": self.name, "ids": doc_ids, "fields": dict(fields)})
+                self._apply_update(doc_ids, fields)
+        if doc_ids:
+            self._db.applied()
+        return doc_ids
+
+    def _update_table(self, updater: Callable[[dict], None]) -> None:
+        """
+        Run a TinyDB table updater (it changes documents in place), then journal
+        the documents it changed as one record. Nothing is changed if it raises.
+        """
+
+        with self._db._lock:
+            documents = _DocumentsCopy(self._documents)
+            updater(documents)
+            changed = {doc_id: document for doc_id, document in documents.items()
+                       if document != self._documents[doc_id]}
+            if changed:
+                doc_ids, new_documents = list(changed), list(changed.values())
+                self._db.append({"op": "replace", "table": self.name, "ids": doc_ids, "docs": new_documents})
+                self._apply_replace(doc_ids, new_documents)
+        if changed:
+            self._db.applied()
+
+    def get(self,
+            cond: Optional[Callable] = None,
+            doc_id: Optional[int] = None,
+            doc_ids: Optional[Iterable[int]] = None):
+        if doc_id is not None:
+            document = self._documents.get(doc_id)
+            return None if document is None else Document(document, doc_id)
+        if doc_ids is not None:
+            return [Document(self._documents[doc_id], doc_id)
+                    for doc_id in doc_ids if doc_id in self._documents]
+        for document in self.search(cond):
+            return document
+        return None
+
+    def search(self, cond: Callable) -> list[Document]:
+        return [Document(document, doc_id)
+                for doc_id, document in self._documents.items() if cond(document)]
+
+    def all(self) -> list[Document]:
+        return list(iter(self))
+
+    def clear_cache(self) -> None:
+        """Nothing to clear, kept for TinyDB Table compatibility"""
+
+    def _load_snapshot(self, snapshot_table: SnapshotTable) -> None:
+        self._documents = LazyDocuments(snapshot_table)
+        self._next_id = snapshot_table.next_id
+
+    def _records(self) -> list[tuple[int, Record]]:
+        """Copy of the documents, the ones of a binary snapshot not changed since are kept encoded"""
+
+        if isinstance(self._documents, LazyDocuments):
+            return [(doc_id, record if isinstance(record, bytes) else dict(record))
+                    for doc_id, record in self._documents.records()]
+        return [(doc_id, dict(document)) for doc_id, document in self._documents.items()]
+
+    def _apply_insert(self, doc_ids: list[int], documents: list[dict]) -> None:
+        for doc_id, document in zip(doc_ids, documents):
+            self._documents[doc_id] = document
+        if doc_ids:
+            self._next_id = max(self._next_id, max(doc_ids) + 1)
+
+    def _apply_replace(self, doc_ids: list[int], documents: list[dict]) -> None:
+        for doc_id, document in zip(doc_ids, documents):
+            self._documents[doc_id] = document
+
+    def _apply_update(self, doc_ids: list[int], fields: Mapping) -> None:
+        documents = self._documents
+        for doc_id in doc_ids:
+            if doc_id in documents:
+                # set back: the documents of a binary snapshot are decoded copies
+                document = documents[doc_id]
+                document.update(fields)
+                documents[doc_id] = document
+
+    def __iter__(self) -> Iterator[Document]:
+        for doc_id, document in self._documents.items():
+            yield Document(document, doc_id)
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+
+class LogDB:
+    """Database made of a JSON snapshot and an append-only log of changes"""
+
+    def __init__(self,
+                 path: Path,
+                 compact_threshold: int = 10_000,
+                 background_compaction: bool = True,
+                 sync: bool = True,
+                 snapshot_format: str = "json") -> None:
+        """
+        :param path: path without extension, `.snapshot.json` (or `.snapshot.bin`) and `.log` files
+        are created next to it
+        :param compact_threshold: number of log records triggering a compaction, 0 to disable
+        :param background_compaction: compact in a thread instead of blocking the write
+        :param sync: fsync the log after each record
+        :param snapshot_format: "json" or "binary"
+        """
+
+        if snapshot_format not in SNAPSHOT_SUFFIXES:
+            raise ValueError(f"snapshot format must be one of {list(SNAPSHOT_SUFFIXES)}, not {snapshot_format!r}")
+        path = Path(path)
+        snapshot_paths = {file_format: path.with_name(path.name + suffix)
+                          for file_format, suffix in SNAPSHOT_SUFFIXES.items()}
+        self.snapshot_format = snapshot_format
+        self.snapshot_path = snapshot_paths.pop(snapshot_format)
+        self._other_snapshot_path = snapshot_paths.popitem()[1]
+        self.log_path = path.with_name(f"{path.name}.log")
+        self.compact_threshold = compact_threshold
+        self.background_compaction = background_compaction
+        self.sync = sync
+
+        self._tables: dict[str, LogTable] = {}
+        self._lock = threading.RLock()
+        self._sequence = 0
+        self._log_records = 0
+        self._compaction: Optional[threading.Thread] = None
+        # records written while a background compaction is running
+        self._tail: Optional[list[str]] = None
+
+        self._recover()
+        self._log = open(self.log_path, "a", encoding="utf-8")
+
+    def table(self, name: str) -> LogTable:
+        with self._lock:
+            if name not in self._tables:
+                self._tables[name] = LogTable(name, self)
+            return self._tables[name]
+
+    def tables(self) -> set[str]:
+        return set(self._tables)
+
+    def append(self, record: dict) -> None:
+        """Write one change record at the end of the log"""
+
+        with self._lock:
+            self._sequence += 1
+            record["seq"] = self._sequence
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            self._log.write(line)
+            self._log.flush()
+            if self.sync:
+                os.fsync(self._log.fileno())
+            if self._tail is not None:
+                self._tail.append(line)
+            self._log_records += 1
+            if instrumentation.ENABLED:
+                instrumentation.record_bytes("log", len(line.encode()))
+
+    def applied(self) -> None:
+        """Called by the tables once a record is applied in memory, compacts the log if needed"""
+
+        with self._lock:
+            if self.compact_threshold and self._log_records >= self.compact_threshold:
+                self._start_compaction()
+
+    def compact(self) -> None:
+        """Write a snapshot of the whole database and empty the log (blocking)"""
+
+        self.wait_for_compaction()
+        with self._lock:
+            sequence, tables = self._capture()
+            self._tail = []
+        self._compact(sequence, tables)
+
+    def wait_for_compaction(self) -> None:
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+
+    def close(self) -> None:
+        self.wait_for_compaction()
+        with self._lock:
+            self._log.close()
+
+    def _start_compaction(self) -> None:
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        sequence, tables = self._capture()
+        self._tail = []
+        if not self.background_compaction:
+            self._compact(sequence, tables)
+            return
+        self._compaction = threading.Thread(target=self._compact, args=(sequence, tables), daemon=True)
+        self._compaction.start()
+
+    def _capture(self) -> tuple[int, dict]:
+        """Copy of the database state, taken under the lock"""
+
+        if self.snapshot_format == "binary":
+            tables = {name: (table._next_id, table._records()) for name, table in self._tables.items()}
+        else:
+            tables = {
+                name: {str(doc_id): dict(document) for doc_id, document in table._documents.items()}
+                for name, table in self._tables.items()
+            }
+        return self._sequence, tables
+
+    def _compact(self, sequence: int, tables: dict) -> None:
+        if self.snapshot_format == "binary":
+            write_snapshot(self.snapshot_path, tables, sequence)
+        else:
+            tmp_path = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as snapshot:
+                json.dump({"seq": sequence, "tables": tables}, snapshot, ensure_ascii=False)
+                snapshot.flush()
+                os.fsync(snapshot.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+        # a snapshot left in the other format would be older than the log
+        self._other_snapshot_path.unlink(missing_ok=True)
+        if instrumentation.ENABLED:
+            instrumentation.record_bytes("log.snapshot", self.snapshot_path.stat().st_size)
+
+        # the snapshot is durable: keep only the records written since the capture
+        with self._lock:
+            tmp_log_path = self.log_path.with_name(self.log_path.name + ".tmp")
+            with open(tmp_log_path, "w", encoding="utf-8") as log:
+                log.writelines(self._tail)
+                log.flush()
+                os.fsync(log.fileno())
+            self._log.close()
+            os.replace(tmp_log_path, self.log_path)
+            self._log = open(self.log_path, "a", encoding="utf-8")
+            self._log_records = len(self._tail)
+            self._tail = None
+
+    def _recover(self) -> None:
+        """Load the snapshot then replay the log, dropping a torn last record"""
+
+        snapshot_sequence = 0
+        snapshot_path = self.snapshot_path if self.snapshot_path.exists() else self._other_snapshot_path
+        if snapshot_path.suffix == ".bin" and snapshot_path.exists():
+            snapshot = Snapshot(snapshot_path)
+            snapshot_sequence = snapshot.sequence
+            for name, snapshot_table in snapshot.tables.items():
+                self.table(name)._load_snapshot(snapshot_table)
+        elif snapshot_path.exists():
+            with open(snapshot_path, encoding="utf-8") as snapshot:
+                data = json.load(snapshot)
+            snapshot_sequence = data["seq"]
+            for name, documents in data["tables"].items():
+                doc_ids = [int(doc_id) for doc_id in documents]
+                self.table(name)._apply_insert(doc_ids, list(documents.values()))
+        self._sequence = snapshot_sequence
+
+        if not self.log_path.exists():
+            return
+
+        valid_size = 0
+        with open(self.log_path, "rb") as log:
+            for raw_line in log:
+                try:
+                    if not raw_line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    record = json.loads(raw_line)
+                except ValueError:
+                    break
+                valid_size += len(raw_line)
+                self._log_records += 1
+                if record["seq"] <= snapshot_sequence:
+                    continue
+                self._replay(record)
+                self._sequence = record["seq"]
+
+        if valid_size < self.log_path.stat().st_size:
+            with open(self.log_path, "r+b") as log:
+                log.truncate(valid_size)
+
+    def _replay(self, record: dict) -> None:
+        table = self.table(record["table"])
+        if record["op"] == "insert":
+            table._apply_insert(record["ids"], record["docs"])
+        elif record["op"] == "update":
+            table._apply_update(record["ids"], record["fields"])
+        elif record["op"] == "replace":
+            table._apply_replace(record["ids"], record["docs"])
@@ -0,0 +1,259 @@
+"""
+Db manager keeping the whole database in memory, for simulations and tests
+"""
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Optional, Union
+
+from tinydb.storages import JSONStorage
+from tinydb.table import Document
+
+from DBManagers.db_manager import VERSION_FIELD, DBManager, bound, new_sorted_views
+from DBManagers.indexes import IndexSet, SortedIndex, build_sorted_indexes
+from DBManagers.name_index import NameIndex
+from DBManagers.operations import resolve
+from DBManagers.query import compile_query, plan_query
+from Settings.project_config import INDEXED_FIELDS, NAME_INDEXED_FIELDS
+from Utils.exceptions import VersionConflictError
+from Utils.instrumentation import instrumented
+
+
+def _copy(value):
+    """Copy of the lists and dicts of a JSON value, so that the stored documents share nothing"""
+
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    return value
+
+
+@instrumented("db")
+class InMemoryManager(DBManager):
+    """
+    Tables are dicts {doc_id: document} held by the manager, with the hash indexes
+    of INDEXED_FIELDS, the name index and the sorted views of SORTED_VIEWS. Nothing
+    is written to disk but by flush(), which writes a database in the TinyDB format
+    (db.json) that load() reads back.
+
+    Tables are designated like with the other managers (table handles of
+    Settings.db_config, TinyDB tables...), only their name is used, so the
+    database of the project is never opened.
+
+    Returned documents are shared: they must be treated as read-only.
+    Written values are copied.
+    """
+
+    def __init__(self) -> None:
+        self._tables: dict[str, dict[int, Document]] = {}
+        self._next_ids: dict[str, int] = {}
+        self._index_sets: dict[str, IndexSet] = {}
+        self._name_indexes_by_table: dict[str, NameIndex] = {}
+        self._sorted_views_by_table: dict[str, dict[str, SortedIndex]] = {}
+
+    def _documents(self, db_table) -> dict[int, Document]:
+        documents = self._tables.get(db_table.name)
+        if documents is None:
+            documents = self._create_table(db_table.name, {})
+        return documents
+
+    def _create_table(self, name: str, documents: dict[int, Document]) -> dict[int, Document]:
+        self._tables[name] = documents
+        self._next_ids[name] = max(documents, default=0) + 1
+        index_set = self._index_sets[name] = IndexSet()
+        for fields in INDEXED_FIELDS.get(name, []):
+            index_set.declare(fields)
+        for index in index_set:
+            index.build(documents.items())
+        self._name_indexes_by_table.pop(name, None)
+        self._sorted_views_by_table.pop(name, None)
+        return documents
+
+    def _insert(self, db_table, data_list: Iterable[Mapping]) -> list[int]:
+        documents = self._documents(db_table)
+        name = db_table.name
+        index_set = self._index_sets[name]
+        name_index = self._name_indexes_by_table.get(name)
+        doc_ids = []
+        for data in data_list:
+            doc_id = self._next_ids[name]
+            self._next_ids[name] = doc_id + 1
+            documents[doc_id] = document = Document(_copy(dict(data)), doc_id)
+            index_set.add(doc_id, document)
+            if name_index is not None:
+                name_index.add(doc_id, document)
+            doc_ids.append(doc_id)
+        for view in self._sorted_views_by_table.get(name, {}).values():
+            view.add_many((doc_id, documents[doc_id]) for doc_id in doc_ids)
+        return doc_ids
+
+    def save(self, table, data) -> int:
+        return self._insert(table, [data])[0]
+
+    def save_many(self, table, data_list) -> list[int]:
+        return self._insert(table, data_list)
+
+    def get_all_objects_from_table(self, table) -> list:
+        return list(self._documents(table).values())
+
+    def _search_ids(self, db_table, values: list) -> list[int]:
+        """Ids through the index chosen by the query planner, checked against the other conditions"""
+
+        documents = self._documents(db_table)
+        plan = plan_query(values, self._index_sets[db_table.name])
+        if plan.index is None:
+            query = compile_query(values)
+            return [doc_id for doc_id, document in documents.items() if query(document)]
+
+        doc_ids = sorted(set().union(*(plan.index.lookup(key) for key in plan.keys)))
+        if plan.is_exact:
+            return doc_ids
+        residual = plan.residual
+        return [doc_id for doc_id in doc_ids if residual(documents[doc_id])]
+
+    def iter_ids(self, db_table, values: Optional[list] = None, batch_size: int = 1000) -> Iterator[int]:
+        if values:
+            return iter(self._search_ids(db_table, values))
+        return iter(list(self._documents(db_table)))
+
+    def iter_objects(self, db_table, values: Optional[list] = None, batch_size: int = 1000) -> Iterator[Document]:
+        documents = self._documents(db_table)
+        return (documents[doc_id] for doc_id in self.iter_ids(db_table, values, batch_size) if doc_id in documents)
+
+    def get_page(self, db_table, offset: int, limit: int, values: Optional[list] = None) -> list:
+        if values:
+            return self.get_objects_by_id(db_table, self._search_ids(db_table, values)[offset:offset + limit])
+        return list(islice(self._documents(db_table).values(), offset, offset + limit))
+
+    def count_objects_in_db(self, table) -> int:
+        return len(self._documents(table))
+
+    def count_objects(self, db_table, values) -> int:
+        self._documents(db_table)
+        plan = plan_query(values, self._index_sets[db_table.name])
+        if plan.is_exact:
+            return sum(plan.index.count(key) for key in plan.keys)
+        return len(self._search_ids(db_table, values))
+
+    def get_objects_id(self, db_table, values) -> list[int]:
+        return self._search_ids(db_table, values)
+
+    def get_object(self, db_table, values) -> Optional[Document]:
+        doc_ids = self._search_ids(db_table, values)
+        return self._documents(db_table)[doc_ids[0]] if doc_ids else None
+
+    def get_objects_by_id(self, db_table, instances_id_list) -> list:
+        documents = self._documents(db_table)
+        return [documents[doc_id] for doc_id in instances_id_list if doc_id in documents]
+
+    def get_model(self, db_table, doc_id, model):
+        document = self._documents(db_table).get(doc_id)
+        if document is None:
+            return None
+        return self.get_model_from_document(document, model)
+
+    def is_object_exist(self, db_table, values) -> bool:
+        return bool(self._search_ids(db_table, values))
+
+    def update_attributes(self, db_table, new_values, instance_id, expected_version=None) -> None:
+        self.update_many(db_table, {instance_id: new_values},
+                         None if expected_version is None else {instance_id: expected_version})
+
+    def update_attribute(self, db_table, attribute_name, new_attribute_value, instance_id,
+                         expected_version=None) -> None:
+        self.update_many(db_table, {instance_id: {attribute_name: new_attribute_value}},
+                         None if expected_version is None else {instance_id: expected_version})
+
+    def update_attribute_many(self, db_table, attribute_name, new_attribute_value, instances_id_list,
+                              expected_versions=None) -> None:
+        self.update_many(db_table, {instance_id: {attribute_name: new_attribute_value}
+                                    for instance_id in instances_id_list}, expected_versions)
+
+    def update_attribute_values(self, db_table, attribute_name, new_values_by_id) -> None:
+        self.update_many(db_table, {instance_id: {attribute_name: new_attribute_value}
+                                    for instance_id, new_attribute_value in new_values_by_id.items()})
+
+    def update_many(self, db_table, new_values_by_id: Mapping[int, Mapping],
+                    expected_versions: Optional[Mapping[int, int]] = None) -> None:
+        """
+        Set the fields of each document {doc_id: {field: value}} and increase its version,
+        operations are applied to the values stored, missing ids are skipped
+        :param expected_versions: {doc_id: version}, nothing is written if a document has another version
+        """
+
+        documents = self._documents(db_table)
+        if expected_versions:
+            conflicts = [doc_id for doc_id, version in expected_versions.items()
+                         if doc_id in documents and documents[doc_id].get(VERSION_FIELD, 0) != version]
+            if conflicts:
+                raise VersionConflictError(conflicts)
+        index_set = self._index_sets[db_table.name]
+        name_index = self._name_indexes_by_table.get(db_table.name)
+        views = self._sorted_views_by_table.get(db_table.name, {}).values()
+        moved: dict[SortedIndex, list[tuple[int, Document]]] = {}
+        for doc_id, new_values in new_values_by_id.items():
+            document = documents.get(doc_id)
+            if document is None:
+                continue
+            for attribute_name, new_attribute_value in resolve(document, new_values).items():
+                document[attribute_name] = _copy(new_attribute_value)
+                index_set.update_field([doc_id], attribute_name, new_attribute_value)
+            document[VERSION_FIELD] = document.get(VERSION_FIELD, 0) + 1
+            if name_index is not None and set(new_values) & set(name_index.fields):
+                name_index.add(doc_id, document)
+            for view in views:
+                if set(new_values) & set(view.fields):
+                    moved.setdefault(view, []).append((doc_id, document))
+        for view, view_documents in moved.items():
+            view.add_many(view_documents)
+
+    def _get_name_index(self, db_table) -> NameIndex:
+        index = self._name_indexes_by_table.get(db_table.name)
+        if index is None:
+            index = NameIndex(NAME_INDEXED_FIELDS.get(db_table.name, ("first_name", "last_name")))
+            index.build(self._documents(db_table).items())
+            self._name_indexes_by_table[db_table.name] = index
+        return index
+
+    def search_names(self, db_table, text: str, limit: int = 10) -> list[int]:
+        return self._get_name_index(db_table).search(text, limit)
+
+    def _get_sorted_views(self, db_table) -> dict[str, SortedIndex]:
+        views = self._sorted_views_by_table.get(db_table.name)
+        if views is None:
+            views = self._sorted_views_by_table[db_table.name] = new_sorted_views(db_table.name)
+            build_sorted_indexes(views.values(), self._documents(db_table).items())
+        return views
+
+    def get_sorted_ids(self, db_table, view: str, low=None, high=None, limit=None, reverse=False) -> list[int]:
+        views = self._get_sorted_views(db_table)
+        if view not in views:
+            raise ValueError(f"No sorted view {view!r} on the table {db_table.name}")
+        return views[view].range(bound(view, low), bound(view, high), limit, reverse)
+
+    def load(self, path: Union[Path, str]) -> None:
+        """Replace every table by the ones of a database in the TinyDB format (db.json)"""
+
+        storage = JSONStorage(str(path), access_mode="r")
+        try:
+            data = storage.read() or {}
+        finally:
+            storage.close()
+        self._tables.clear()
+        self._next_ids.clear()
+        self._index_sets.clear()
+        self._name_indexes_by_table.clear()
+        self._sorted_views_by_table.clear()
+        for name, documents in data.items():
+            self._create_table(name, {int(doc_id): Document(document, int(doc_id))
+                                      for doc_id, document in documents.items()})
+
+    def flush(self, path: Union[Path, str]) -> None:
+        """Write every table to a database in the TinyDB format (db.json), replacing its content"""
+
+        storage = JSONStorage(str(path), indent=4)
+        try:
+            storage.write({name: {str(doc_id): dict(document) for doc_id, document in documents.items()}
+                           for name, documents in self._tables.items()})
+        finally:
+            storage.close()
@@ -0,0 +1,225 @@
+"""
+Name search over the players: prefix and fuzzy matching.
+
+Names are folded (accents removed, case folded, hyphens and apostrophes
+turned into spaces), so "sylvere" finds "Sylvère" and "jean jacques" finds
+"Jean-Jacques".
+
+- Prefix index: player ids sorted by "first last" and by "last first" name,
+  searched with bisect. The keys are rebuilt from the folded names when
+  compared, so no key string is stored.
+- Fuzzy index: trigrams of each word of the name -> ids of the players holding
+  them. A query keeps the players sharing at least half of its trigrams and
+  ranks them by Dice similarity, whatever the order of the words. With NumPy,
+  the shared trigrams of every player are counted at once with bincount.
+  Without it, they are counted on the rarest posting lists first: any player
+  sharing enough trigrams is in one of them. The other lists, the most
+  common, only raise an upper bound of the count, which stops the scoring as
+  soon as no remaining candidate can enter the top k.
+"""
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from functools import lru_cache
+from itertools import groupby
+from math import ceil
+from typing import Iterable, Mapping
+
+from Utils.lazy_import import lazy_import
+from Utils.sort_keys import fold
+
+# NumPy is optional, imported on first use
+np = lazy_import("numpy")
+
+NGRAM = 3
+# Share of the query trigrams a player must hold to be a fuzzy candidate
+MIN_SHARED_NGRAMS = 0.5
+# Postings counted per query beyond the lists needed to find every candidate
+COUNTED_POSTINGS = 200_000
+
+_EMPTY = array("I")
+
+
+@lru_cache(maxsize=100_000)
+def ngrams(folded: str) -> frozenset[str]:
+    """Trigrams of each word of a folded name, padded with spaces"""
+
+    grams = set()
+    for word in folded.split():
+        padded = f" {word} "
+        grams.update(padded[position:position + NGRAM] for position in range(len(padded) - NGRAM + 1))
+    return frozenset(grams)
+
+
+class NameIndex:
+
+    def __init__(self, fields: tuple[str, str] = ("first_name", "last_name"), use_numpy: bool = True) -> None:
+        """
+        :param fields: first name and last name fields of the documents
+        :param use_numpy: set False to force the pure Python fuzzy search
+        """
+
+        self.fields = fields
+        self.use_numpy = use_numpy and np is not None
+        self._names: dict[int, tuple[str, str]] = {}
+        self._by_first_name = array("I")
+        self._by_last_name = array("I")
+        self._postings: dict[str, array] = {}
+        # doc_id -> number of trigrams of the name
+        self._ngram_counts = array("H")
+
+    def _first_last(self, doc_id: int) -> str:
+        first_name, last_name = self._names[doc_id]
+        return f"{first_name} {last_name}"
+
+    def _last_first(self, doc_id: int) -> str:
+        first_name, last_name = self._names[doc_id]
+        return f"{last_name} {first_name}"
+
+    def _fold_document(self, document: Mapping) -> tuple[str, str]:
+        first_name, last_name = self.fields
+        return fold(document.get(first_name) or ""), fold(document.get(last_name) or "")
+
+    @staticmethod
+    def _name_ngrams(names: tuple[str, str]) -> frozenset[str]:
+        return ngrams(names[0]) | ngrams(names[1])
+
+    def _set_ngram_count(self, doc_id: int, count: int) -> None:
+        missing = doc_id + 1 - len(self._ngram_counts)
+        if missing > 0:
+            self._ngram_counts.extend([0] * missing)
+        self._ngram_counts[doc_id] = count
+
+    def build(self, documents: Iterable[tuple[int, Mapping]]) -> None:
+        names = self._names
+        names.clear()
+        postings = self._postings
+        postings.clear()
+        self._ngram_counts = array("H")
+        for doc_id, document in documents:
+            names[doc_id] = document_names = self._fold_document(document)
+            name_ngrams = self._name_ngrams(document_names)
+            for gram in name_ngrams:
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array("I")
+                posting.append(doc_id)
+            self._set_ngram_count(doc_id, len(name_ngrams))
+        self._by_first_name = array("I", sorted(names, key=self._first_last))
+        self._by_last_name = array("I", sorted(names, key=self._last_first))
+
+    def add(self, doc_id: int, document: Mapping) -> None:
+        """Index a new document, or the new names of a document"""
+
+        names = self._fold_document(document)
+        if self._names.get(doc_id) == names:
+            return
+        self.remove(doc_id)
+        self._names[doc_id] = names
+        for sorted_ids, key in ((self._by_first_name, self._first_last), (self._by_last_name, self._last_first)):
+            sorted_ids.insert(bisect_left(sorted_ids, key(doc_id), key=key), doc_id)
+        name_ngrams = self._name_ngrams(names)
+        for gram in name_ngrams:
+            self._postings.setdefault(gram, array("I")).append(doc_id)
+        self._set_ngram_count(doc_id, len(name_ngrams))
+
+    def remove(self, doc_id: int) -> None:
+        names = self._names.get(doc_id)
+        if names is None:
+            return
+        for sorted_ids, key in ((self._by_first_name, self._first_last), (self._by_last_name, self._last_first)):
+            name = key(doc_id)
+            start = bisect_left(sorted_ids, name, key=key)
+            end = bisect_right(sorted_ids, name, key=key)
+            del sorted_ids[sorted_ids.index(doc_id, start, end)]
+        for gram in self._name_ngrams(names):
+            self._postings[gram].remove(doc_id)
+        self._ngram_counts[doc_id] = 0
+        del self._names[doc_id]
+
+    def prefix(self, text: str, limit: int = 10) -> list[int]:
+        """
+        Players whose "last first" or "first last" name starts with text
+        :return: at most limit ids, "last first" matches first, in alphabetical order
+        """
+
+        query = fold(text)
+        if not query:
+            return []
+        found: dict[int, None] = {}
+        for sorted_ids, key in ((self._by_last_name, self._last_first), (self._by_first_name, self._first_last)):
+            position = bisect_left(sorted_ids, query, key=key)
+            while position < len(sorted_ids) and len(found) < limit and key(sorted_ids[position]).startswith(query):
+                found[sorted_ids[position]] = None
+                position += 1
+        return list(found)
+
+    def fuzzy(self, text: str, limit: int = 10) -> list[tuple[float, int]]:
+        """
+        Players with a name close to text, whatever the order of the words
+        :return: at most limit (similarity from 0 to 1, id), best first
+        """
+
+        query_ngrams = ngrams(fold(text))
+        if not query_ngrams:
+            return []
+        size = len(query_ngrams)
+        needed = max(1, ceil(size * MIN_SHARED_NGRAMS))
+        postings = sorted((self._postings.get(gram, _EMPTY) for gram in query_ngrams), key=len)
+        if self.use_numpy:
+            return self._fuzzy_numpy(postings, size, needed, limit)
+
+        counts = Counter()
+        counted_lists = counted_postings = 0
+        for posting in postings:
+            if counted_lists > size - needed and counted_postings + len(posting) > COUNTED_POSTINGS:
+                break
+            counts.update(posting)
+            counted_lists += 1
+            counted_postings += len(posting)
+        not_counted = size - counted_lists
+
+        best: list[tuple[float, int]] = []
+        minimum_count = needed - not_counted
+        by_count = sorted((item for item in counts.items() if item[1] >= minimum_count), key=lambda item: -item[1])
+        for count, group in groupby(by_count, key=lambda item: item[1]):
+            shared_bound = count + not_counted
+            if len(best) == limit and 2 * shared_bound / (size + shared_bound) < best[0][0]:
+                break
+            for doc_id, _ in group:
+                candidate_ngrams = self._name_ngrams(self._names[doc_id])
+                shared = len(query_ngrams & candidate_ngrams)
+                if shared < needed:
+                    continue
+                score = (2 * shared / (size + len(candidate_ngrams)), -doc_id)
+                if len(best) < limit:
+                    heapq.heappush(best, score)
+                elif score > best[0]:
+                    heapq.heapreplace(best, score)
+        return [(score, -negative_id) for score, negative_id in sorted(best, reverse=True)]
+
+    def _fuzzy_numpy(self, postings: list[array], size: int, needed: int, limit: int) -> list[tuple[float, int]]:
+        postings = [np.frombuffer(posting, dtype=np.uint32) for posting in postings if posting]
+        if not postings:
+            return []
+        shared = np.bincount(np.concatenate(postings), minlength=len(self._ngram_counts))
+        candidates = np.flatnonzero(shared >= needed)
+        ngram_counts = np.frombuffer(self._ngram_counts, dtype=np.uint16)[candidates]
+        scores = 2 * shared[candidates] / (size + ngram_counts)
+        top = np.argsort(-scores, kind="stable")[:limit]
+        return list(zip(scores[top].tolist(), candidates[top].tolist()))
+
+    def search(self, text: str, limit: int = 10) -> list[int]:
+        """Prefix matches first, then the closest fuzzy matches"""
+
+        found = dict.fromkeys(self.prefix(text, limit))
+        if len(found) < limit:
+            for _, doc_id in self.fuzzy(text, limit):
+                found.setdefault(doc_id)
+                if len(found) == limit:
+                    break
+        return list(found)
+
+    def __len__(self) -> int:
+        return len(self._names)
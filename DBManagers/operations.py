@@ -0,0 +1,61 @@
+"""
+In-place operations on the fields of a document.
+
+Given as values to the update methods of the db managers, they are applied to
+the value stored when the document is written (under the lock of a shared
+database), so an update computed from a stale copy of the document cannot
+overwrite a concurrent one:
+
+    db_manager.update_many(PLAYERS_TABLE, {
+        player_id: {"tournament_score": Increment(points), "players_already_faced": Append(opponent_id)},
+    })
+"""
+from typing import Any, Mapping
+
+
+class Operation:
+    """Change of a field computed from its current value"""
+
+    __slots__ = ()
+
+    def apply(self, value: Any) -> Any:
+        """:return: the new value of the field, value is None if the field is missing"""
+
+        raise NotImplementedError
+
+
+class Increment(Operation):
+    """Add amount to a number, a missing field counts as 0"""
+
+    __slots__ = ("amount",)
+
+    def __init__(self, amount: float = 1) -> None:
+        self.amount = amount
+
+    def apply(self, value: Any) -> Any:
+        return (value or 0) + self.amount
+
+    def __repr__(self) -> str:
+        return f"Increment({self.amount!r})"
+
+
+class Append(Operation):
+    """Add items at the end of a list, a missing field counts as an empty list"""
+
+    __slots__ = ("items",)
+
+    def __init__(self, *items: Any) -> None:
+        self.items = list(items)
+
+    def apply(self, value: Any) -> Any:
+        return [*(value or []), *self.items]
+
+    def __repr__(self) -> str:
+        return f"Append({', '.join(map(repr, self.items))})"
+
+
+def resolve(document: Mapping, new_values: Mapping[str, Any]) -> dict[str, Any]:
+    """:return: the new values, operations applied to the values of the document"""
+
+    return {field: value.apply(document.get(field)) if isinstance(value, Operation) else value
+            for field, value in new_values.items()}
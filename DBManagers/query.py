@@ -0,0 +1,185 @@
+"""
+Search conditions shared by the db managers, compiled into cacheable predicates.
+
+A search is a list of conditions, all of them must match:
+    ("field", value)                          equality, as before
+    ("field", "==", value)
+    ("field", "in", [value, ...])
+    ("field", "between", (low, high))         inclusive, None for an open bound
+    ("field", "prefix", "text")               case insensitive (casefold), on every backend
+    ("field", "date_between", (low, high))    dd/mm/yyyy dates, inclusive
+
+Conditions are normalized into a frozenset, so the same search written in
+another order gives the same compiled query: compile_query() then returns
+the cached instance, and TinyDB finds its results in its query cache.
+The predicate is generated as a single expression, evaluated without any
+per-document allocation.
+"""
+from functools import lru_cache
+from itertools import product
+from typing import Hashable, Iterable, Optional
+
+from tinydb.queries import QueryInstance
+
+from DBManagers.indexes import HashIndex, IndexSet
+from Utils.sort_keys import date_bound, date_key
+
+OPERATORS = ("==", "in", "between", "date_between", "prefix")
+# Evaluation order in the generated predicate: cheapest and most selective first
+_OPERATOR_COST = {operator: cost for cost, operator in enumerate(OPERATORS)}
+# An index is not used for an IN query needing more bucket lookups than this
+MAX_INDEX_KEYS = 256
+# With conditions left to check, a scan beats reading more than this share of the table by id
+MAX_INDEX_SHARE = 0.25
+
+Condition = tuple[str, str, Hashable]
+
+
+def normalize(values: Iterable[tuple]) -> frozenset[Condition]:
+    """
+    Canonical form of a search
+    :param values: conditions, see the module documentation
+    :return: hashable set of (field, operator, value)
+    :raise ValueError: unknown operator or malformed condition
+    """
+
+    conditions = set()
+    for condition in values:
+        if len(condition) == 2:
+            field, operator, value = condition[0], "==", condition[1]
+        else:
+            field, operator, value = condition
+        if operator not in OPERATORS:
+            raise ValueError(f"Unknown operator: {operator!r}")
+
+        if operator == "in":
+            value = frozenset(value)
+        elif operator == "between":
+            value = tuple(value)
+        elif operator == "date_between":
+            value = tuple(None if bound is None else date_bound(bound) for bound in value)
+        elif operator == "prefix":
+            value = str(value).casefold()
+        if operator in ("between", "date_between") and len(value) != 2:
+            raise ValueError(f"Expected (low, high) for {field!r}, got {value!r}")
+        conditions.add((field, operator, value))
+    return frozenset(conditions)
+
+
+class CompiledQuery(QueryInstance):
+    """TinyDB query built from normalized conditions, equal to any query with the same conditions"""
+
+    def __init__(self, conditions: frozenset[Condition]) -> None:
+        self.conditions = conditions
+        super().__init__(test=self._compile(conditions), hashval=("conditions", conditions))
+
+    @staticmethod
+    def _compile(conditions: frozenset[Condition]):
+        namespace = {}
+        checks = []
+        ordered = sorted(conditions, key=lambda condition: (_OPERATOR_COST[condition[1]], condition[0]))
+        for position, (field, operator, value) in enumerate(ordered):
+            name = f"value_{position}"
+            getter = f"document.get({field!r})"
+
+            if operator == "==":
+                namespace[name] = value
+                checks.append(f"{getter} == {name}")
+            elif operator == "in":
+                namespace[name] = value
+                checks.append(f"{getter} in {name}")
+            elif operator == "prefix":
+                namespace[name] = value
+                checks.append(f"isinstance(found := {getter}, str) and found.casefold().startswith({name})")
+            else:
+                if operator == "between":
+                    checks.append(f"(found := {getter}) is not None")
+                    key = "found"
+                else:
+                    # dates which cannot be read (key 0) match no range
+                    namespace["date_key"] = date_key
+                    checks.append(f"isinstance(found := {getter}, str) and (found := date_key(found))")
+                    key = "found"
+                low, high = value
+                if low is not None:
+                    namespace[f"{name}_low"] = low
+                if high is not None:
+                    namespace[f"{name}_high"] = high
+                bounds = (f"{name}_low <= " if low is not None else "") + key + \
+                         (f" <= {name}_high" if high is not None else "")
+                if bounds != key:
+                    checks.append(bounds)
+
+        return eval(f"lambda document: {' and '.join(checks) or 'True'}", namespace)
+
+    def __repr__(self) -> str:
+        return f"CompiledQuery({sorted(self.conditions, key=repr)})"
+
+
+@lru_cache(maxsize=1024)
+def _compile_conditions(conditions: frozenset[Condition]) -> CompiledQuery:
+    return CompiledQuery(conditions)
+
+
+def compile_query(values: Iterable[tuple]) -> CompiledQuery:
+    """Compiled query of a search, built once per distinct set of conditions"""
+
+    return _compile_conditions(normalize(values))
+
+
+class QueryPlan:
+    """
+    How to run a search: the index buckets to read, then the conditions left to
+    check on the documents found. Without index, the residual query is the whole
+    search and the table is scanned.
+    """
+
+    __slots__ = ("index", "keys", "residual")
+
+    def __init__(self, index: Optional[HashIndex], keys: list[tuple], residual: CompiledQuery) -> None:
+        self.index = index
+        self.keys = keys
+        self.residual = residual
+
+    @property
+    def is_exact(self) -> bool:
+        """True if the index buckets hold exactly the matching documents"""
+
+        return self.index is not None and not self.residual.conditions
+
+
+def plan_query(values: Iterable[tuple], index_set: IndexSet) -> QueryPlan:
+    """
+    Choose the index serving the most fields of the search with equality or IN
+    conditions, the one needing the fewest bucket lookups among them.
+    :param values: conditions of the search
+    :param index_set: indexes of the searched table
+    :return: plan of the search
+    """
+
+    conditions = normalize(values)
+    lookup_values: dict[str, frozenset] = {}
+    for field, operator, value in conditions:
+        if operator in ("==", "in"):
+            candidates = frozenset([value]) if operator == "==" else value
+            lookup_values[field] = lookup_values.get(field, candidates) & candidates
+
+    best, best_keys = None, 0
+    for index in index_set:
+        if not all(field in lookup_values for field in index.fields):
+            continue
+        keys = 1
+        for field in index.fields:
+            keys *= len(lookup_values[field])
+        if keys > MAX_INDEX_KEYS:
+            continue
+        if best is None or (len(index.fields), -keys) > (len(best.fields), -best_keys):
+            best, best_keys = index, keys
+
+    if best is None:
+        return QueryPlan(None, [], _compile_conditions(conditions))
+
+    keys = list(product(*(lookup_values[field] for field in best.fields)))
+    residual = frozenset(condition for condition in conditions
+                         if condition[0] not in best.fields or condition[1] not in ("==", "in"))
+    return QueryPlan(best, keys, _compile_conditions(residual))
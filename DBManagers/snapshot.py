@@ -0,0 +1,467 @@
+"""
+Binary snapshot of a database: one memory-mapped file, decoded lazily per record.
+
+Layout (little-endian integers):
+    header     b"CHESSNAP", format version (u32), reserved (u32), log sequence (u64), directory offset (u64)
+    records    one MessagePack map per document, the tables one after the other
+    per table  doc ids by increasing order (u32 array), then record offsets (u64 array, one more than
+               the ids: the last one is the end of the last record), both 8-byte aligned
+    directory  number of tables (u32), then for each table: name (u16 size + utf-8), number of
+               documents (u32), next doc id (u32), offset of the ids (u64), offset of the record offsets (u64)
+
+Opening a snapshot only reads its header and directory: the id and offset
+arrays are used in place, a document is looked up by bisection (directly when
+the ids have no gaps) and decoded when it is read. Records are decoded by
+msgpack when it is installed, in pure Python otherwise.
+
+Conversion to and from JSON is loss-free: integers beyond 64 bits are stored
+as an extension holding their digits, floats as 64-bit floats, and the order
+of the keys is kept.
+
+    python -m DBManagers.snapshot to-binary db.json db.snapshot.bin
+    python -m DBManagers.snapshot to-json db.snapshot.bin db.json --indent 4
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Mapping, Optional, Union
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is optional
+    msgpack = None
+
+MAGIC = b"CHESSNAP"
+VERSION = 1
+# MessagePack extension type of the integers beyond 64 bits, stored as decimal digits
+BIG_INTEGER_EXT = 1
+
+_HEADER = struct.Struct("<8sIIQQ")
+_COUNT = struct.Struct("<I")
+_NAME_SIZE = struct.Struct("<H")
+_TABLE_ENTRY = struct.Struct("<IIQQ")
+_LITTLE_ENDIAN = sys.byteorder == "little"
+_WRITE_BUFFER = 1 << 20
+
+Record = Union[Mapping, bytes]
+TablesRecords = Mapping[str, tuple[int, Iterable[tuple[int, Record]]]]
+
+# (exclusive limit, tag, packer) of the MessagePack formats, smallest first
+_UNSIGNED = [(1 << 8, 0xCC, struct.Struct(">BB")), (1 << 16, 0xCD, struct.Struct(">BH")),
+             (1 << 32, 0xCE, struct.Struct(">BI")), (1 << 64, 0xCF, struct.Struct(">BQ"))]
+_SIGNED = [(1 << 7, 0xD0, struct.Struct(">Bb")), (1 << 15, 0xD1, struct.Struct(">Bh")),
+           (1 << 31, 0xD2, struct.Struct(">Bi")), (1 << 63, 0xD3, struct.Struct(">Bq"))]
+_EXT_SIZES = [(1 << 8, 0xC7, struct.Struct(">BB")), (1 << 16, 0xC8, struct.Struct(">BH")),
+              (1 << 32, 0xC9, struct.Struct(">BI"))]
+# (size limit of the fixed format, wider formats)
+_STR_SIZES = (32, [(1 << 8, 0xD9, struct.Struct(">BB")), (1 << 16, 0xDA, struct.Struct(">BH")),
+                   (1 << 32, 0xDB, struct.Struct(">BI"))])
+_ARRAY_SIZES = (16, [(1 << 16, 0xDC, struct.Struct(">BH")), (1 << 32, 0xDD, struct.Struct(">BI"))])
+_MAP_SIZES = (16, [(1 << 16, 0xDE, struct.Struct(">BH")), (1 << 32, 0xDF, struct.Struct(">BI"))])
+_FLOAT = struct.Struct(">Bd")
+
+# decoding: tag -> value, number format or size format
+_CONSTANTS = {0xC0: None, 0xC2: False, 0xC3: True}
+_NUMBERS = {0xCA: struct.Struct(">f"), 0xCB: struct.Struct(">d"),
+            **{tag: struct.Struct(">" + packer.format[2:]) for _, tag, packer in _UNSIGNED + _SIGNED}}
+_SIZES = {tag: struct.Struct(">" + packer.format[2:])
+          for _, tag, packer in _EXT_SIZES + _STR_SIZES[1] + _ARRAY_SIZES[1] + _MAP_SIZES[1]}
+
+
+def _encode_size(size: int, sizes: tuple, fixed_tag: int, out: bytearray) -> None:
+    fixed_limit, wider = sizes
+    if size < fixed_limit:
+        out.append(fixed_tag | size)
+        return
+    for limit, tag, packer in wider:
+        if size < limit:
+            out += packer.pack(tag, size)
+            return
+    raise ValueError(f"too large to be stored: {size}")
+
+
+def _encode(value: Any, out: bytearray) -> None:
+    if value is None:
+        out.append(0xC0)
+    elif value is True:
+        out.append(0xC3)
+    elif value is False:
+        out.append(0xC2)
+    elif isinstance(value, int):
+        if 0 <= value < 0x80:
+            out.append(value)
+        elif -32 <= value < 0:
+            out.append(value & 0xFF)
+        else:
+            for limit, tag, packer in (_UNSIGNED if value > 0 else _SIGNED):
+                if -limit <= value < limit:
+                    out += packer.pack(tag, int(value))
+                    return
+            digits = str(int(value)).encode()
+            for limit, tag, packer in _EXT_SIZES:
+                if len(digits) < limit:
+                    out += packer.pack(tag, len(digits))
+                    break
+            out.append(BIG_INTEGER_EXT)
+            out += digits
+    elif isinstance(value, float):
+        out += _FLOAT.pack(0xCB, value)
+    elif isinstance(value, str):
+        encoded = value.encode("utf-8", "surrogatepass")
+        _encode_size(len(encoded), _STR_SIZES, 0xA0, out)
+        out += encoded
+    elif isinstance(value, (list, tuple)):
+        _encode_size(len(value), _ARRAY_SIZES, 0x90, out)
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, Mapping):
+        _encode_size(len(value), _MAP_SIZES, 0x80, out)
+        for key, item in value.items():
+            if not isinstance(key, str):
+                raise TypeError(f"keys must be str, not {type(key).__name__}")
+            _encode(key, out)
+            _encode(item, out)
+    else:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_record(document: Mapping) -> bytes:
+    out = bytearray()
+    _encode(document, out)
+    return bytes(out)
+
+
+def _decode(data: bytes, position: int) -> tuple[Any, int]:
+    tag = data[position]
+    position += 1
+    if tag < 0x80:
+        return tag, position
+    if tag >= 0xE0:
+        return tag - 0x100, position
+    if 0xA0 <= tag < 0xC0:
+        end = position + (tag & 0x1F)
+        return data[position:end].decode("utf-8", "surrogatepass"), end
+    if tag < 0x90:
+        return _decode_map(data, position, tag & 0x0F)
+    if tag < 0xA0:
+        return _decode_array(data, position, tag & 0x0F)
+    if tag in _CONSTANTS:
+        return _CONSTANTS[tag], position
+    if tag in _NUMBERS:
+        number = _NUMBERS[tag]
+        return number.unpack_from(data, position)[0], position + number.size
+    if tag not in _SIZES:
+        raise ValueError(f"unsupported record tag: {tag:#x}")
+    packer = _SIZES[tag]
+    size = packer.unpack_from(data, position)[0]
+    position += packer.size
+    if tag <= 0xC9:
+        if data[position] != BIG_INTEGER_EXT:
+            raise ValueError(f"unsupported record extension: {data[position]}")
+        end = position + 1 + size
+        return int(data[position + 1:end]), end
+    if tag <= 0xDB:
+        end = position + size
+        return data[position:end].decode("utf-8", "surrogatepass"), end
+    if tag <= 0xDD:
+        return _decode_array(data, position, size)
+    return _decode_map(data, position, size)
+
+
+def _decode_array(data: bytes, position: int, size: int) -> tuple[list, int]:
+    items = []
+    for _ in range(size):
+        item, position = _decode(data, position)
+        items.append(item)
+    return items, position
+
+
+def _decode_map(data: bytes, position: int, size: int) -> tuple[dict, int]:
+    document = {}
+    for _ in range(size):
+        tag = data[position]
+        # short keys and small values, the usual case, are decoded here
+        if 0xA0 <= tag < 0xC0:
+            end = position + 1 + (tag & 0x1F)
+            key = data[position + 1:end].decode("utf-8", "surrogatepass")
+            position = end
+        else:
+            key, position = _decode(data, position)
+        tag = data[position]
+        if 0xA0 <= tag < 0xC0:
+            end = position + 1 + (tag & 0x1F)
+            document[key] = data[position + 1:end].decode("utf-8", "surrogatepass")
+            position = end
+        elif tag < 0x80:
+            document[key] = tag
+            position += 1
+        else:
+            document[key], position = _decode(data, position)
+    return document, position
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code == BIG_INTEGER_EXT:
+        return int(data)
+    return msgpack.ExtType(code, data)
+
+
+def decode_record(record: bytes) -> dict:
+    if msgpack is not None:
+        return msgpack.unpackb(record, ext_hook=_ext_hook)
+    return _decode(record, 0)[0]
+
+
+def _uint_view(buffer: mmap.mmap, offset: int, count: int, typecode: str) -> Union[memoryview, array]:
+    """Array of the file used in place, copied only on big-endian machines"""
+
+    size = array(typecode).itemsize
+    view = memoryview(buffer)[offset:offset + count * size]
+    if _LITTLE_ENDIAN:
+        return view.cast(typecode)
+    values = array(typecode, view.tobytes())
+    values.byteswap()
+    return values
+
+
+class SnapshotTable(Mapping):
+    """Read-only documents of a table, decoded at each read"""
+
+    def __init__(self, buffer: mmap.mmap, ids, offsets, next_id: int) -> None:
+        self._buffer = buffer
+        self._ids = ids
+        self._offsets = offsets
+        self.next_id = next_id
+
+    def _position(self, doc_id: int) -> Optional[int]:
+        ids = self._ids
+        if not ids:
+            return None
+        # ids without gaps: the position is known
+        position = doc_id - ids[0]
+        if 0 <= position < len(ids) and ids[position] == doc_id:
+            return position
+        position = bisect_left(ids, doc_id)
+        if position < len(ids) and ids[position] == doc_id:
+            return position
+        return None
+
+    def raw(self, doc_id: int) -> bytes:
+        """Record of a document, not decoded"""
+
+        position = self._position(doc_id)
+        if position is None:
+            raise KeyError(doc_id)
+        return self._buffer[self._offsets[position]:self._offsets[position + 1]]
+
+    def records(self) -> Iterator[tuple[int, bytes]]:
+        """(doc id, record not decoded) by increasing id"""
+
+        buffer, offsets = self._buffer, self._offsets
+        for position, doc_id in enumerate(self._ids):
+            yield doc_id, buffer[offsets[position]:offsets[position + 1]]
+
+    def __getitem__(self, doc_id: int) -> dict:
+        return decode_record(self.raw(doc_id))
+
+    def __contains__(self, doc_id: object) -> bool:
+        return isinstance(doc_id, int) and self._position(doc_id) is not None
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class Snapshot:
+    """Snapshot file opened read-only, the tables are decoded on demand"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            self._buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = self._buffer
+
+        magic, version, _, self.sequence, directory_offset = _HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a database snapshot")
+        if version != VERSION:
+            raise ValueError(f"{self.path}: unsupported snapshot version {version}")
+
+        self.tables: dict[str, SnapshotTable] = {}
+        table_count = _COUNT.unpack_from(buffer, directory_offset)[0]
+        position = directory_offset + _COUNT.size
+        for _ in range(table_count):
+            name_size = _NAME_SIZE.unpack_from(buffer, position)[0]
+            position += _NAME_SIZE.size
+            name = buffer[position:position + name_size].decode()
+            position += name_size
+            count, next_id, ids_offset, offsets_offset = _TABLE_ENTRY.unpack_from(buffer, position)
+            position += _TABLE_ENTRY.size
+            self.tables[name] = SnapshotTable(buffer,
+                                              _uint_view(buffer, ids_offset, count, "I"),
+                                              _uint_view(buffer, offsets_offset, count + 1, "Q"),
+                                              next_id)
+
+
+def _write_array(file, values: array) -> int:
+    """Write 8-byte aligned, little-endian :return: offset of the array"""
+
+    file.write(b"\0" * (-file.tell() % 8))
+    offset = file.tell()
+    if not _LITTLE_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    values.tofile(file)
+    return offset
+
+
+def write_snapshot(path: Path, tables: TablesRecords, sequence: int = 0) -> None:
+    """
+    Write a snapshot atomically (temporary file then rename)
+    :param tables: name -> (next doc id, (doc id, document or record already encoded) by increasing id)
+    :param sequence: sequence number of the last log record held by the snapshot
+    """
+
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as file:
+        file.write(_HEADER.pack(MAGIC, VERSION, 0, sequence, 0))
+        entries = []
+        for name, (next_id, records) in tables.items():
+            ids, offsets = array("I"), array("Q")
+            position = file.tell()
+            buffer = bytearray()
+            for doc_id, record in records:
+                if ids and doc_id <= ids[-1]:
+                    raise ValueError(f"table {name}: doc ids must be increasing")
+                if not isinstance(record, bytes):
+                    record = encode_record(record)
+                ids.append(doc_id)
+                offsets.append(position)
+                position += len(record)
+                buffer += record
+                if len(buffer) >= _WRITE_BUFFER:
+                    file.write(buffer)
+                    buffer.clear()
+            file.write(buffer)
+            offsets.append(position)
+            entries.append((name, len(ids), next_id, _write_array(file, ids), _write_array(file, offsets)))
+
+        directory_offset = file.tell()
+        file.write(_COUNT.pack(len(entries)))
+        for name, count, next_id, ids_offset, offsets_offset in entries:
+            encoded_name = name.encode()
+            file.write(_NAME_SIZE.pack(len(encoded_name)) + encoded_name)
+            file.write(_TABLE_ENTRY.pack(count, next_id, ids_offset, offsets_offset))
+        file.seek(0)
+        file.write(_HEADER.pack(MAGIC, VERSION, 0, sequence, directory_offset))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def json_to_snapshot(json_path: Path, snapshot_path: Path) -> None:
+    """Convert a TinyDB database or a log snapshot (JSON) to a binary snapshot"""
+
+    with open(json_path, encoding="utf-8") as file:
+        data = json.load(file)
+    sequence = 0
+    if isinstance(data.get("seq"), int) and isinstance(data.get("tables"), dict):
+        sequence, data = data["seq"], data["tables"]
+
+    tables = {}
+    for name, documents in data.items():
+        records = sorted((int(doc_id), document) for doc_id, document in documents.items())
+        tables[name] = (records[-1][0] + 1 if records else 1, records)
+    write_snapshot(snapshot_path, tables, sequence)
+
+
+def snapshot_to_json(snapshot_path: Path,
+                     json_path: Path,
+                     log_snapshot: bool = False,
+                     indent: Optional[int] = None) -> None:
+    """
+    Convert a binary snapshot to JSON
+    :param log_snapshot: write a log snapshot ({"seq": ..., "tables": ...}) instead of a TinyDB database
+    """
+
+    snapshot = Snapshot(snapshot_path)
+    tables = {name: {str(doc_id): document for doc_id, document in table.items()}
+              for name, table in snapshot.tables.items()}
+    data = {"seq": snapshot.sequence, "tables": tables} if log_snapshot else tables
+    tmp_path = Path(json_path).with_name(Path(json_path).name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        # same escaping as TinyDB and LogDB, so the files are identical to theirs
+        json.dump(data, file, ensure_ascii=not log_snapshot, indent=indent)
+    os.replace(tmp_path, json_path)
+
+
+class LazyDocuments(Mapping):
+    """
+    Documents of a snapshot table, decoded at each read, over the documents
+    set since the snapshot, kept in memory
+    """
+
+    def __init__(self, table: SnapshotTable) -> None:
+        self._table = table
+        self._changed: dict[int, dict] = {}
+        self._added: dict[int, None] = {}
+
+    def __getitem__(self, doc_id: int) -> dict:
+        document = self._changed.get(doc_id)
+        if document is None:
+            return self._table[doc_id]
+        return document
+
+    def __setitem__(self, doc_id: int, document: dict) -> None:
+        if doc_id not in self._changed and doc_id not in self._table:
+            self._added[doc_id] = None
+        self._changed[doc_id] = document
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self._changed or doc_id in self._table
+
+    def __iter__(self) -> Iterator[int]:
+        yield from self._table
+        yield from self._added
+
+    def __len__(self) -> int:
+        return len(self._table) + len(self._added)
+
+    def records(self) -> Iterator[tuple[int, Record]]:
+        """(doc id, document if set since the snapshot else its record not decoded) by increasing id"""
+
+        changed = self._changed
+        for doc_id, record in self._table.records():
+            document = changed.get(doc_id)
+            yield doc_id, record if document is None else document
+        for doc_id in self._added:
+            yield doc_id, changed[doc_id]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Conversion between JSON databases and binary snapshots")
+    subparsers = parser.add_subparsers(dest="action", required=True)
+    to_binary = subparsers.add_parser("to-binary", help="TinyDB database or log snapshot to binary snapshot")
+    to_binary.add_argument("source", type=Path)
+    to_binary.add_argument("destination", type=Path)
+    to_json = subparsers.add_parser("to-json", help="binary snapshot to TinyDB database or log snapshot")
+    to_json.add_argument("source", type=Path)
+    to_json.add_argument("destination", type=Path)
+    to_json.add_argument("--log-snapshot", action="store_true", help="write a log snapshot")
+    to_json.add_argument("--indent", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.action == "to-binary":
+        json_to_snapshot(args.source, args.destination)
+    else:
+        snapshot_to_json(args.source, args.destination, args.log_snapshot, args.indent)
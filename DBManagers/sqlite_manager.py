@@ -0,0 +1,430 @@
+"""
+SQLite db manager.
+
+Documents are stored as JSON in a `data` column, next to an integer `doc_id`
+primary key. Fields listed in INDEXED_FIELDS get an index on their
+`json_extract` expression, which SQLite uses for the equality lookups built
+here. Statements are built from a fixed template per field list, so the
+sqlite3 statement cache keeps them prepared. Prefixes and date ranges are
+compared by SQL functions calling the Python code of the other backends
+(str.casefold, Utils.sort_keys.date_key), so every backend finds the same
+documents.
+
+    python -m DBManagers.sqlite_manager migrate db.json db.sqlite3
+"""
+import json
+import re
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Optional, Union
+
+from tinydb.table import Document
+
+from DBManagers.db_manager import VERSION_FIELD, DBManager
+from DBManagers.operations import Append, Increment
+from DBManagers.query import normalize
+from Settings.project_config import INDEXED_FIELDS
+from Utils.exceptions import VersionConflictError
+from Utils.instrumentation import instrumented
+from Utils.sort_keys import date_key
+
+AttributeValue = Union[str, int, bool]
+
+FIELD_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _field_expression(field: str) -> str:
+    """SQL expression extracting a field, the name is checked as it is inlined in the query"""
+
+    if not FIELD_NAME.match(field):
+        raise ValueError(f"Invalid field name: {field!r}")
+    return f"json_extract(data, '$.{field}')"
+
+
+def _casefold(value) -> Optional[str]:
+    return value.casefold() if isinstance(value, str) else None
+
+
+def _date_key(value) -> int:
+    return date_key(value) if isinstance(value, str) else 0
+
+
+@contextmanager
+def _write_transaction(connection: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """
+    Transaction taking the write lock at once (BEGIN IMMEDIATE), not at its first write:
+    what it reads (the last id, the versions) cannot be changed by another process before it writes.
+    Committed at the end, rolled back on an exception.
+    """
+
+    with connection:
+        connection.execute("BEGIN IMMEDIATE")
+        yield connection
+
+
+class SqliteTable:
+    """Handle on a table of a SqliteDB"""
+
+    def __init__(self, name: str, db: "SqliteDB") -> None:
+        if not FIELD_NAME.match(name):
+            raise ValueError(f"Invalid table name: {name!r}")
+        self.name = name
+        self.db = db
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        return self.db.connection
+
+
+class SqliteDB:
+    """SQLite database in WAL mode, so readers are not blocked by the writer"""
+
+    def __init__(self, path: Union[Path, str]) -> None:
+        self.path = path
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.create_function("casefold", 1, _casefold, deterministic=True)
+        self.connection.create_function("date_key", 1, _date_key, deterministic=True)
+        self._tables: dict[str, SqliteTable] = {}
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def table(self, name: str) -> SqliteTable:
+        if name not in self._tables:
+            table = SqliteTable(name, self)
+            with self.connection:
+                self.connection.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{name}" (doc_id INTEGER PRIMARY KEY, data TEXT NOT NULL)'
+                )
+                for fields in INDEXED_FIELDS.get(name, []):
+                    expressions = ", ".join(_field_expression(field) for field in fields)
+                    self.connection.execute(
+                        f'CREATE INDEX IF NOT EXISTS "{name}_{"_".join(fields)}" ON "{name}" ({expressions})'
+                    )
+            self._tables[name] = table
+        return self._tables[name]
+
+
+@instrumented("db")
+class SqliteManager(DBManager):
+
+    @classmethod
+    def _where(cls, values: list[tuple]) -> tuple[str, list]:
+        """WHERE clause and parameters of a search, see DBManagers.query for the conditions"""
+
+        clauses, parameters = [], []
+        # Sorted so that a list of fields always gives the same statement
+        conditions = sorted(normalize(values), key=lambda condition: (condition[0], condition[1], repr(condition[2])))
+        for field, operator, value in conditions:
+            expression = _field_expression(field)
+            if operator == "==":
+                # = NULL matches nothing. A null or missing field (NULL from json_extract) matches None,
+                # as on the other backends
+                if value is None:
+                    clauses.append(f"{expression} IS NULL")
+                else:
+                    clauses.append(f"{expression} = ?")
+                    parameters.append(value)
+            elif operator == "in":
+                values = [item for item in value if item is not None]
+                alternatives = [f"{expression} IN ({', '.join('?' * len(values))})"] if values else []
+                if len(values) < len(value):
+                    alternatives.append(f"{expression} IS NULL")
+                clauses.append(f"({' OR '.join(alternatives)})" if alternatives else "0")
+                parameters.extend(values)
+            elif operator == "prefix":
+                # the value is casefolded by normalize(): LIKE alone would only ignore the case of ASCII letters
+                clauses.append(f"casefold({expression}) LIKE ? ESCAPE '\\'")
+                parameters.append(re.sub(r"([\\%_])", r"\\\1", value) + "%")
+            else:
+                if operator == "date_between":
+                    # dates which cannot be read (key 0) match no range
+                    expression = f"date_key({expression})"
+                    clauses.append(f"{expression} > 0")
+                low, high = value
+                if low is not None:
+                    clauses.append(f"{expression} >= ?")
+                    parameters.append(low)
+                if high is not None:
+                    clauses.append(f"{expression} <= ?")
+                    parameters.append(high)
+        return " AND ".join(clauses) or "1", parameters
+
+    @classmethod
+    def external_changes(cls, db_table: SqliteTable) -> int:
+        """data_version of SQLite, which changes when another connection commits"""
+
+        return db_table.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    @classmethod
+    def save(cls, table: SqliteTable, data: dict) -> int:
+        with _write_transaction(table.connection):
+            cursor = table.connection.execute(f'INSERT INTO "{table.name}" (data) VALUES (?)',
+                                              (json.dumps(data),))
+        cls._index_documents(table, [(cursor.lastrowid, data)])
+        return cursor.lastrowid
+
+    @classmethod
+    def save_many(cls, table: SqliteTable, data_list: list[dict]) -> list[int]:
+        with _write_transaction(table.connection):
+            first_id = table.connection.execute(
+                f'SELECT COALESCE(MAX(doc_id), 0) + 1 FROM "{table.name}"'
+            ).fetchone()[0]
+            doc_ids = list(range(first_id, first_id + len(data_list)))
+            table.connection.executemany(
+                f'INSERT INTO "{table.name}" (doc_id, data) VALUES (?, ?)',
+                zip(doc_ids, (json.dumps(data) for data in data_list))
+            )
+        cls._index_documents(table, zip(doc_ids, data_list))
+        return doc_ids
+
+    @classmethod
+    def get_all_objects_from_table(cls, table: SqliteTable) -> list:
+        rows = table.connection.execute(f'SELECT doc_id, data FROM "{table.name}" ORDER BY doc_id')
+        return [Document(json.loads(data), doc_id) for doc_id, data in rows]
+
+    @classmethod
+    def _iter_rows(
+            cls, db_table: SqliteTable, columns: str, values: Optional[list[tuple[str, str]]], batch_size: int
+    ) -> Iterator[tuple]:
+        """
+        Rows in doc_id order, one query per batch resuming after the last doc_id read,
+        so no cursor stays open between batches and writes can be made while iterating
+        """
+
+        clause, parameters = cls._where(values or [])
+        last_id = 0
+        while True:
+            rows = db_table.connection.execute(
+                f'SELECT {columns} FROM "{db_table.name}" WHERE doc_id > ? AND {clause} ORDER BY doc_id LIMIT ?',
+                [last_id, *parameters, batch_size]
+            ).fetchall()
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1][0]
+
+    @classmethod
+    def iter_ids(
+            cls, db_table: SqliteTable, values: Optional[list[tuple[str, str]]] = None, batch_size: int = 1000
+    ) -> Iterator[int]:
+        for doc_id, in cls._iter_rows(db_table, "doc_id", values, batch_size):
+            yield doc_id
+
+    @classmethod
+    def iter_objects(
+            cls, db_table: SqliteTable, values: Optional[list[tuple[str, str]]] = None, batch_size: int = 1000
+    ) -> Iterator[Document]:
+        for doc_id, data in cls._iter_rows(db_table, "doc_id, data", values, batch_size):
+            yield Document(json.loads(data), doc_id)
+
+    @classmethod
+    def get_page(
+            cls, db_table: SqliteTable, offset: int, limit: int, values: Optional[list[tuple[str, str]]] = None
+    ) -> list[Document]:
+        clause, parameters = cls._where(values or [])
+        rows = db_table.connection.execute(
+            f'SELECT doc_id, data FROM "{db_table.name}" WHERE {clause} ORDER BY doc_id LIMIT ? OFFSET ?',
+            [*parameters, limit, offset]
+        )
+        return [Document(json.loads(data), doc_id) for doc_id, data in rows]
+
+    @classmethod
+    def count_objects_in_db(cls, table: SqliteTable) -> int:
+        return table.connection.execute(f'SELECT COUNT(*) FROM "{table.name}"').fetchone()[0]
+
+    @classmethod
+    def count_objects(cls, db_table: SqliteTable, values: list[tuple[str, str]]) -> int:
+        clause, parameters = cls._where(values)
+        return db_table.connection.execute(
+            f'SELECT COUNT(*) FROM "{db_table.name}" WHERE {clause}', parameters
+        ).fetchone()[0]
+
+    @classmethod
+    def get_objects_id(cls, db_table: SqliteTable, values: list[tuple[str, str]]) -> list[int]:
+        """
+            values: (list[tuple[str, str]]): [("field_name", value), ]
+        """
+
+        clause, parameters = cls._where(values)
+        rows = db_table.connection.execute(
+            f'SELECT doc_id FROM "{db_table.name}" WHERE {clause} ORDER BY doc_id', parameters
+        )
+        return [doc_id for doc_id, in rows]
+
+    @classmethod
+    def get_object(cls, db_table: SqliteTable, values: list[tuple[str, str]]) -> Optional[Document]:
+        clause, parameters = cls._where(values)
+        row = db_table.connection.execute(
+            f'SELECT doc_id, data FROM "{db_table.name}" WHERE {clause} ORDER BY doc_id LIMIT 1', parameters
+        ).fetchone()
+        if row is None:
+            return None
+        return Document(json.loads(row[1]), row[0])
+
+    @classmethod
+    def get_objects_by_id(cls, db_table: SqliteTable, instances_id_list: list[int]) -> list[Document]:
+        """Documents in the order of the ids, missing ids are skipped"""
+
+        documents = {}
+        for batch in _batched(instances_id_list, 500):
+            rows = db_table.connection.execute(
+                f'SELECT doc_id, data FROM "{db_table.name}" WHERE doc_id IN ({", ".join("?" * len(batch))})',
+                batch
+            )
+            documents.update((doc_id, Document(json.loads(data), doc_id)) for doc_id, data in rows)
+        return [documents[doc_id] for doc_id in instances_id_list if doc_id in documents]
+
+    @classmethod
+    def is_object_exist(cls, db_table: SqliteTable, values: list[tuple[str, str]]) -> bool:
+        clause, parameters = cls._where(values)
+        row = db_table.connection.execute(
+            f'SELECT 1 FROM "{db_table.name}" WHERE {clause} LIMIT 1', parameters
+        ).fetchone()
+        return row is not None
+
+    @staticmethod
+    def _assignment(field: str, value) -> tuple[str, list]:
+        """json_set path and value setting a field, operations computed from the stored value"""
+
+        current = _field_expression(field)
+        if isinstance(value, Increment):
+            return f"'$.{field}', COALESCE({current}, 0) + ?", [value.amount]
+        if isinstance(value, Append):
+            items = "".join(", '$[#]', json(?)" for _ in value.items)
+            return (f"'$.{field}', json_insert(COALESCE({current}, '[]'){items})",
+                    [json.dumps(item) for item in value.items])
+        return f"'$.{field}', json(?)", [json.dumps(value)]
+
+    @classmethod
+    def update_many(
+            cls, db_table: SqliteTable,
+            new_values_by_id: Mapping[int, Mapping[str, AttributeValue]],
+            expected_versions: Optional[Mapping[int, int]] = None
+    ) -> None:
+        """
+        Set the fields of each document {doc_id: {field: value}} and increase its version, in one
+        transaction. Operations are computed by SQLite from the stored values. The documents
+        updated with the same fields and operations share a statement, run with executemany.
+        :param expected_versions: {doc_id: version}, nothing is written if a document has another version
+        :raise VersionConflictError: with the ids of the documents changed meanwhile
+        """
+
+        version = _field_expression(VERSION_FIELD)
+        rows_by_statement: dict[str, list[tuple[int, list]]] = {}
+        for doc_id, new_values in new_values_by_id.items():
+            assignments = [cls._assignment(field, value) for field, value in new_values.items()]
+            paths = "".join(f"{path}, " for path, _ in assignments)
+            statement = (f'UPDATE "{db_table.name}" SET data = json_set(data, {paths}'
+                         f"'$.{VERSION_FIELD}', COALESCE({version}, 0) + 1) WHERE doc_id = ?")
+            rows_by_statement.setdefault(statement, []).append(
+                (doc_id, [parameter for _, parameters in assignments for parameter in parameters])
+            )
+
+        with _write_transaction(db_table.connection):
+            conflicts = []
+            for statement, rows in rows_by_statement.items():
+                if not expected_versions:
+                    db_table.connection.executemany(statement, [(*values, doc_id) for doc_id, values in rows])
+                    continue
+                for doc_id, values in rows:
+                    if doc_id not in expected_versions:
+                        db_table.connection.execute(statement, (*values, doc_id))
+                        continue
+                    cursor = db_table.connection.execute(f"{statement} AND COALESCE({version}, 0) = ?",
+                                                         (*values, doc_id, expected_versions[doc_id]))
+                    if cursor.rowcount == 0 and db_table.connection.execute(
+                            f'SELECT 1 FROM "{db_table.name}" WHERE doc_id = ?', (doc_id,)).fetchone():
+                        conflicts.append(doc_id)
+            if conflicts:
+                # raised inside the transaction: it is rolled back
+                raise VersionConflictError(conflicts)
+        cls._reindex_documents(db_table, new_values_by_id, {attribute_name for new_values in new_values_by_id.values()
+                                                            for attribute_name in new_values})
+
+    @classmethod
+    def update_attribute(
+            cls, db_table: SqliteTable, attribute_name: str, new_attribute_value: AttributeValue, instance_id: int,
+            expected_version: Optional[int] = None
+    ) -> None:
+
+        cls.update_attribute_many(db_table, attribute_name, new_attribute_value, [instance_id],
+                                  None if expected_version is None else {instance_id: expected_version})
+
+    @classmethod
+    def update_attributes(
+            cls, db_table: SqliteTable, new_values: dict[str, AttributeValue], instance_id: int,
+            expected_version: Optional[int] = None
+    ) -> None:
+
+        cls.update_many(db_table, {instance_id: new_values},
+                        None if expected_version is None else {instance_id: expected_version})
+
+    @classmethod
+    def update_attribute_many(
+            cls, db_table: SqliteTable,
+            attribute_name: str,
+            new_attribute_value: AttributeValue,
+            instances_id_list: list,
+            expected_versions: Optional[Mapping[int, int]] = None
+    ) -> None:
+
+        new_values = {attribute_name: new_attribute_value}
+        cls.update_many(db_table, {instance_id: new_values for instance_id in instances_id_list}, expected_versions)
+
+    @classmethod
+    def import_tinydb_file(cls, json_path: Union[Path, str], db: SqliteDB, batch_size: int = 10_000) -> dict[str, int]:
+        """
+        Import the tables of a TinyDB json file, keeping the documents ids.
+        Each batch is written in one transaction.
+        :param json_path: TinyDB database file
+        :param db: destination database
+        :param batch_size: documents per transaction
+        :return: number of imported documents per table
+        """
+
+        with open(json_path, encoding="utf-8") as json_file:
+            tables = json.load(json_file)
+
+        imported = {}
+        for name, documents in tables.items():
+            table = db.table(name)
+            rows = ((int(doc_id), json.dumps(document)) for doc_id, document in documents.items())
+            for batch in _batched(rows, batch_size):
+                with db.connection:
+                    db.connection.executemany(
+                        f'INSERT OR REPLACE INTO "{table.name}" (doc_id, data) VALUES (?, ?)', batch
+                    )
+            imported[name] = len(documents)
+        return imported
+
+
+def _batched(rows: Iterable, size: int) -> Iterable[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="SQLite database tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate = subparsers.add_parser("migrate", help="import a TinyDB db.json into a SQLite database")
+    migrate.add_argument("source", type=Path, help="TinyDB json file")
+    migrate.add_argument("destination", type=Path, help="SQLite database file")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        sqlite_db = SqliteDB(args.destination)
+        for table_name, count in SqliteManager.import_tinydb_file(args.source, sqlite_db).items():
+            print(f"{table_name}: {count} documents imported")
+        sqlite_db.close()
@@ -1,53 +1,191 @@
-from typing import Optional, Union
+from itertools import islice
+from typing import Iterable, Iterator, Mapping, Optional, Union
+from weakref import WeakKeyDictionary
 
 from tinydb.database import TinyDB as TinyDBType
 from tinydb.table import Table as TableType
 from tinydb.table import Document as DocumentType
-from tinydb.queries import QueryInstance
 
-from DBManagers.db_manager import DBManager
+from DBManagers.db_manager import VERSION_FIELD, DBManager
+from DBManagers.indexes import IndexSet
+from DBManagers.operations import resolve
+from DBManagers.query import MAX_INDEX_SHARE, CompiledQuery, compile_query, plan_query
+from Settings.project_config import INDEXED_FIELDS
+from Utils.exceptions import VersionConflictError
+from Utils.instrumentation import instrumented
 
 
 AttributeValue = Union[str, int, bool]
 
 
+@instrumented("db")
 class TinyManager(DBManager):
+    """
+    Db manager for TinyDB tables.
+    Searches accept the conditions of DBManagers.query. The query planner serves them
+    from the in-memory hash indexes (see INDEXED_FIELDS) when equality or IN conditions
+    cover an index, otherwise the table is scanned with the compiled predicate.
+    Indexes (hash, name and sorted views) only see the writes made through this manager,
+    or are built again when other processes wrote in a database shared with DBManagers.locking.
+
+    Updates are made in one read-modify-write of the table, which increases the
+    version of the documents, checks the expected versions when given and applies
+    the operations (increments, appends) to the values read.
+    """
+
+    _indexes: "WeakKeyDictionary[TableType, IndexSet]" = WeakKeyDictionary()
+
+    @classmethod
+    def external_changes(cls, db_table: TableType) -> int:
+        """Writes of the other processes, seen in the lock of a database shared with DBManagers.locking"""
+
+        lock = getattr(getattr(db_table, "storage", None), "lock", None)
+        return 0 if lock is None else lock.refresh()
+
+    @classmethod
+    def _drop_indexes(cls, db_table: TableType) -> None:
+        cls._indexes.pop(db_table, None)
+        super()._drop_indexes(db_table)
+
+    @classmethod
+    def _get_index_set(cls, table: TableType) -> IndexSet:
+        """Return the indexes of a table, built from INDEXED_FIELDS on first use"""
+
+        cls._drop_indexes_if_changed_elsewhere(table)
+        index_set = cls._indexes.get(table)
+        if index_set is None:
+            index_set = IndexSet()
+            cls._indexes[table] = index_set
+            for fields in INDEXED_FIELDS.get(table.name, []):
+                index_set.declare(fields)
+            documents = [(document.doc_id, document) for document in table]
+            for index in index_set:
+                index.build(documents)
+        return index_set
+
+    @classmethod
+    def declare_index(cls, table: TableType, fields: Iterable[str]) -> None:
+        """
+        Declare a secondary index on some fields of a table.
+        :param table: indexed table
+        :param fields: indexed fields
+        """
+
+        index, is_new = cls._get_index_set(table).declare(fields)
+        if is_new:
+            index.build((document.doc_id, document) for document in table)
+
+    @classmethod
+    def save(cls, table: TableType, data: dict) -> int:
+        doc_id = table.insert(data)
+        cls._get_index_set(table).add(doc_id, data)
+        cls._index_documents(table, [(doc_id, data)])
+        return doc_id
 
     @classmethod
-    def save(cls, table: TableType, data: dict):
-        table.insert(data)
+    def save_many(cls, table: TableType, data_list: list[dict]) -> list[int]:
+        doc_ids = table.insert_multiple(data_list)
+        index_set = cls._get_index_set(table)
+        for doc_id, data in zip(doc_ids, data_list):
+            index_set.add(doc_id, data)
+        cls._index_documents(table, zip(doc_ids, data_list))
+        return doc_ids
 
     @classmethod
     def get_all_objects_from_table(cls, table: TableType) -> list:
         return table.all()
 
+    @classmethod
+    def iter_ids(
+            cls, db_table: TableType, values: Optional[list[tuple[str, str]]] = None, batch_size: int = 1000
+    ) -> Iterator[int]:
+        doc_ids = cls._search_ids_in_index(db_table, values) if values else None
+        if doc_ids is not None:
+            yield from doc_ids
+            return
+        for document in cls.iter_objects(db_table, values, batch_size):
+            yield document.doc_id
+
+    @classmethod
+    def iter_objects(
+            cls, db_table: TableType, values: Optional[list[tuple[str, str]]] = None, batch_size: int = 1000
+    ) -> Iterator[DocumentType]:
+        """
+        Documents matching values, read through an index when one serves the query,
+        otherwise yielded one by one while the table is scanned. No list of the whole
+        table is built, but TinyDB storages still load the table itself.
+        """
+
+        doc_ids = cls._search_ids_in_index(db_table, values) if values else None
+        if doc_ids is not None:
+            for start in range(0, len(doc_ids), batch_size):
+                yield from cls.get_objects_by_id(db_table, doc_ids[start:start + batch_size])
+            return
+
+        query = cls._generate_query(values or [])
+        for document in db_table:
+            if query(document):
+                yield document
+
+    @classmethod
+    def get_page(
+            cls, db_table: TableType, offset: int, limit: int, values: Optional[list[tuple[str, str]]] = None
+    ) -> list[DocumentType]:
+        doc_ids = cls._search_ids_in_index(db_table, values) if values else None
+        if doc_ids is not None:
+            return cls.get_objects_by_id(db_table, doc_ids[offset:offset + limit])
+        return list(islice(cls.iter_objects(db_table, values), offset, offset + limit))
+
     @classmethod
     def count_objects_in_db(cls, table: TableType) -> int:
+        for index in cls._get_index_set(table):
+            return len(index)
         return len(table)
 
     @classmethod
-    def _generate_query(cls, values: list[tuple[str, str]]) -> QueryInstance:
+    def count_objects(cls, db_table: TableType, values: list[tuple]) -> int:
+        """Sum of index bucket sizes when the index alone answers the query"""
+
+        plan = plan_query(values, cls._get_index_set(db_table))
+        if plan.is_exact:
+            return sum(plan.index.count(key) for key in plan.keys)
+        return sum(1 for _ in cls.iter_ids(db_table, values))
+
+    @classmethod
+    def _generate_query(cls, values: list[tuple]) -> CompiledQuery:
+        return compile_query(values)
 
-        custom_query = frozenset(
-            [("==", (value[0],), value[1]) for value in values]
-        )
+    @classmethod
+    def _search_ids_in_index(cls, db_table: TableType, values: list[tuple]) -> Optional[list[int]]:
+        """
+        Search ids through the index chosen by the query planner.
+        Conditions not covered by the index are checked on the candidate documents only,
+        unless there are so many of them that a scan is cheaper.
+        :return: sorted ids or None if no index can serve the query
+        """
 
-        def test_func(val):
-            dict_values = dict(values)
-            for key in dict_values:
-                if not dict_values[key] == val.get(key):
-                    return False
-            return True
+        plan = plan_query(values, cls._get_index_set(db_table))
+        if plan.index is None:
+            return None
 
-        generated_query = QueryInstance(test=test_func, hashval=(custom_query,))
-        return generated_query
+        doc_ids = sorted(set().union(*(plan.index.lookup(key) for key in plan.keys)))
+        if plan.is_exact:
+            return doc_ids
+        if len(doc_ids) > len(plan.index) * MAX_INDEX_SHARE:
+            return None
+        residual = plan.residual
+        return [document.doc_id for document in cls.get_objects_by_id(db_table, doc_ids) if residual(document)]
 
     @classmethod
     def get_objects_id(cls, db_table: TableType, values: list[tuple[str, str]]) -> list[int]:
         """
-            values: (list[tuple[str, str]]): [("field_name", value), ]
+            values: (list[tuple]): [("field_name", value), ("field_name", operator, value), ]
         """
 
+        doc_ids = cls._search_ids_in_index(db_table, values)
+        if doc_ids is not None:
+            return doc_ids
+
         query = cls._generate_query(values)
         instances = db_table.search(query)
         return [instance.doc_id for instance in instances]
@@ -56,31 +194,94 @@ class TinyManager(DBManager):
     def get_object(
             cls, db_table: TableType, values: list[tuple[str, str]]
     ) -> Optional[DocumentType]:
+        doc_ids = cls._search_ids_in_index(db_table, values)
+        if doc_ids is not None:
+            return db_table.get(doc_id=doc_ids[0]) if doc_ids else None
+
         query = cls._generate_query(values)
         return db_table.get(query)
 
+    @classmethod
+    def get_objects_by_id(cls, db_table: TableType, instances_id_list: list[int]) -> list[DocumentType]:
+        """Documents in the order of the ids, missing ids are skipped"""
+
+        documents = {document.doc_id: document for document in db_table.get(doc_ids=instances_id_list)}
+        return [documents[doc_id] for doc_id in instances_id_list if doc_id in documents]
+
     @classmethod
     def is_object_exist(cls, db_table: TableType, values: list[tuple[str, str]]) -> bool:
+        doc_ids = cls._search_ids_in_index(db_table, values)
+        if doc_ids is not None:
+            return bool(doc_ids)
         return bool(cls.get_object(db_table, values))
 
+    @classmethod
+    def update_many(
+            cls, db_table: TableType,
+            new_values_by_id: Mapping[int, Mapping[str, AttributeValue]],
+            expected_versions: Optional[Mapping[int, int]] = None
+    ) -> None:
+        """
+        Set the fields of each document {doc_id: {field: value}} and increase its version,
+        in one read and one write of the table. Operations (DBManagers.operations) are applied
+        to the values read in this cycle. Missing ids are skipped.
+        :param expected_versions: {doc_id: version}, nothing is written if a document has another version
+        :raise VersionConflictError: with the ids of the documents changed meanwhile
+        """
+
+        written: dict[int, dict[str, AttributeValue]] = {}
+
+        def updater(table: dict) -> None:
+            if expected_versions:
+                conflicts = [doc_id for doc_id, version in expected_versions.items()
+                             if doc_id in table and table[doc_id].get(VERSION_FIELD, 0) != version]
+                if conflicts:
+                    raise VersionConflictError(conflicts)
+            for doc_id, new_values in new_values_by_id.items():
+                document = table.get(doc_id)
+                if document is not None:
+                    written[doc_id] = resolve(document, new_values)
+                    document.update(written[doc_id])
+                    document[VERSION_FIELD] = document.get(VERSION_FIELD, 0) + 1
+
+        db_table._update_table(updater)
+        index_set = cls._get_index_set(db_table)
+        for doc_id, new_values in written.items():
+            for attribute_name, new_attribute_value in new_values.items():
+                index_set.update_field([doc_id], attribute_name, new_attribute_value)
+        cls._reindex_documents(db_table, written,
+                               {attribute_name for new_values in written.values() for attribute_name in new_values})
+
     @classmethod
     def update_attribute(
-            cls, db_table: TableType, attribute_name: str, new_attribute_value: AttributeValue, instance_id: int
+            cls, db_table: TableType, attribute_name: str, new_attribute_value: AttributeValue, instance_id: int,
+            expected_version: Optional[int] = None
+    ) -> None:
+
+        cls.update_many(db_table, {instance_id: {attribute_name: new_attribute_value}},
+                        None if expected_version is None else {instance_id: expected_version})
+
+    @classmethod
+    def update_attributes(
+            cls, db_table: TableType, new_values: dict[str, AttributeValue], instance_id: int,
+            expected_version: Optional[int] = None
     ) -> None:
 
-        db_table.update({attribute_name: new_attribute_value},
-                        doc_ids=[instance_id])
+        cls.update_many(db_table, {instance_id: new_values},
+                        None if expected_version is None else {instance_id: expected_version})
 
     @classmethod
     def update_attribute_many(
             cls, db_table: TableType,
             attribute_name: str,
             new_attribute_value: AttributeValue,
-            instances_id_list: list
+            instances_id_list: list,
+            expected_versions: Optional[Mapping[int, int]] = None
     ) -> None:
 
-        db_table.update({attribute_name: new_attribute_value},
-                        doc_ids=instances_id_list)
+        new_values = {attribute_name: new_attribute_value}
+        cls.update_many(db_table, {instance_id: new_values for instance_id in instances_id_list},
+                        expected_versions)
 
 
 if __name__ == '__main__':
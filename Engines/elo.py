@@ -0,0 +1,140 @@
+"""
+Elo ratings.
+
+A tournament is one rating period: every game is rated from the ratings the
+players had at its start, and each player's changes are summed and applied,
+rounded, at its end. The K-factor depends on the rating band and on the age
+of the player on the first day of the tournament:
+    40 under 18 years old with a rating under 2300
+    20 under 2400
+    10 from 2400
+Unrated players (ranking 0) start from DEFAULT_RATING.
+
+A full history is recomputed period after period; the games of a period are
+rated all at once with NumPy arrays when it is installed, and in pure Python
+otherwise.
+"""
+from typing import Iterable, Optional
+
+from Utils.lazy_import import lazy_import
+from Utils.sort_keys import date_key
+
+# NumPy is optional, imported on first use
+np = lazy_import("numpy")
+
+DEFAULT_RATING = 1500
+YOUTH_AGE = 18
+YOUTH_RATING = 2300
+YOUTH_K_FACTOR = 40
+# (rating from which the band starts, K-factor), by increasing rating
+K_FACTOR_BANDS: list[tuple[int, int]] = [(0, 20), (2400, 10)]
+
+Game = tuple[int, int, float]
+
+
+def age_on(date_of_birth: str, date: str) -> Optional[int]:
+    """Age in full years at a date, None if the date of birth is unknown"""
+
+    birth = date_key(date_of_birth)
+    if not birth:
+        return None
+    return (date_key(date) - birth) // 10_000
+
+
+def k_factor(rating: float, age: Optional[int]) -> int:
+    if age is not None and age < YOUTH_AGE and rating < YOUTH_RATING:
+        return YOUTH_K_FACTOR
+    factor = K_FACTOR_BANDS[0][1]
+    for start, band_factor in K_FACTOR_BANDS:
+        if rating >= start:
+            factor = band_factor
+    return factor
+
+
+def expected_score(rating: float, opponent_rating: float) -> float:
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+class EloEngine:
+
+    def __init__(self, use_numpy: bool = True) -> None:
+        """:param use_numpy: set False to force the pure Python computation"""
+
+        self.use_numpy = use_numpy and np is not None
+
+    @staticmethod
+    def _initial(rating: Optional[int]) -> int:
+        return rating or DEFAULT_RATING
+
+    def rate_period(self,
+                    ratings: dict[int, int],
+                    births: dict[int, str],
+                    games: Iterable[Game],
+                    date: str) -> dict[int, int]:
+        """
+        Rate the games of a tournament
+        :param ratings: player id -> rating at the start of the tournament (0 if unrated)
+        :param births: player id -> date of birth (dd/mm/yyyy)
+        :param games: (player_id, player_id, points of the first player)
+        :param date: first day of the tournament (dd/mm/yyyy)
+        :return: player id -> new rating, for the players of the games
+        """
+
+        ratings = {player_id: self._initial(rating) for player_id, rating in ratings.items()}
+        changes: dict[int, float] = {}
+        factors: dict[int, int] = {}
+        for player_1, player_2, score_1 in games:
+            for player_id in (player_1, player_2):
+                if player_id not in factors:
+                    factors[player_id] = k_factor(ratings[player_id], age_on(births.get(player_id), date))
+            expected_1 = expected_score(ratings[player_1], ratings[player_2])
+            changes[player_1] = changes.get(player_1, 0.0) + factors[player_1] * (score_1 - expected_1)
+            changes[player_2] = changes.get(player_2, 0.0) + factors[player_2] * (expected_1 - score_1)
+        return {player_id: round(ratings[player_id] + change) for player_id, change in changes.items()}
+
+    def recompute(self,
+                  ratings: dict[int, int],
+                  births: dict[int, str],
+                  periods: Iterable[tuple[str, list[Game]]]) -> dict[int, int]:
+        """
+        Rate a whole history, period after period
+        :param ratings: player id -> rating before the first period (0 if unrated)
+        :param births: player id -> date of birth (dd/mm/yyyy)
+        :param periods: (first day, games) of each tournament, in chronological order
+        :return: player id -> final rating, for every player of ratings
+        """
+
+        if not self.use_numpy:
+            current = {player_id: self._initial(rating) for player_id, rating in ratings.items()}
+            for date, games in periods:
+                current.update(self.rate_period(current, births, games, date))
+            return current
+
+        player_ids = list(ratings)
+        rows = {player_id: row for row, player_id in enumerate(player_ids)}
+        size = len(player_ids)
+        current = np.array([self._initial(ratings[player_id]) for player_id in player_ids], dtype=np.float64)
+        birth_numbers = np.array([date_key(births.get(player_id)) for player_id in player_ids],
+                                 dtype=np.int64)
+
+        for date, games in periods:
+            if not games:
+                continue
+            players_1, players_2, scores_1 = zip(*games)
+            rows_1 = np.fromiter((rows[player_id] for player_id in players_1), dtype=np.int64, count=len(games))
+            rows_2 = np.fromiter((rows[player_id] for player_id in players_2), dtype=np.int64, count=len(games))
+            scores_1 = np.asarray(scores_1, dtype=np.float64)
+
+            factors = np.full(size, K_FACTOR_BANDS[0][1], dtype=np.float64)
+            for start, band_factor in K_FACTOR_BANDS:
+                factors[current >= start] = band_factor
+            ages = (date_key(date) - birth_numbers) // 10_000
+            factors[(birth_numbers > 0) & (ages < YOUTH_AGE) & (current < YOUTH_RATING)] = YOUTH_K_FACTOR
+
+            expected_1 = 1 / (1 + 10 ** ((current[rows_2] - current[rows_1]) / 400))
+            surprise = scores_1 - expected_1
+            changes = np.bincount(rows_1, weights=factors[rows_1] * surprise, minlength=size)
+            changes -= np.bincount(rows_2, weights=factors[rows_2] * surprise, minlength=size)
+            current = np.rint(current + changes)
+
+        return dict(zip(player_ids, current.astype(np.int64).tolist()))
@@ -0,0 +1,190 @@
+"""
+Swiss system pairing.
+
+Players are sorted by score then ranking. Inside each score group the top half
+plays the bottom half; a player who cannot be paired in his group floats down.
+Rematches are forbidden: the search goes through the players in order and,
+when someone cannot get a new opponent, backtracks on the last choices.
+Candidates are produced lazily and most rounds need no backtracking at all,
+so the cost stays close to linear. When the search exceeds its node budget
+(or no pairing without rematch exists) players are paired greedily, allowing
+the fewest rematches possible.
+"""
+from typing import Iterable, Iterator, Optional
+
+
+class PairingPlayer:
+    """What the pairing needs to know about a player"""
+
+    __slots__ = ("player_id", "score", "ranking", "opponents", "had_bye")
+
+    def __init__(self,
+                 player_id: int,
+                 score: float = 0,
+                 ranking: int = 0,
+                 opponents: Iterable[int] = (),
+                 had_bye: bool = False) -> None:
+        self.player_id = player_id
+        self.score = score
+        self.ranking = ranking
+        self.opponents = set(opponents)
+        self.had_bye = had_bye
+
+    @classmethod
+    def from_document(cls, document) -> "PairingPlayer":
+        """Build from a player document of the db (its doc_id is the player id)"""
+
+        return cls(player_id=document.doc_id,
+                   score=document.get("tournament_score", 0),
+                   ranking=document.get("ranking", 0),
+                   opponents=document.get("players_already_faced", []),
+                   had_bye=document.get("had_bye", False))
+
+    def __repr__(self) -> str:
+        return f"PairingPlayer({self.player_id}, score={self.score}, ranking={self.ranking})"
+
+
+class Pairing:
+    """Result of a pairing: matches as (player_id, player_id), the first one being the better placed"""
+
+    def __init__(self, pairs: list[tuple[int, int]], bye: Optional[int] = None, rematches: int = 0) -> None:
+        self.pairs = pairs
+        self.bye = bye
+        self.rematches = rematches
+
+    def __repr__(self) -> str:
+        return f"Pairing(pairs={self.pairs}, bye={self.bye}, rematches={self.rematches})"
+
+
+class SwissPairing:
+
+    def __init__(self, max_nodes: int = 200_000, max_bye_candidates: int = 8) -> None:
+        """
+        :param max_nodes: search budget before falling back to a pairing with rematches
+        :param max_bye_candidates: number of lowest placed players tried for the bye
+        """
+
+        self.max_nodes = max_nodes
+        self.max_bye_candidates = max_bye_candidates
+
+    @staticmethod
+    def sort_players(players: Iterable[PairingPlayer]) -> list[PairingPlayer]:
+        return sorted(players, key=lambda player: (-player.score, -player.ranking, player.player_id))
+
+    def pair(self, players: Iterable[PairingPlayer]) -> Pairing:
+        """
+        Pair a round
+        :param players: players taking part in the round
+        :return: the pairing of the round
+        """
+
+        ordered = self.sort_players(players)
+        if len(ordered) % 2 == 0:
+            pairs = self._search(ordered)
+            if pairs is not None:
+                return Pairing(pairs)
+            return self._greedy(ordered)
+
+        bye_candidates = [index for index in range(len(ordered) - 1, -1, -1)
+                          if not ordered[index].had_bye][:self.max_bye_candidates]
+        if not bye_candidates:
+            bye_candidates = [len(ordered) - 1]
+        for index in bye_candidates:
+            remaining = ordered[:index] + ordered[index + 1:]
+            pairs = self._search(remaining)
+            if pairs is not None:
+                return Pairing(pairs, bye=ordered[index].player_id)
+
+        index = bye_candidates[0]
+        pairing = self._greedy(ordered[:index] + ordered[index + 1:])
+        pairing.bye = ordered[index].player_id
+        return pairing
+
+    @staticmethod
+    def _ideal_partners(ordered: list[PairingPlayer]) -> list[Optional[int]]:
+        """Index of the preferred opponent of each player: top half against bottom half of his score group"""
+
+        ideal: list[Optional[int]] = [None] * len(ordered)
+        start = 0
+        while start < len(ordered):
+            end = start
+            while end < len(ordered) and ordered[end].score == ordered[start].score:
+                end += 1
+            half = (end - start) // 2
+            for offset in range(half):
+                top, bottom = start + offset, start + half + offset
+                ideal[top], ideal[bottom] = bottom, top
+            start = end
+        return ideal
+
+    @staticmethod
+    def _candidates(index: int, ideal: list[Optional[int]], paired: list[bool]) -> Iterator[int]:
+        """Opponents to try for a player: his ideal partner, then the next players in order"""
+
+        preferred = ideal[index]
+        if preferred is not None and preferred > index:
+            yield preferred
+        for candidate in range(index + 1, len(paired)):
+            if candidate != preferred and not paired[candidate]:
+                yield candidate
+
+    def _search(self, ordered: list[PairingPlayer]) -> Optional[list[tuple[int, int]]]:
+        """
+        Depth first search of a pairing without rematch (iterative, the depth can reach n / 2)
+        :return: pairs of player ids or None if not found within the node budget
+        """
+
+        size = len(ordered)
+        ideal = self._ideal_partners(ordered)
+        paired = [False] * size
+        # frames: [player index, candidates, chosen opponent index]
+        stack: list[list] = []
+        nodes = 0
+        index = 0
+
+        while True:
+            while index < size and paired[index]:
+                index += 1
+            if index == size:
+                return [(ordered[frame[0]].player_id, ordered[frame[2]].player_id) for frame in stack]
+
+            paired[index] = True
+            stack.append([index, self._candidates(index, ideal, paired), None])
+
+            while stack:
+                frame = stack[-1]
+                if frame[2] is not None:
+                    paired[frame[2]] = False
+                    frame[2] = None
+                player = ordered[frame[0]]
+                for candidate in frame[1]:
+                    if not paired[candidate] and ordered[candidate].player_id not in player.opponents:
+                        paired[candidate] = True
+                        frame[2] = candidate
+                        break
+                if frame[2] is not None:
+                    break
+                paired[frame[0]] = False
+                stack.pop()
+
+            nodes += 1
+            if not stack or nodes > self.max_nodes:
+                return None
+            index = stack[-1][0] + 1
+
+    @staticmethod
+    def _greedy(ordered: list[PairingPlayer]) -> Pairing:
+        """Pair in order, each player taking the first opponent he has not met yet, or the next one"""
+
+        remaining = list(ordered)
+        pairs = []
+        rematches = 0
+        while len(remaining) > 1:
+            player = remaining.pop(0)
+            position = next((position for position, opponent in enumerate(remaining)
+                             if opponent.player_id not in player.opponents), None)
+            if position is None:
+                position = 0
+                rematches += 1
+            pairs.append((player.player_id, remaining.pop(position).player_id))
+        return Pairing(pairs, rematches=rematches)
@@ -0,0 +1,152 @@
+"""
+Standings and tie-breaks of a tournament.
+
+Rounds are added one at a time: scores and progressive scores are updated
+incrementally, opponents and results are appended as a new column of the
+(player x round) matrices. The tie-breaks depending on the opponents' scores
+(Buchholz, Buchholz cut-1, Sonneborn-Berger) are then recomputed in one
+batched pass over these matrices, with NumPy when it is installed and in
+pure Python otherwise.
+
+An exempt player (bye) gets the bye points; the bye does not count as an
+opponent for the tie-breaks.
+"""
+from typing import Iterable, Optional
+
+from Utils.lazy_import import lazy_import
+
+# NumPy is optional, imported on first use
+np = lazy_import("numpy")
+
+NO_OPPONENT = -1
+
+
+class StandingRow:
+    """One line of the standings"""
+
+    __slots__ = ("rank", "player_id", "score", "buchholz", "buchholz_cut_1", "sonneborn_berger", "progressive")
+
+    def __init__(self, rank, player_id, score, buchholz, buchholz_cut_1, sonneborn_berger, progressive) -> None:
+        self.rank = rank
+        self.player_id = player_id
+        self.score = score
+        self.buchholz = buchholz
+        self.buchholz_cut_1 = buchholz_cut_1
+        self.sonneborn_berger = sonneborn_berger
+        self.progressive = progressive
+
+    def __repr__(self) -> str:
+        return (f"StandingRow({self.rank}, player={self.player_id}, score={self.score}, "
+                f"bh={self.buchholz}, bh-1={self.buchholz_cut_1}, sb={self.sonneborn_berger}, "
+                f"prog={self.progressive})")
+
+
+class Standings:
+
+    def __init__(self,
+                 player_ids: Iterable[int],
+                 max_rounds: int,
+                 rankings: Optional[dict[int, int]] = None,
+                 bye_points: float = 1.0,
+                 use_numpy: bool = True) -> None:
+        """
+        :param player_ids: players of the tournament
+        :param max_rounds: number of rounds, to allocate the matrices once
+        :param rankings: player id -> ranking, last criterion to break ties
+        :param bye_points: points given to an exempt player
+        :param use_numpy: set False to force the pure Python computation
+        """
+
+        self.player_ids = list(player_ids)
+        self.rows = {player_id: row for row, player_id in enumerate(self.player_ids)}
+        self.rankings = rankings or {}
+        self.bye_points = bye_points
+        self.use_numpy = use_numpy and np is not None
+        self.rounds_played = 0
+
+        size = len(self.player_ids)
+        if self.use_numpy:
+            self.scores = np.zeros(size)
+            self.progressive = np.zeros(size)
+            self.opponents = np.full((size, max_rounds), NO_OPPONENT, dtype=np.int64)
+            self.results = np.zeros((size, max_rounds))
+        else:
+            self.scores = [0.0] * size
+            self.progressive = [0.0] * size
+            self.opponents = [[NO_OPPONENT] * max_rounds for _ in range(size)]
+            self.results = [[0.0] * max_rounds for _ in range(size)]
+
+    def add_round(self, games: Iterable[tuple[int, int, float]], byes: Iterable[int] = ()) -> None:
+        """
+        Record the results of a round
+        :param games: (player_id, player_id, points of the first player: 1, 0.5 or 0)
+        :param byes: exempt players of the round
+        """
+
+        column = self.rounds_played
+        rows = self.rows
+        for player_1, player_2, points in games:
+            row_1, row_2 = rows[player_1], rows[player_2]
+            self.opponents[row_1][column] = row_2
+            self.opponents[row_2][column] = row_1
+            self.results[row_1][column] = points
+            self.results[row_2][column] = 1 - points
+            self.scores[row_1] += points
+            self.scores[row_2] += 1 - points
+        for player_id in byes:
+            row = rows[player_id]
+            self.results[row][column] = self.bye_points
+            self.scores[row] += self.bye_points
+
+        if self.use_numpy:
+            self.progressive += self.scores
+        else:
+            self.progressive = [progressive + score for progressive, score in zip(self.progressive, self.scores)]
+        self.rounds_played += 1
+
+    def _tie_breaks(self) -> tuple:
+        """Buchholz, Buchholz cut-1 and Sonneborn-Berger of every player"""
+
+        played = self.rounds_played
+        if self.use_numpy:
+            opponents = self.opponents[:, :played]
+            has_opponent = opponents != NO_OPPONENT
+            opponent_scores = np.where(has_opponent, self.scores[np.where(has_opponent, opponents, 0)], 0.0)
+            buchholz = opponent_scores.sum(axis=1)
+            lowest = np.where(has_opponent, opponent_scores, np.inf).min(axis=1, initial=np.inf)
+            buchholz_cut_1 = buchholz - np.where(np.isfinite(lowest), lowest, 0.0)
+            results = np.where(has_opponent, self.results[:, :played], 0.0)
+            sonneborn_berger = (results * opponent_scores).sum(axis=1)
+            return buchholz.tolist(), buchholz_cut_1.tolist(), sonneborn_berger.tolist()
+
+        scores = self.scores
+        buchholz, buchholz_cut_1, sonneborn_berger = [], [], []
+        for opponents, results in zip(self.opponents, self.results):
+            opponent_scores = [scores[opponent] for opponent in opponents[:played] if opponent != NO_OPPONENT]
+            total = sum(opponent_scores, 0.0)
+            buchholz.append(total)
+            buchholz_cut_1.append(total - min(opponent_scores) if opponent_scores else 0.0)
+            sonneborn_berger.append(sum((result * scores[opponent]
+                                         for opponent, result in zip(opponents[:played], results[:played])
+                                         if opponent != NO_OPPONENT), 0.0))
+        return buchholz, buchholz_cut_1, sonneborn_berger
+
+    def table(self) -> list[StandingRow]:
+        """
+        Standings sorted by score, Buchholz cut-1, Buchholz, Sonneborn-Berger,
+        progressive score, then ranking
+        """
+
+        buchholz, buchholz_cut_1, sonneborn_berger = self._tie_breaks()
+        scores = self.scores.tolist() if self.use_numpy else self.scores
+        progressive = self.progressive.tolist() if self.use_numpy else self.progressive
+        rankings = self.rankings
+        player_ids = self.player_ids
+
+        order = sorted(range(len(player_ids)), key=lambda row: (
+            -scores[row], -buchholz_cut_1[row], -buchholz[row], -sonneborn_berger[row],
+            -progressive[row], -rankings.get(player_ids[row], 0), player_ids[row]
+        ))
+        return [StandingRow(rank, player_ids[row], scores[row], buchholz[row], buchholz_cut_1[row],
+                            sonneborn_berger[row], progressive[row])
+                for rank, row in enumerate(order, start=1)]
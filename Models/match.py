@@ -0,0 +1,57 @@
+"""
+Model for matches
+"""
+from typing import Optional
+
+
+class Match:
+    """A game between two players, player_2_id is None for an exempt player (bye)"""
+
+    __slots__ = ("player_1_id", "player_2_id", "score_1", "score_2", "is_finished")
+
+    def __init__(self,
+                 player_1_id: int,
+                 player_2_id: Optional[int],
+                 score_1: float = 0,
+                 score_2: float = 0,
+                 is_finished: bool = False) -> None:
+        self.player_1_id = player_1_id
+        self.player_2_id = player_2_id
+        self.score_1 = score_1
+        self.score_2 = score_2
+        self.is_finished = is_finished
+
+    @property
+    def is_bye(self) -> bool:
+        return self.player_2_id is None
+
+    def set_result(self, score_1: float) -> None:
+        """Record the result from the points of the first player (1, 0.5 or 0)"""
+
+        self.score_1 = score_1
+        self.score_2 = 1 - score_1
+        self.is_finished = True
+
+    def to_dict(self) -> dict:
+        """New dict with the data to save"""
+
+        return {
+            "player_1_id": self.player_1_id,
+            "player_2_id": self.player_2_id,
+            "score_1": self.score_1,
+            "score_2": self.score_2,
+            "is_finished": self.is_finished,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Match":
+        """Build a match from saved data, unknown keys are ignored"""
+
+        return cls(data["player_1_id"],
+                   data["player_2_id"],
+                   data.get("score_1", 0),
+                   data.get("score_2", 0),
+                   data.get("is_finished", False))
+
+    def __repr__(self) -> str:
+        return f"{self.to_dict()}"
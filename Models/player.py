@@ -3,6 +3,8 @@ Model for players
 """
 from enum import Enum
 
+from Utils.sort_keys import date_key, name_key
+
 
 class Gender(Enum):
     MALE = 'M'
@@ -10,24 +12,88 @@ class Gender(Enum):
 
 
 class Person:
+    """
+    The full name and the sort keys (see Utils.sort_keys) are computed on first use
+    and kept until the name or the date of birth changes.
+    """
+
+    # _cache: [full name, name key, birth key], set on the first use of one of them
+    __slots__ = ("_first_name", "_last_name", "gender", "_date_of_birth", "_cache")
 
     def __init__(self,
                  first_name: str,
                  last_name: str,
                  gender: Gender,
                  date_of_birth: str) -> None:
-        self.first_name = first_name
-        self.last_name = last_name
+        self._first_name = first_name
+        self._last_name = last_name
         self.gender = gender
-        self.date_of_birth = date_of_birth
+        self._date_of_birth = date_of_birth
+
+    def _cached(self) -> list:
+        try:
+            return self._cache
+        except AttributeError:
+            self._cache = cache = [None, None, None]
+            return cache
 
     @property
-    def full_name(self):
-        return f"{self.last_name.upper()} {self.first_name.title()}"
-    
-    
+    def first_name(self) -> str:
+        return self._first_name
+
+    @first_name.setter
+    def first_name(self, first_name: str) -> None:
+        self._first_name = first_name
+        self._cached()[:2] = None, None
+
+    @property
+    def last_name(self) -> str:
+        return self._last_name
+
+    @last_name.setter
+    def last_name(self, last_name: str) -> None:
+        self._last_name = last_name
+        self._cached()[:2] = None, None
+
+    @property
+    def date_of_birth(self) -> str:
+        return self._date_of_birth
+
+    @date_of_birth.setter
+    def date_of_birth(self, date_of_birth: str) -> None:
+        self._date_of_birth = date_of_birth
+        self._cached()[2] = None
+
+    @property
+    def full_name(self) -> str:
+        cache = self._cached()
+        if cache[0] is None:
+            cache[0] = f"{self._last_name.upper()} {self._first_name.title()}"
+        return cache[0]
+
+    @property
+    def name_key(self) -> str:
+        """Alphabetical sort key, accents and case ignored"""
+
+        cache = self._cached()
+        if cache[1] is None:
+            cache[1] = name_key(self._first_name, self._last_name)
+        return cache[1]
+
+    @property
+    def birth_key(self) -> int:
+        """Chronological sort key of the date of birth"""
+
+        cache = self._cached()
+        if cache[2] is None:
+            cache[2] = date_key(self._date_of_birth)
+        return cache[2]
+
+
 class Player(Person):
 
+    __slots__ = ("ranking", "tournament_score", "players_already_faced", "is_already_in_a_tournament")
+
     def __init__(self,
                  first_name: str,
                  last_name: str,
@@ -38,17 +104,41 @@ class Player(Person):
                  players_already_faced=None,
                  is_already_in_a_tournament: bool = False) -> None:
         super().__init__(first_name, last_name, gender, date_of_birth)
-        if players_already_faced is None:
-            players_already_faced = []
         self.ranking = ranking
-        self.tournament_score = tournament_score,
+        self.tournament_score = tournament_score
         self.players_already_faced = [] if players_already_faced is None else players_already_faced
         self.is_already_in_a_tournament = is_already_in_a_tournament
 
+    def to_dict(self) -> dict:
+        """New dict with the data to save"""
+
+        return {
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "gender": self.gender,
+            "date_of_birth": self.date_of_birth,
+            "ranking": self.ranking,
+            "tournament_score": self.tournament_score,
+            "players_already_faced": self.players_already_faced,
+            "is_already_in_a_tournament": self.is_already_in_a_tournament,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Player":
+        """Build a player from saved data, unknown keys are ignored"""
+
+        return cls(data["first_name"],
+                   data["last_name"],
+                   data["gender"],
+                   data["date_of_birth"],
+                   data.get("ranking", 0),
+                   data.get("tournament_score", 0),
+                   data.get("players_already_faced"),
+                   data.get("is_already_in_a_tournament", False))
+
     @property
     def player_data(self) -> dict:
-        data = self.__dict__
-        return data
+        return self.to_dict()
 
     def __str__(self) -> str:
         return f"{self.full_name}"
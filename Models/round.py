@@ -0,0 +1,63 @@
+"""
+Model for rounds
+"""
+import datetime
+from typing import Optional
+
+DATETIME_FORMAT = "%d/%m/%Y %H:%M"
+
+
+class Round:
+    """One turn of a tournament, its matches are stored in their own table"""
+
+    __slots__ = ("tournament_id", "number", "start_datetime", "end_datetime", "matches_id")
+
+    def __init__(self,
+                 tournament_id: int,
+                 number: int,
+                 start_datetime: Optional[str] = None,
+                 end_datetime: Optional[str] = None,
+                 matches_id=None) -> None:
+        self.tournament_id = tournament_id
+        self.number = number
+        self.start_datetime = start_datetime or datetime.datetime.now().strftime(DATETIME_FORMAT)
+        self.end_datetime = end_datetime
+        self.matches_id: list[int] = [] if matches_id is None else matches_id
+
+    @property
+    def name(self) -> str:
+        return f"Round {self.number}"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.end_datetime is not None
+
+    def finish(self) -> None:
+        self.end_datetime = datetime.datetime.now().strftime(DATETIME_FORMAT)
+
+    def to_dict(self) -> dict:
+        """New dict with the data to save"""
+
+        return {
+            "tournament_id": self.tournament_id,
+            "number": self.number,
+            "start_datetime": self.start_datetime,
+            "end_datetime": self.end_datetime,
+            "matches_id": self.matches_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Round":
+        """Build a round from saved data, unknown keys are ignored"""
+
+        return cls(data["tournament_id"],
+                   data["number"],
+                   data.get("start_datetime"),
+                   data.get("end_datetime"),
+                   data.get("matches_id"))
+
+    def __str__(self) -> str:
+        return self.name
+
+    def __repr__(self) -> str:
+        return f"{self.to_dict()}"
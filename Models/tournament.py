@@ -15,6 +15,9 @@ class TimeControl(Enum):
 class Tournament:
     """Class Tournament"""
 
+    __slots__ = ("name", "place", "start_date", "end_date", "description", "time_control",
+                 "number_of_turns", "_current_turn", "is_over", "turns_id", "players_id")
+
     def __init__(self,
                  name: str,
                  place: str,
@@ -24,7 +27,8 @@ class Tournament:
                  time_control: TimeControl,
                  current_turn: int = 1,
                  turns_id=None,
-                 players_id=None) -> None:
+                 players_id=None,
+                 number_of_turns: int = NUMBER_OF_TURNS) -> None:
 
         self.name = name
         self.place = place
@@ -33,7 +37,7 @@ class Tournament:
         self.description = description
         self.time_control = time_control
 
-        self.number_of_turns: int = NUMBER_OF_TURNS
+        self.number_of_turns: int = number_of_turns
 
         self.current_turn = current_turn
         self.turns_id: list[int] = [] if turns_id is None else turns_id
@@ -50,7 +54,7 @@ class Tournament:
         which indicates if tournament is over or not
         """
 
-        if value >= self.number_of_turns:
+        if value > self.number_of_turns:
             self.is_over = True
         else:
             self.is_over = False
@@ -62,11 +66,42 @@ class Tournament:
             return self.start_date
         return f"{self.start_date} - {self.end_date}"
 
+    def to_dict(self) -> dict:
+        """New dict with the data to save"""
+
+        return {
+            "name": self.name,
+            "place": self.place,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "description": self.description,
+            "time_control": self.time_control,
+            "number_of_turns": self.number_of_turns,
+            "current_turn": self.current_turn,
+            "is_over": self.is_over,
+            "turns_id": self.turns_id,
+            "players_id": self.players_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Tournament":
+        """Build a tournament from saved data, unknown keys are ignored"""
+
+        return cls(data["name"],
+                   data["place"],
+                   data["start_date"],
+                   data["end_date"],
+                   data["description"],
+                   data["time_control"],
+                   # "_current_turn" was saved before to_dict() existed
+                   data.get("current_turn", data.get("_current_turn", 1)),
+                   data.get("turns_id"),
+                   data.get("players_id"),
+                   data.get("number_of_turns", NUMBER_OF_TURNS))
+
     @property
     def tournament_data(self) -> dict:
-        data = self.__dict__
-        data["is_over"] = self.is_over
-        return data
+        return self.to_dict()
 
     def __str__(self) -> str:
         return f"{self.name.title()} ({self.place.upper()}): {self.date}"
@@ -1,11 +1,173 @@
-"""Database project configuration"""
+"""
+Database project configuration
 
-from tinydb import TinyDB
+The database is opened on first use, not when this module is imported: the
+tables below are handles which open it the first time they are used. The
+backend, the path and the snapshot format are read from the environment, or
+given to configure() before the first use (backend "memory" for tests).
+"""
+import os
+import threading
 from pathlib import Path
+from typing import Any, Optional
 
 ROOTS = Path(__file__).resolve().parent.parent
 
-# Save in DataBase at Project roots
-DB = TinyDB(ROOTS / 'db.json', indent=4)
-PLAYERS_TABLE = DB.table("Players")
-TOURNAMENTS_TABLE = DB.table("Tournaments")
+# Storage backend: "tinydb" (db.json, shared by processes), "log" (db.snapshot.json + db.log), "sqlite" (db.sqlite3)
+# or "memory" (nothing saved, served by InMemoryManager)
+BACKENDS = ("tinydb", "log", "sqlite", "memory")
+DB_BACKEND = os.environ.get("CHESS_DB_BACKEND", "tinydb")
+# Snapshot of the log backend: "json" or "binary" (db.snapshot.bin, memory-mapped, read lazily)
+DB_SNAPSHOT_FORMAT = os.environ.get("CHESS_DB_SNAPSHOT", "json")
+# Database files path, without extension: DataBase at Project roots by default
+DB_PATH = Path(os.environ.get("CHESS_DB_PATH", ROOTS / 'db'))
+
+
+class TableHandle:
+    """Table of the provider database, the database is opened on the first use of the table"""
+
+    __slots__ = ("name", "_provider", "_table", "__weakref__")
+
+    def __init__(self, name: str, provider: "DatabaseProvider") -> None:
+        self.name = name
+        self._provider = provider
+        self._table = None
+
+    @property
+    def table(self):
+        table = self._table
+        if table is None:
+            table = self._table = self._provider.db.table(self.name)
+        return table
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self.table, attribute)
+
+    def __iter__(self):
+        return iter(self.table)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def __repr__(self) -> str:
+        return f"<TableHandle {self.name}>"
+
+
+class DatabaseProvider:
+    """Opens the database of the configured backend on first use"""
+
+    def __init__(self, backend: str, path: Path, snapshot_format: str) -> None:
+        self._lock = threading.Lock()
+        self._db = None
+        self._handles: dict[str, TableHandle] = {}
+        self.configure(backend, path, snapshot_format)
+
+    def configure(self,
+                  backend: Optional[str] = None,
+                  path: Optional[Path] = None,
+                  snapshot_format: Optional[str] = None) -> None:
+        """Change the configuration, before the database is opened"""
+
+        if self._db is not None:
+            raise RuntimeError("The database is already opened")
+        if backend is not None:
+            if backend not in BACKENDS:
+                raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+            self.backend = backend
+        if path is not None:
+            self.path = Path(path)
+        if snapshot_format is not None:
+            self.snapshot_format = snapshot_format
+
+    @property
+    def db(self):
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    self._db = self._open()
+        return self._db
+
+    @property
+    def is_open(self) -> bool:
+        return self._db is not None
+
+    def _open(self):
+        if self.backend == "log":
+            from DBManagers.log_storage import LogDB
+
+            return LogDB(self.path, snapshot_format=self.snapshot_format)
+        if self.backend == "sqlite":
+            from DBManagers.sqlite_manager import SqliteDB
+
+            return SqliteDB(self.path.with_name(self.path.name + '.sqlite3'))
+
+        if self.backend == "memory":
+            from tinydb import TinyDB
+            from tinydb.storages import MemoryStorage
+
+            return TinyDB(storage=MemoryStorage)
+
+        # several processes can work on the same db.json: see DBManagers.locking
+        from DBManagers.locking import SharedTinyDB
+
+        return SharedTinyDB(self.path.with_name(self.path.name + '.json'), indent=4)
+
+    def table(self, name: str) -> TableHandle:
+        if name not in self._handles:
+            self._handles[name] = TableHandle(name, self)
+        return self._handles[name]
+
+    def close(self) -> None:
+        """Close the database, the handles cannot be used afterwards"""
+
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+
+
+PROVIDER = DatabaseProvider(DB_BACKEND, DB_PATH, DB_SNAPSHOT_FORMAT)
+configure = PROVIDER.configure
+
+PLAYERS_TABLE = PROVIDER.table("Players")
+TOURNAMENTS_TABLE = PROVIDER.table("Tournaments")
+ROUNDS_TABLE = PROVIDER.table("Rounds")
+MATCHES_TABLE = PROVIDER.table("Matches")
+
+
+def __getattr__(name: str) -> Any:
+    """DB: the database itself, opened on first access"""
+
+    if name == "DB":
+        return PROVIDER.db
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_memory_manager = None
+
+
+def get_db_manager():
+    """
+    Return the db manager matching the backend, behind a cache if DB_CACHE_SIZE is set.
+    With the "memory" backend, every call returns the same InMemoryManager.
+    """
+
+    from Settings.project_config import DB_CACHE_SIZE
+
+    if PROVIDER.backend == "memory":
+        global _memory_manager
+        if _memory_manager is None:
+            from DBManagers.memory_manager import InMemoryManager
+            _memory_manager = InMemoryManager()
+        return _memory_manager
+
+    if PROVIDER.backend == "sqlite":
+        from DBManagers.sqlite_manager import SqliteManager
+        db_manager = SqliteManager()
+    else:
+        from DBManagers.tiny_manager import TinyManager
+        db_manager = TinyManager()
+
+    if DB_CACHE_SIZE:
+        from DBManagers.cache_manager import CachedManager
+        db_manager = CachedManager(db_manager, max_size=DB_CACHE_SIZE)
+    return db_manager
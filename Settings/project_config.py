@@ -1,2 +1,23 @@
 NUMBER_OF_TURNS: int = 4
 NUMBERS_OF_PLAYERS: int = 8
+
+# Documents kept by the db manager cache (0 disables the cache)
+DB_CACHE_SIZE: int = 10_000
+
+# Secondary indexes kept in memory by the db managers: {table name: [indexed fields]}
+INDEXED_FIELDS: dict[str, list[tuple[str, ...]]] = {
+    "Players": [("first_name", "last_name"), ("gender",), ("is_already_in_a_tournament",)],
+    "Tournaments": [("name", "start_date"), ("is_over",)],
+    "Rounds": [("tournament_id", "number")],
+}
+
+# Name search index (first name field, last name field), built on the first search: {table name: fields}
+NAME_INDEXED_FIELDS: dict[str, tuple[str, str]] = {
+    "Players": ("first_name", "last_name"),
+}
+# Sorted views for top-N and range queries, built on first use: {table name: sort keys of Utils.sort_keys}
+SORTED_VIEWS: dict[str, tuple[str, ...]] = {
+    "Players": ("ranking", "full_name", "date_of_birth"),
+}
+# Candidates offered when a player is searched by name
+PLAYER_SEARCH_RESULTS: int = 8
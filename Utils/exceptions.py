@@ -7,3 +7,15 @@ class NotValidChoiceError(Exception):
 
 class EmptyFieldError(Exception):
     ...
+
+
+class NotValidDateError(Exception):
+    ...
+
+
+class VersionConflictError(Exception):
+    """Documents changed by another process since they were read, nothing was written"""
+
+    def __init__(self, doc_ids: list[int]) -> None:
+        super().__init__(f"Documents changed since they were read: {doc_ids}")
+        self.doc_ids = doc_ids
@@ -0,0 +1,85 @@
+"""
+Sort of an iterable too large for memory.
+
+Items are sorted in memory by batches of buffer_size. If everything fits in
+one batch, it is sorted like sorted() would; otherwise each sorted batch (a
+run) is pickled to a temporary file, in chunks, and the runs are merged
+lazily with heapq.merge. At most buffer_size items, plus a chunk per run
+during the merge, are held at a time. The sort is stable.
+
+    for row in external_sort(rows, key=itemgetter("ranking"), buffer_size=100_000):
+        ...
+"""
+import heapq
+import pickle
+import tempfile
+from itertools import islice
+from operator import itemgetter
+from typing import IO, Any, Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_BUFFER_SIZE = 100_000
+# Items pickled together in a run file
+CHUNK_SIZE = 1024
+
+
+def _write_run(items: list, directory: Optional[str]) -> IO[bytes]:
+    """Pickle a sorted batch to a temporary file, deleted when closed"""
+
+    run = tempfile.TemporaryFile(dir=directory)
+    for start in range(0, len(items), CHUNK_SIZE):
+        pickle.dump(items[start:start + CHUNK_SIZE], run, protocol=pickle.HIGHEST_PROTOCOL)
+    run.seek(0)
+    return run
+
+
+def _read_run(run: IO[bytes]) -> Iterator:
+    while True:
+        try:
+            chunk = pickle.load(run)
+        except EOFError:
+            return
+        yield from chunk
+
+
+def external_sort(
+        items: Iterable[T],
+        key: Optional[Callable[[T], Any]] = None,
+        reverse: bool = False,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        directory: Optional[str] = None
+) -> Iterator[T]:
+    """
+    Sorted items, read from the iterable as the result is consumed
+    :param key: sort key, as for sorted()
+    :param reverse: descending order, equal items keep their order
+    :param buffer_size: maximum number of items sorted in memory at once
+    :param directory: where the runs are written, the temporary directory by default
+    """
+
+    items = iter(items)
+    batch = list(islice(items, buffer_size))
+    if len(batch) < buffer_size:
+        batch.sort(key=key, reverse=reverse)
+        yield from batch
+        return
+
+    # beyond one batch, the runs hold (key, item) pairs: the keys are not computed again by the merge
+    if key is not None:
+        batch = [(key(item), item) for item in batch]
+        items = ((key(item), item) for item in items)
+    sort_key = None if key is None else itemgetter(0)
+    runs = []
+    try:
+        while batch:
+            batch.sort(key=sort_key, reverse=reverse)
+            runs.append(_write_run(batch, directory))
+            # released before the next batch is read
+            batch = None
+            batch = list(islice(items, buffer_size))
+        merged = heapq.merge(*(_read_run(run) for run in runs), key=sort_key, reverse=reverse)
+        yield from merged if key is None else map(itemgetter(1), merged)
+    finally:
+        for run in runs:
+            run.close()
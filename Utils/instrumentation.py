@@ -0,0 +1,397 @@
+"""
+Opt-in timing of the db managers, controllers and views.
+
+The classes marked with @instrumented(group) have their methods timed once the
+instrumentation is enabled: each call is counted, and its duration added to a
+latency histogram named "group.Class.method". The storages add the bytes they
+write (the TinyDB file, the log and its snapshots; SQLite does not tell them).
+Disabled, which is the default, nothing is wrapped: the classes are only
+registered, so the methods are called as if this module did not exist.
+
+The metrics are dumped to a local file, as JSON or in the Prometheus text
+format (read by the textfile collector of the node exporter), chosen by the
+extension of the file. The instrumentation is enabled from the environment:
+
+    CHESS_METRICS=metrics.prom CHESS_METRICS_INTERVAL=60 python -m Controllers.result_service
+
+or for one command, which can also be profiled with cProfile and tracemalloc:
+
+    python -m Utils.instrumentation --metrics metrics.json -- Controllers.reports players --sort ranking
+    python -m Utils.instrumentation --cprofile export.prof --tracemalloc export.heap Controllers.reports players
+
+Generators and coroutines are timed until they return, not while they are consumed.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional, TypeVar, Union
+
+T = TypeVar("T")
+
+ENABLED = False
+FORMATS = ("json", "prometheus")
+# Upper bounds of the latency histograms, in seconds, the last bucket being +Inf
+LATENCY_BUCKETS = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+_lock = threading.Lock()
+_MISSING = object()
+# classes marked with instrumented(): (class, group, private methods timed too)
+_classes: list[tuple[type, str, bool]] = []
+# instrumented class -> {method name: attribute replaced, _MISSING for an inherited one}
+_originals: dict[type, dict[str, object]] = {}
+_dump_path: Optional[Path] = None
+_dump_format: Optional[str] = None
+
+
+class Histogram:
+    """
+    Calls of a method: count, errors, total duration and durations by bucket of LATENCY_BUCKETS.
+    Observed without a lock, which would cost more than the rest of the timing: two threads timing
+    the same method at the same instant may lose a call.
+    """
+
+    __slots__ = ("count", "errors", "sum", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.sum = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, duration: float, failed: bool = False) -> None:
+        self.count += 1
+        self.errors += failed
+        self.sum += duration
+        self.buckets[bisect_left(LATENCY_BUCKETS, duration)] += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """(upper bound, calls up to it) as in the Prometheus format"""
+
+        counts, total = [], 0
+        for bound, count in zip((*(f"{bound:g}" for bound in LATENCY_BUCKETS), "+Inf"), self.buckets):
+            total += count
+            counts.append((bound, total))
+        return counts
+
+
+class Metrics:
+    """Histograms of the timed calls and bytes written by storage"""
+
+    def __init__(self) -> None:
+        self.histograms: dict[str, Histogram] = {}
+        self.bytes_written: dict[str, int] = {}
+        self.writes: dict[str, int] = {}
+
+    def histogram(self, name: str) -> Histogram:
+        with _lock:
+            return self.histograms.setdefault(name, Histogram())
+
+    def add_bytes(self, storage: str, size: int) -> None:
+        with _lock:
+            self.bytes_written[storage] = self.bytes_written.get(storage, 0) + size
+            self.writes[storage] = self.writes.get(storage, 0) + 1
+
+    def reset(self) -> None:
+        """Set everything back to zero, the histograms held by the wrapped methods are kept"""
+
+        with _lock:
+            for histogram in self.histograms.values():
+                histogram.__init__()
+            self.bytes_written.clear()
+            self.writes.clear()
+
+    def _called(self) -> list[tuple[str, Histogram]]:
+        return sorted((name, histogram) for name, histogram in self.histograms.items() if histogram.count)
+
+    def as_dict(self) -> dict:
+        with _lock:
+            return {
+                "calls": {name: {"count": histogram.count,
+                                 "errors": histogram.errors,
+                                 "sum_seconds": histogram.sum,
+                                 "buckets": dict(histogram.cumulative())}
+                          for name, histogram in self._called()},
+                "bytes_written": {storage: {"bytes": size, "writes": self.writes[storage]}
+                                  for storage, size in sorted(self.bytes_written.items())},
+            }
+
+    def to_prometheus(self) -> str:
+        with _lock:
+            called = self._called()
+            lines = ["# HELP chess_call_duration_seconds Duration of the instrumented calls.",
+                     "# TYPE chess_call_duration_seconds histogram"]
+            for name, histogram in called:
+                label = _label_value(name)
+                lines.extend(f'chess_call_duration_seconds_bucket{{call="{label}",le="{bound}"}} {count}'
+                             for bound, count in histogram.cumulative())
+                lines.append(f'chess_call_duration_seconds_sum{{call="{label}"}} {histogram.sum!r}')
+                lines.append(f'chess_call_duration_seconds_count{{call="{label}"}} {histogram.count}')
+            lines += ["# HELP chess_call_errors_total Instrumented calls which raised an exception.",
+                      "# TYPE chess_call_errors_total counter"]
+            lines.extend(f'chess_call_errors_total{{call="{_label_value(name)}"}} {histogram.errors}'
+                         for name, histogram in called)
+            lines += ["# HELP chess_written_bytes_total Bytes written by the storages.",
+                      "# TYPE chess_written_bytes_total counter"]
+            lines.extend(f'chess_written_bytes_total{{storage="{_label_value(storage)}"}} {size}'
+                         for storage, size in sorted(self.bytes_written.items()))
+            lines += ["# HELP chess_writes_total Writes of the storages.",
+                      "# TYPE chess_writes_total counter"]
+            lines.extend(f'chess_writes_total{{storage="{_label_value(storage)}"}} {count}'
+                         for storage, count in sorted(self.writes.items()))
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: Union[Path, str], format_name: Optional[str] = None) -> None:
+        """
+        Write the metrics to a file, replaced at once so that it is never read half written
+        :param format_name: one of FORMATS, by default JSON for a .json file and Prometheus otherwise
+        """
+
+        path = Path(path)
+        if format_name is None:
+            format_name = "json" if path.suffix == ".json" else "prometheus"
+        if format_name not in FORMATS:
+            raise ValueError(f"Unknown format {format_name!r}, expected one of {FORMATS}")
+        text = json.dumps(self.as_dict(), indent=4) if format_name == "json" else self.to_prometheus()
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+METRICS = Metrics()
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def timed(function: Callable, name: str) -> Callable:
+    """Wrap a function (or a coroutine function) so that its calls are added to the histogram of the name"""
+
+    import inspect
+
+    observe = METRICS.histogram(name).observe
+    perf_counter = time.perf_counter
+    if inspect.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            start = perf_counter()
+            failed = False
+            try:
+                return await function(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                observe(perf_counter() - start, failed)
+    else:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            failed = False
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                observe(perf_counter() - start, failed)
+    wrapper._metric = name
+    return wrapper
+
+
+def _instrument(cls: type, group: str, private: bool) -> None:
+    """Replace the methods of the class, inherited ones included, by timed ones"""
+
+    import inspect
+
+    originals = _originals.setdefault(cls, {})
+    for name in dir(cls):
+        if name.startswith("__") or (name.startswith("_") and not private) or name in originals:
+            continue
+        attribute = inspect.getattr_static(cls, name)
+        if isinstance(attribute, (classmethod, staticmethod)):
+            function, kind = attribute.__func__, type(attribute)
+        elif inspect.isfunction(attribute):
+            function, kind = attribute, None
+        else:
+            continue
+        # already timed under the name of an instrumented parent class
+        if hasattr(function, "_metric"):
+            continue
+        wrapper = timed(function, f"{group}.{cls.__name__}.{name}")
+        originals[name] = cls.__dict__.get(name, _MISSING)
+        setattr(cls, name, wrapper if kind is None else kind(wrapper))
+
+
+def _uninstrument(cls: type) -> None:
+    for name, original in _originals.pop(cls, {}).items():
+        if original is _MISSING:
+            delattr(cls, name)
+        else:
+            setattr(cls, name, original)
+
+
+def instrumented(group: str, private: bool = False) -> Callable[[type[T]], type[T]]:
+    """
+    Class decorator: time the methods of the class while the instrumentation is enabled
+    :param group: first part of the metric names, "db", "controller" or "view"
+    :param private: time the methods starting with an underscore too (the actions of the controllers)
+    """
+
+    def decorator(cls: type[T]) -> type[T]:
+        _classes.append((cls, group, private))
+        if ENABLED:
+            _instrument(cls, group, private)
+        return cls
+
+    return decorator
+
+
+def _dump_at_exit() -> None:
+    if _dump_path is not None:
+        METRICS.dump(_dump_path, _dump_format)
+
+
+def _dump_periodically(interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        if not ENABLED:
+            return
+        METRICS.dump(_dump_path, _dump_format)
+
+
+def enable(path: Union[Path, str, None] = None,
+           interval: Optional[float] = None,
+           format_name: Optional[str] = None) -> None:
+    """
+    Time the marked classes, the ones created from now on as well
+    :param path: file where the metrics are dumped at exit
+    :param interval: seconds between two dumps to the file, for the long-running services
+    :param format_name: format of the file, see Metrics.dump
+    """
+
+    global ENABLED, _dump_path, _dump_format
+    ENABLED = True
+    for cls, group, private in _classes:
+        _instrument(cls, group, private)
+    if path is not None:
+        if _dump_path is None:
+            atexit.register(_dump_at_exit)
+        _dump_path, _dump_format = Path(path), format_name
+        if interval:
+            threading.Thread(target=_dump_periodically, args=(interval,), name="metrics-dump", daemon=True).start()
+
+
+def disable() -> None:
+    """Give the marked classes their methods back, the metrics are kept"""
+
+    global ENABLED
+    ENABLED = False
+    for cls, _, _ in reversed(_classes):
+        _uninstrument(cls)
+
+
+def record_bytes(storage: str, size: int) -> None:
+    """Add a write of size bytes to the storage; the callers check ENABLED first, so that nothing is computed"""
+
+    METRICS.add_bytes(storage, size)
+
+
+@contextmanager
+def measure(name: str) -> Iterator[None]:
+    """Time a block like a method, when the instrumentation is enabled"""
+
+    if not ENABLED:
+        yield
+        return
+    histogram = METRICS.histogram(name)
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except Exception:
+        failed = True
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start, failed)
+
+
+@contextmanager
+def profile(cprofile_path: Union[Path, str, None] = None,
+            tracemalloc_path: Union[Path, str, None] = None,
+            frames: int = 1,
+            top: int = 15) -> Iterator[None]:
+    """
+    cProfile and tracemalloc sessions around a block, a summary printed to stderr
+    :param cprofile_path: statistics of cProfile, to read with pstats (or snakeviz)
+    :param tracemalloc_path: snapshot of the memory still allocated at the end, to read with tracemalloc.Snapshot.load
+    :param frames: frames kept by tracemalloc for each allocation
+    :param top: functions and lines shown in the summary
+    """
+
+    # imported here: the instrumented modules import this one, disabled it must stay light
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    profiler = None
+    if tracemalloc_path is not None:
+        tracemalloc.start(frames)
+    if cprofile_path is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if tracemalloc_path is not None:
+            # before the statistics of cProfile are printed, which allocate
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            snapshot.dump(str(tracemalloc_path))
+            print(f"tracemalloc: {current / 2 ** 20:.1f} MB still allocated, peak {peak / 2 ** 20:.1f} MB",
+                  file=sys.stderr)
+            statistics = snapshot.filter_traces([tracemalloc.Filter(False, cProfile.__file__)]).statistics("lineno")
+            for statistic in statistics[:top]:
+                print(statistic, file=sys.stderr)
+        if profiler is not None:
+            profiler.dump_stats(cprofile_path)
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(top)
+
+
+if __name__ == '__main__':
+    import argparse
+    import runpy
+
+    # the module run as __main__ is a copy: the db managers and controllers use Utils.instrumentation
+    from Utils import instrumentation
+
+    parser = argparse.ArgumentParser(description="Run a module of the project with its metrics or profiled")
+    parser.add_argument("--metrics", type=Path, default=None, help="file the metrics are dumped to at exit")
+    parser.add_argument("--format", choices=FORMATS, default=None, help="by default from the extension of the file")
+    parser.add_argument("--interval", type=float, default=None, help="seconds between two dumps of the metrics")
+    parser.add_argument("--cprofile", type=Path, default=None, help="file of the cProfile statistics")
+    parser.add_argument("--tracemalloc", type=Path, default=None, help="file of the tracemalloc snapshot")
+    parser.add_argument("--frames", type=int, default=1, help="frames kept by tracemalloc for each allocation")
+    parser.add_argument("module", help="module run as with python -m, Controllers.reports for instance")
+    parser.add_argument("arguments", nargs=argparse.REMAINDER, help="arguments of the module")
+    args = parser.parse_args()
+
+    # dumped at exit, once the command is timed
+    if args.metrics is not None:
+        instrumentation.enable(args.metrics, args.interval, args.format)
+    sys.argv = [args.module, *args.arguments]
+    with instrumentation.profile(args.cprofile, args.tracemalloc, args.frames), \
+            instrumentation.measure(f"command.{args.module}"):
+        runpy.run_module(args.module, run_name="__main__", alter_sys=True)
+elif os.environ.get("CHESS_METRICS"):
+    enable(os.environ["CHESS_METRICS"], float(os.environ.get("CHESS_METRICS_INTERVAL", 0)) or None)
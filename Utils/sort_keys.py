@@ -0,0 +1,83 @@
+"""
+Sort keys of the players, shared by the models, which cache them, and by the
+sorted views of the db managers (see SORTED_VIEWS in Settings.project_config),
+so that both order the players the same way.
+
+Names are folded (accents removed, case folded, hyphens and apostrophes
+turned into spaces), so "Bérenger" sorts with "Berenger". Dates are read by
+date_key(), the only parser of the dd/mm/yyyy dates stored in the documents.
+"""
+import datetime
+import unicodedata
+from functools import lru_cache
+from typing import Any, Callable, Mapping, NamedTuple, Optional, Union
+
+from Utils.validators import DATE_FORMAT
+
+_SEPARATORS = str.maketrans("-'’._", "     ")
+
+
+@lru_cache(maxsize=100_000)
+def fold(text: str) -> str:
+    """Lower case, accent-less, single-spaced form of a name"""
+
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().translate(_SEPARATORS).split())
+
+
+def name_key(first_name: str, last_name: str) -> str:
+    """Alphabetical order of the full names: last name, then first name"""
+
+    return fold(f"{last_name} {first_name}")
+
+
+@lru_cache(maxsize=100_000)
+def date_key(date: Union[str, datetime.date, None]) -> int:
+    """
+    dd/mm/yyyy (or a date) -> yyyymmdd as an integer, which sorts chronologically.
+    Days and months of one digit are read too, the prompt accepted them before.
+    0 for an empty date or a date which cannot be read: they sort first.
+    """
+
+    if not date:
+        return 0
+    if not isinstance(date, datetime.date):
+        try:
+            date = datetime.datetime.strptime(date, DATE_FORMAT)
+        except (TypeError, ValueError):
+            return 0
+    return date.year * 10_000 + date.month * 100 + date.day
+
+
+def date_bound(date: Union[str, datetime.date]) -> int:
+    """
+    date_key() of a bound given to a search, which must be a date
+    :raise ValueError: not a dd/mm/yyyy date
+    """
+
+    key = date_key(date)
+    if not key:
+        raise ValueError(f"Expected a dd/mm/yyyy date, got {date!r}")
+    return key
+
+
+class SortKey(NamedTuple):
+    """Sort key of a sorted view"""
+
+    # fields of the document the key is computed from
+    fields: tuple[str, ...]
+    # key of a document
+    of: Callable[[Mapping], Any]
+    # key of a bound given to a range query
+    bound: Callable[[Any], Any]
+
+
+SORT_KEYS: dict[str, SortKey] = {
+    "ranking": SortKey(("ranking",), lambda document: document.get("ranking") or 0, int),
+    "full_name": SortKey(("first_name", "last_name"),
+                         lambda document: name_key(document.get("first_name") or "", document.get("last_name") or ""),
+                         fold),
+    "date_of_birth": SortKey(("date_of_birth",), lambda document: date_key(document.get("date_of_birth")),
+                             date_bound),
+}
@@ -1,5 +1,12 @@
 """custom validators"""
-from Utils.exceptions import NotValidChoiceError, EmptyFieldError
+import datetime
+import re
+
+from Utils.exceptions import NotValidChoiceError, EmptyFieldError, NotValidDateError
+
+DATE_FORMAT = '%d/%m/%Y'
+# strptime also accepts days and months without their leading zero
+DATE_PATTERN = re.compile(r"[0-9]{2}/[0-9]{2}/[0-9]{4}")
 
 
 def check_multiple_choice(user_choice, choices):
@@ -18,3 +25,14 @@ def check_not_empty_field(user_value):
         message = "Empty value not allowed"
         raise EmptyFieldError(message)
     return user_value
+
+
+def check_date_format(user_value):
+    try:
+        if not DATE_PATTERN.fullmatch(user_value):
+            raise ValueError(user_value)
+        datetime.datetime.strptime(user_value, DATE_FORMAT)
+    except (TypeError, ValueError):
+        message = "La date doit être saisie au format dd/mm/yyyy."
+        raise NotValidDateError(message)
+    return user_value
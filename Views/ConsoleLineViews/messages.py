@@ -1,6 +1,8 @@
+from Utils.instrumentation import instrumented
 from Views.messages import MessageView
 
 
+@instrumented("view")
 class ConsoleLineMessageView(MessageView):
 
     @classmethod
@@ -1,7 +1,9 @@
+from Utils.instrumentation import instrumented
 from Views.ConsoleLineViews.messages import ConsoleLineMessageView
 from Views.player_view import PlayerView
 
 
+@instrumented("view")
 class ConsoleLinePlayerView(ConsoleLineMessageView, PlayerView):
 
     @classmethod
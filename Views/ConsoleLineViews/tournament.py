@@ -1,7 +1,9 @@
+from Utils.instrumentation import instrumented
 from Views.ConsoleLineViews.messages import ConsoleLineMessageView
 from Views.tournament_view import TournamentView
 
 
+@instrumented("view")
 class TournamentLinePlayerView(ConsoleLineMessageView, TournamentView):
 
     @classmethod
@@ -0,0 +1,55 @@
+from collections import deque
+from typing import Callable, Iterable, Optional, Union
+
+from Views.messages import MessageView
+
+# An answer is the text typed by the user, or a function choosing it among the choices offered
+Answer = Union[str, Callable[[list[tuple[str, str, object]]], str]]
+
+
+def pick(label: Optional[str] = None, value: object = None) -> Callable[[list[tuple[str, str, object]]], str]:
+    """
+    Answer choosing the choice with this label or this value, the last choice if there is none
+    (the "none of these" choice of the searches)
+    """
+
+    def answer(choices: list[tuple[str, str, object]]) -> str:
+        for choice, choice_label, choice_value in choices:
+            if (label is not None and choice_label == label) or (value is not None and choice_value == value):
+                return choice
+        return choices[-1][0]
+
+    return answer
+
+
+class ScriptedMessageView(MessageView):
+    """
+    View of the simulations: prompts are answered in order from a script instead of a user,
+    messages are kept instead of being displayed.
+    Unlike the other views, it is used as an instance, each one having its own script.
+    """
+
+    def __init__(self, answers: Iterable[Answer] = ()) -> None:
+        self.answers: deque[Answer] = deque(answers)
+        self.informations: list[str] = []
+        self.warnings: list[str] = []
+
+    def script(self, *answers: Answer) -> None:
+        """Add answers at the end of the script"""
+
+        self.answers.extend(answers)
+
+    def _answer(self, text: str, choices: Optional[list] = None) -> str:
+        if not self.answers:
+            raise LookupError(f"No scripted answer left for: {text}")
+        answer = self.answers.popleft()
+        return answer(choices) if callable(answer) else answer
+
+    def information(self, text: str) -> None:
+        self.informations.append(text)
+
+    def warning(self, invalid_choice: bool = False, text: str = "") -> None:
+        self.warnings.append("Choix non valide" if invalid_choice else text)
+
+    def confirm(self, message) -> str:
+        return self._answer(message)
@@ -0,0 +1,14 @@
+from Views.ScriptedViews.messages import ScriptedMessageView
+from Views.player_view import PlayerView
+
+
+class ScriptedPlayerView(ScriptedMessageView, PlayerView):
+
+    def prompt_to_create_or_update_player(self, text: str, choices: list[tuple[str, str, str]]) -> str:
+        return self._answer(text, choices)
+
+    def prompt_for_multiple_choices_field(self, text: str, choices: list[tuple[str, str, str]]) -> str:
+        return self._answer(text, choices)
+
+    def prompt_for_str_field(self, text: str, label: str) -> str:
+        return self._answer(text)
@@ -0,0 +1,11 @@
+from Views.ScriptedViews.messages import ScriptedMessageView
+from Views.tournament_view import TournamentView
+
+
+class ScriptedTournamentView(ScriptedMessageView, TournamentView):
+
+    def prompt_for_multiple_choices_field(self, text: str, choices: list[tuple[str, str, str]]) -> str:
+        return self._answer(text, choices)
+
+    def prompt_for_str_field(self, text: str, label: str) -> str:
+        return self._answer(text)
@@ -0,0 +1,31 @@
+import logging
+
+from Utils.instrumentation import instrumented
+from Views.tournament_view import TournamentView
+
+logger = logging.getLogger("chess.service")
+
+
+@instrumented("view")
+class ServiceTournamentView(TournamentView):
+    """View of the non-interactive services: messages are logged, prompts are not available"""
+
+    @classmethod
+    def information(cls, text: str) -> None:
+        logger.info(text)
+
+    @classmethod
+    def warning(cls, invalid_choice: bool = False, text: str = "") -> None:
+        logger.warning("Choix non valide" if invalid_choice else text)
+
+    @classmethod
+    def confirm(cls, message) -> str:
+        raise NotImplementedError("No prompt in service mode")
+
+    @classmethod
+    def prompt_for_multiple_choices_field(cls, text: str, choices: list[tuple[str, str, str]]) -> str:
+        raise NotImplementedError("No prompt in service mode")
+
+    @classmethod
+    def prompt_for_str_field(cls, text: str, label: str) -> str:
+        raise NotImplementedError("No prompt in service mode")